@@ -0,0 +1,159 @@
+"""Response-builder time vs row count: row-by-row loops vs the vectorized builders.
+
+Synthetic district-level tables (10k-1M rows) stand in for data far larger
+than the 36 states; the legacy loops are skipped above --legacy-max rows.
+
+Run from backend/:
+    python benchmarks/bench_builders.py
+    python benchmarks/bench_builders.py --rows 10000 100000 1000000 --json builders.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+
+import main
+import main_simple
+from api_response import frame_records
+
+CLUSTER_NAMES = ["High Performers", "Solar Leaders", "Emerging States", "Hydro Rich"]
+
+
+def synthetic_baseline(rows, seed=0):
+    """Scored table with the columns of data['baseline_scored'] after the ML stage"""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({"state": [f"District {i}" for i in range(rows)]})
+    for column in ["solar_mw", "wind_mw", "small_hydro_mw", "bio_power_mw", "large_hydro_mw"]:
+        frame[column] = rng.integers(0, 10000, rows)
+    frame["total_mw"] = frame[["solar_mw", "wind_mw", "small_hydro_mw", "bio_power_mw",
+                               "large_hydro_mw"]].sum(axis=1)
+    for column in ["solar_score", "wind_score", "small_hydro_score", "bio_score", "final_score"]:
+        frame[column] = rng.uniform(0, 100, rows)
+    frame["rank"] = frame["final_score"].rank(ascending=False, method="min").astype(int)
+    frame["cluster"] = rng.integers(0, len(CLUSTER_NAMES), rows)
+    frame["cluster_name"] = np.asarray(CLUSTER_NAMES)[frame["cluster"]]
+    frame["is_outlier"] = rng.random(rows) < 0.05
+    frame["pca1"] = rng.normal(size=rows)
+    frame["pca2"] = rng.normal(size=rows)
+    return frame
+
+
+def legacy_states(baseline):
+    return [
+        main.StateScore(
+            state=row['state'], rank=int(row['rank']), final_score=float(row['final_score']),
+            solar_mw=float(row['solar_mw']), wind_mw=float(row['wind_mw']),
+            small_hydro_mw=float(row['small_hydro_mw']), bio_power_mw=float(row['bio_power_mw']),
+            large_hydro_mw=float(row['large_hydro_mw']), total_mw=float(row['total_mw']),
+            solar_score=float(row['solar_score']), wind_score=float(row['wind_score']),
+            small_hydro_score=float(row['small_hydro_score']), bio_score=float(row['bio_score']),
+            cluster=int(row['cluster']), cluster_name=str(row['cluster_name']),
+            is_outlier=bool(row['is_outlier'])
+        )
+        for _, row in baseline.iterrows()
+    ]
+
+
+def legacy_pca(baseline):
+    return [
+        {
+            "state": row['state'], "pc1": float(row['pca1']), "pc2": float(row['pca2']),
+            "cluster": int(row['cluster']), "cluster_name": str(row['cluster_name']),
+            "score": float(row['final_score']), "is_outlier": bool(row['is_outlier'])
+        }
+        for _, row in baseline.iterrows()
+    ]
+
+
+def legacy_clusters(records):
+    clusters = {}
+    for state in records:
+        group = clusters.setdefault(state["cluster"], {
+            "cluster_name": state["cluster_name"], "states": [], "scores": [],
+            "solar": [], "wind": [], "hydro": [], "bio": []
+        })
+        group["states"].append(state["state"])
+        group["scores"].append(state["final_score"])
+        group["solar"].append(state["solar_score"])
+        group["wind"].append(state["wind_score"])
+        group["hydro"].append(state["small_hydro_score"])
+        group["bio"].append(state["bio_score"])
+    return [
+        {
+            "cluster_id": cluster_id, "cluster_name": group["cluster_name"],
+            "num_states": len(group["states"]), "states": group["states"],
+            "avg_score": sum(group["scores"]) / len(group["scores"]),
+            "avg_solar": sum(group["solar"]) / len(group["solar"]),
+            "avg_wind": sum(group["wind"]) / len(group["wind"]),
+            "avg_hydro": sum(group["hydro"]) / len(group["hydro"]),
+            "avg_bio": sum(group["bio"]) / len(group["bio"])
+        }
+        for cluster_id, group in clusters.items()
+    ]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def run(rows, legacy_max):
+    data = {
+        "ml_results": {},
+        "explained_variance": [0.6, 0.3],
+        "pca_loadings": pd.DataFrame({"PC1": [0.5], "PC2": [0.5]}, index=["solar"]),
+    }
+    results = []
+    for n in rows:
+        baseline = synthetic_baseline(n)
+        data["baseline_scored"] = baseline
+        records = baseline.to_dict("records")
+        run_legacy = n <= legacy_max
+
+        cases = {
+            "states": (main.build_states_payload, data, legacy_states, baseline),
+            "pca": (main.build_pca_payload, data, legacy_pca, baseline),
+            "clusters": (lambda f: frame_records(main_simple.summarize_clusters(f)), baseline,
+                         legacy_clusters, records),
+            "summary": (main.build_summary_payload, data, None, None),
+        }
+        for name, (fast, fast_arg, legacy, legacy_arg) in cases.items():
+            results.append({
+                "builder": name,
+                "rows": n,
+                "vectorized_s": timed(fast, fast_arg),
+                "legacy_s": timed(legacy, legacy_arg) if legacy and run_legacy else None,
+            })
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000,
+                        help="Skip the row-by-row loops above this many rows")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.legacy_max)
+
+    print(f"{'builder':<10}{'rows':>10}{'legacy s':>11}{'vector s':>11}{'speedup':>9}")
+    for row in results:
+        legacy = f"{row['legacy_s']:.3f}" if row["legacy_s"] is not None else "-"
+        speedup = f"{row['legacy_s'] / row['vectorized_s']:.1f}x" if row["legacy_s"] else "-"
+        print(f"{row['builder']:<10}{row['rows']:>10}{legacy:>11}{row['vectorized_s']:>11.3f}{speedup:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,176 @@
+"""Latency of cheap reads under mixed load: CPU-bound handlers inline vs on the compute pool.
+
+Light clients send cached reads (summary, state details, leaderboard) on a
+fixed schedule while heavy clients post large scenario batches and goal-seek
+searches back to back. The app runs in-process on one event loop, as under a
+single uvicorn worker, so inline handlers stall every other request. Light
+latency is measured from each request's scheduled start, so time spent
+waiting for a blocked loop counts. Reports p50/p99 per request class and how
+many heavy requests were shed with 429.
+
+Run from backend/:
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --seconds 10 --light 32 --heavy 4 --json concurrency.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import api_response
+import main
+from offload import BoundedExecutor
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def light_requests(states):
+    """Cached reads that should stay fast under load"""
+    for i in range(sys.maxsize):
+        state = states[i % len(states)]
+        yield ("GET", "/api/stats/summary", None)
+        yield ("GET", f"/api/states/{state}", None)
+        yield ("GET", "/api/leaderboard?k=10", None)
+
+
+def encoded_batches(states, batch_size, variants=8):
+    """Scenario batch bodies, encoded before the run: the client shares the
+    server's event loop, so building them during it would look like server stalls"""
+    rng = np.random.default_rng(0)
+    return [
+        json.dumps({"scenarios": [
+            {"state": states[j % len(states)], "mode": "mw",
+             "delta_solar": float(rng.uniform(0, 5000)), "delta_wind": float(rng.uniform(0, 5000)),
+             "delta_hydro": 0.0, "delta_bio": 0.0}
+            for j in range(batch_size)
+        ]}).encode()
+        for _ in range(variants)
+    ]
+
+
+def heavy_requests(states, batches):
+    """CPU-bound scenario batches and goal-seek searches"""
+    variants = len(batches)
+    for i in range(sys.maxsize):
+        yield ("POST", "/api/scenarios/batch", batches[i % variants])
+        yield ("POST", "/api/scenario/optimize", json.dumps(
+            {"state": states[i % len(states)], "target_rank": 1, "budget_ms": 200, "seed": i}
+        ).encode())
+
+
+async def client(http, requests, deadline, latencies, statuses):
+    """Closed loop: the next request starts when the previous one finishes"""
+    for method, url, body in requests:
+        if time.perf_counter() >= deadline:
+            return
+        started = time.perf_counter()
+        response = await http.request(method, url, content=body, headers=JSON_HEADERS)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        # Back off as asked when shed; otherwise just yield, as a socket would
+        await asyncio.sleep(float(response.headers.get("retry-after", 0)))
+
+
+async def paced_client(http, requests, deadline, interval, latencies, statuses):
+    """Open loop: one request every `interval` seconds, timed from its scheduled start"""
+    scheduled = time.perf_counter()
+    for method, url, body in requests:
+        if scheduled >= deadline:
+            return
+        delay = scheduled - time.perf_counter()
+        await asyncio.sleep(max(delay, 0))
+        response = await http.request(method, url, content=body, headers=JSON_HEADERS)
+        latencies.append(time.perf_counter() - scheduled)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        # Behind schedule after a stall: skip ahead instead of bursting
+        scheduled = max(scheduled + interval, time.perf_counter() - interval)
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+async def run_mode(seconds, light, heavy, batch_size, rate):
+    states = list(main.cached_data["state_index"].entries)
+    batches = encoded_batches(states, batch_size)
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        deadline = time.perf_counter() + seconds
+        light_latencies, heavy_latencies = [], []
+        light_statuses, heavy_statuses = {}, {}
+        await asyncio.gather(
+            *[paced_client(http, light_requests(states[i:] + states[:i]), deadline, 1 / rate,
+                           light_latencies, light_statuses) for i in range(light)],
+            *[client(http, heavy_requests(states, batches), deadline,
+                     heavy_latencies, heavy_statuses) for _ in range(heavy)],
+        )
+        results["light"] = {**percentiles(light_latencies), "statuses": light_statuses}
+        results["heavy"] = {**percentiles(heavy_latencies), "statuses": heavy_statuses}
+    return results
+
+
+def run(seconds, light, heavy, batch_size, rate, workers, queue_depth):
+    main.load_stages()
+    modes = {
+        "inline": BoundedExecutor(0, 0),
+        "pool": BoundedExecutor(workers, queue_depth),
+    }
+    results = []
+    threaded_compression = api_response.COMPRESSION_THREAD_SIZE
+    for mode, pool in modes.items():
+        main.compute_pool = pool
+        # Inline mode also compresses on the loop, as before handlers were offloaded
+        api_response.COMPRESSION_THREAD_SIZE = (float("inf") if mode == "inline"
+                                                else threaded_compression)
+        measured = asyncio.run(run_mode(seconds, light, heavy, batch_size, rate))
+        for kind, stats in measured.items():
+            results.append({"mode": mode, "class": kind, **stats})
+        pool.shutdown()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each mode")
+    parser.add_argument("--light", type=int, default=16, help="Concurrent cached-read clients")
+    parser.add_argument("--heavy", type=int, default=4, help="Concurrent CPU-bound clients")
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests/s per light client")
+    parser.add_argument("--batch-size", type=int, default=main.MAX_BATCH_SCENARIOS)
+    parser.add_argument("--workers", type=int, default=main.COMPUTE_WORKERS)
+    parser.add_argument("--queue-depth", type=int, default=main.COMPUTE_QUEUE_DEPTH)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.seconds, args.light, args.heavy, args.batch_size, args.rate,
+                  args.workers, args.queue_depth)
+
+    print(f"{'mode':<8}{'class':<7}{'requests':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+    for row in results:
+        cells = [f"{row[key]:>9.1f}" if row[key] is not None else f"{'-':>9}"
+                 for key in ("p50_ms", "p99_ms", "max_ms")]
+        print(f"{row['mode']:<8}{row['class']:<7}{row['count']:>9}{''.join(cells)}  {row['statuses']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
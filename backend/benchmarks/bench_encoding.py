@@ -0,0 +1,108 @@
+"""Bytes-on-wire and encode time per endpoint: stdlib JSON vs orjson + compression.
+
+Run from backend/:
+    python benchmarks/bench_encoding.py              # main_simple.py
+    python benchmarks/bench_encoding.py --app main   # main.py (needs energy_transition_app)
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from api_response import BROTLI_QUALITY, GZIP_LEVEL, brotli, encode_json
+
+ENDPOINTS = [
+    "/api/states",
+    "/api/states/Karnataka",
+    "/api/geojson",
+    "/api/ml/pca",
+    "/api/ml/clusters",
+    "/api/stats/summary",
+]
+
+
+def stdlib_encode(content):
+    """What FastAPI's default JSONResponse does"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+        indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_per_call(func, content, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def load_app(name):
+    if name == "main":
+        import main
+        return main.app
+    import main_simple
+    return main_simple.app
+
+
+def wait_until_ready(client, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = client.get("/api/health/ready")
+        if response.status_code == 404 or response.json().get("fully_ready"):
+            return
+        time.sleep(0.1)
+
+
+def run(app_name, repeat):
+    results = []
+    with TestClient(load_app(app_name)) as client:
+        wait_until_ready(client)
+        for path in ENDPOINTS:
+            response = client.get(path, headers={"Accept-Encoding": "identity"})
+            if response.status_code != 200:
+                continue
+            content = response.json()
+            before = stdlib_encode(content)
+            after = encode_json(content)
+            row = {
+                "endpoint": path,
+                "before_bytes": len(before),
+                "before_encode_us": time_per_call(stdlib_encode, content, repeat),
+                "after_encode_us": time_per_call(encode_json, content, repeat),
+                "gzip_bytes": len(gzip.compress(after, compresslevel=GZIP_LEVEL)),
+                "br_bytes": len(brotli.compress(after, quality=BROTLI_QUALITY)) if brotli else None,
+            }
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=["simple", "main"], default="simple")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.app, args.repeat)
+
+    print(f"{'endpoint':<24}{'bytes':>9}{'gzip':>9}{'br':>9}{'stdlib us':>12}{'fast us':>10}{'speedup':>9}")
+    for row in results:
+        br = row["br_bytes"] if row["br_bytes"] is not None else "-"
+        speedup = row["before_encode_us"] / row["after_encode_us"]
+        print(f"{row['endpoint']:<24}{row['before_bytes']:>9}{row['gzip_bytes']:>9}{br:>9}"
+              f"{row['before_encode_us']:>12.1f}{row['after_encode_us']:>10.1f}{speedup:>8.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Per-endpoint throughput, latency, memory and startup time for main.py and main_simple.py.
+
+Each (app, dataset size) runs in a fresh subprocess: synthetic regions from
+benchmarks/synthetic.py replace the database / hand-written table, the app
+starts in-process, and every endpoint is driven through an ASGI client at a
+fixed concurrency. Results go to a JSON file; --compare flags endpoints whose
+p95 latency or throughput regressed against an earlier file.
+
+Run from backend/:
+    python benchmarks/bench_endpoints.py
+    python benchmarks/bench_endpoints.py --regions 36 1000 10000 100000 --json endpoints.json
+    python benchmarks/bench_endpoints.py --apps main --compare endpoints.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+APPS = ["main", "main_simple"]
+
+# name -> (method, path, body, apps); path/body may depend on a region name
+ENDPOINTS = {
+    "states": ("GET", "/api/states", None, APPS),
+    "states_page": ("GET", "/api/states?sort=final_score&order=desc&limit=50", None, ["main"]),
+    "state_detail": ("GET", "/api/states/{state}", None, APPS),
+    "summary": ("GET", "/api/stats/summary", None, APPS),
+    "leaderboard": ("GET", "/api/leaderboard?k=10", None, APPS),
+    "neighbours": ("GET", "/api/states/{state}/neighbours?k=2", None, APPS),
+    "clusters": ("GET", "/api/ml/clusters", None, APPS),
+    "pca": ("GET", "/api/ml/pca", None, APPS),
+    "geojson": ("GET", "/api/geojson", None, APPS),
+    "scenario": ("POST", "/api/scenario",
+                 {"state": "{state}", "mode": "mw", "delta_solar": 500.0, "delta_wind": 250.0,
+                  "delta_hydro": 0.0, "delta_bio": 0.0}, APPS),
+    "scenario_batch": ("POST", "/api/scenarios/batch", "batch", ["main"]),
+}
+BATCH_SIZE = 100
+
+
+def rss_mb():
+    """Current resident set size, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def start_main(regions, workdir):
+    """Load main.py's startup stages over a synthetic dataset; returns (app, stage timings)"""
+    import main
+    import model_cache
+
+    installed, geography = synthetic.generate_regions(regions)
+    with open(os.path.join(workdir, "india_states.geojson"), "w", encoding="utf-8") as f:
+        json.dump(synthetic.grid_geojson(installed["state"].tolist()), f)
+
+    # Synthetic tables in place of the SQLite database; models cached in the scratch dir
+    main.DATA_DIR = workdir
+    main.DB_PATH = os.path.join(workdir, "synthetic.db")
+    main.load_state_tables = lambda: main.score_state_tables(installed, geography)
+    model_cache.ARTIFACT_DIR = os.path.join(workdir, "models")
+
+    main.load_stages()
+    stages = {name: stage["seconds"] for name, stage in main.stages.snapshot().items()}
+    return main.app, stages
+
+
+def start_main_simple(regions, workdir):
+    import main_simple
+
+    records = synthetic.state_records(synthetic.generate_regions(regions)[0])
+    started = time.perf_counter()
+    main_simple.load_states(records)
+    return main_simple.app, {"load": time.perf_counter() - started}
+
+
+def request_args(name, states, i):
+    method, path, body, _ = ENDPOINTS[name]
+    state = states[i % len(states)]
+    if body == "batch":
+        body = {"scenarios": [
+            {**ENDPOINTS["scenario"][2], "state": states[(i + j) % len(states)]}
+            for j in range(BATCH_SIZE)
+        ]}
+    elif body is not None:
+        body = {**body, "state": state}
+    return method, path.format(state=state), body
+
+
+async def drive(app, name, states, requests, concurrency, max_seconds):
+    """Cold first request, then up to `requests` at `concurrency` within max_seconds"""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as http:
+        method, path, body = request_args(name, states, 0)
+        started = time.perf_counter()
+        response = await http.request(method, path, json=body)
+        cold = time.perf_counter() - started
+        if response.status_code >= 400:
+            return {"error": f"{response.status_code}: {response.text[:200]}"}
+
+        latencies, errors, issued = [], 0, 0
+        deadline = time.perf_counter() + max_seconds
+
+        async def client():
+            nonlocal errors, issued
+            while issued < requests and time.perf_counter() < deadline:
+                issued += 1
+                method, path, body = request_args(name, states, issued)
+                started = time.perf_counter()
+                response = await http.request(method, path, json=body)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    values = np.asarray(latencies) * 1000
+    return {
+        "requests": len(values),
+        "errors": int(errors),
+        "cold_ms": cold * 1000,
+        "throughput_rps": len(values) / elapsed if elapsed else None,
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "bytes": len(response.content),
+    }
+
+
+def run_worker(app_name, regions, requests, concurrency, max_seconds):
+    """One (app, size) measurement in this process"""
+    baseline_rss = rss_mb()
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        if app_name == "main":
+            app, stages = start_main(regions, workdir)
+        else:
+            app, stages = start_main_simple(regions, workdir)
+        startup = time.perf_counter() - started
+        loaded_rss = rss_mb()
+
+        states = synthetic.region_names(regions)
+        endpoints = {}
+        for name, (_, _, _, apps) in ENDPOINTS.items():
+            if app_name in apps:
+                endpoints[name] = asyncio.run(drive(app, name, states, requests, concurrency, max_seconds))
+
+    return {
+        "app": app_name,
+        "regions": regions,
+        "startup_s": startup,
+        "stages_s": stages,
+        "memory_mb": {
+            "before_load": baseline_rss,
+            "after_load": loaded_rss,
+            "data": loaded_rss - baseline_rss if loaded_rss is not None and baseline_rss is not None else None,
+            "peak": peak_rss_mb(),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def run(apps, sizes, requests, concurrency, max_seconds, timeout):
+    """Spawn one worker per (app, size) so startup and memory are measured from scratch"""
+    runs = []
+    for regions in sizes:
+        for app_name in apps:
+            command = [sys.executable, os.path.abspath(__file__), "--worker", app_name,
+                       "--regions", str(regions), "--requests", str(requests),
+                       "--concurrency", str(concurrency), "--max-seconds", str(max_seconds)]
+            print(f"{app_name} x {regions} regions...", file=sys.stderr, flush=True)
+            try:
+                done = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True,
+                                      timeout=timeout)
+            except subprocess.TimeoutExpired:
+                runs.append({"app": app_name, "regions": regions, "error": f"timed out after {timeout}s"})
+                continue
+            if done.returncode != 0:
+                runs.append({"app": app_name, "regions": regions, "error": done.stderr.strip()[-2000:]})
+                continue
+            runs.append(json.loads(done.stdout.strip().splitlines()[-1]))
+    return runs
+
+
+def compare(runs, baseline_path, tolerance):
+    """Endpoint results worse than the baseline file by more than `tolerance`"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {
+        (r["app"], r["regions"], name): stats
+        for r in baseline["runs"] for name, stats in r.get("endpoints", {}).items()
+    }
+    regressions = []
+    for r in runs:
+        for name, stats in r.get("endpoints", {}).items():
+            before = previous.get((r["app"], r["regions"], name))
+            if not before or "error" in stats or "error" in before:
+                continue
+            if stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append((r["app"], r["regions"], name, "p95_ms", before["p95_ms"], stats["p95_ms"]))
+            if stats["throughput_rps"] < before["throughput_rps"] / (1 + tolerance):
+                regressions.append((r["app"], r["regions"], name, "throughput_rps",
+                                    before["throughput_rps"], stats["throughput_rps"]))
+    return regressions
+
+
+def print_table(runs):
+    for r in runs:
+        if "error" in r:
+            print(f"\n{r['app']} x {r['regions']}: FAILED {r['error'].splitlines()[-1]}")
+            continue
+        memory = r["memory_mb"]
+        data_mb = f"{memory['data']:.0f} MB" if memory["data"] is not None else "n/a"
+        print(f"\n{r['app']} x {r['regions']} regions: startup {r['startup_s']:.2f}s, data {data_mb}")
+        print(f"  {'endpoint':<15}{'req':>6}{'rps':>9}{'cold ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KB':>9}")
+        for name, stats in r["endpoints"].items():
+            if "error" in stats:
+                print(f"  {name:<15}  {stats['error']}")
+                continue
+            print(f"  {name:<15}{stats['requests']:>6}{stats['throughput_rps']:>9.1f}{stats['cold_ms']:>10.1f}"
+                  f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['bytes'] / 1024:>9.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=APPS)
+    parser.add_argument("--regions", type=int, nargs="+", default=[36, 1000, 10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Time cap per endpoint")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Time cap per (app, size) run")
+    parser.add_argument("--json", default="bench_endpoints.json", help="Results file")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before --compare reports a regression")
+    parser.add_argument("--worker", choices=APPS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.regions[0], args.requests, args.concurrency, args.max_seconds)
+        print(json.dumps(result))
+        return
+
+    runs = run(args.apps, args.regions, args.requests, args.concurrency, args.max_seconds, args.timeout)
+    print_table(runs)
+
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "max_seconds": args.max_seconds,
+            },
+            "runs": runs,
+        }, f, indent=2)
+
+    if args.compare:
+        regressions = compare(runs, args.compare, args.tolerance)
+        for app_name, regions, name, metric, before, after in regressions:
+            print(f"REGRESSION {app_name} x {regions} {name}: {metric} {before:.2f} -> {after:.2f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,137 @@
+"""Synthetic capacity/geography datasets of any size for benchmarks.
+
+Frames follow the schema of scoring.fetch_installed_capacity and
+scoring.fetch_geography; the GeoJSON is a grid of square regions over
+India's bounding box, named like the capacity rows.
+
+Run from backend/ to write a dataset to disk:
+    python benchmarks/synthetic.py 100000 /tmp/regions-100k
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+RESOURCE_COLUMNS = ["solar_mw", "wind_mw", "small_hydro_mw", "bio_power_mw"]
+CAPACITY_COLUMNS = RESOURCE_COLUMNS + ["large_hydro_mw"]
+GEOGRAPHY_FLAGS = ["coastal", "arid_desert", "mountain_himalayan", "high_agri_biomass"]
+
+# Median MW and share of regions with none, per resource (roughly the 36-state table)
+CAPACITY_PROFILE = {
+    "solar_mw": (1200, 0.02),
+    "wind_mw": (300, 0.35),
+    "small_hydro_mw": (150, 0.15),
+    "bio_power_mw": (250, 0.10),
+    "large_hydro_mw": (900, 0.40),
+}
+FLAG_SHARE = {"coastal": 0.25, "arid_desert": 0.10, "mountain_himalayan": 0.15, "high_agri_biomass": 0.40}
+GEO_NAMES = {"coastal": "Coastal", "arid_desert": "Arid", "mountain_himalayan": "Himalayan",
+             "high_agri_biomass": "Agricultural"}
+CLUSTER_NAMES = ["High Performers", "Solar Leaders", "Emerging States", "Hydro Rich"]
+
+# India's bounding box (lon, lat)
+BOUNDS = (68.0, 6.0, 97.5, 37.0)
+
+
+def region_names(n):
+    width = len(str(n))
+    return [f"Region {i:0{width}d}" for i in range(1, n + 1)]
+
+
+def generate_regions(n, seed=0):
+    """(installed, geography) frames for n regions"""
+    rng = np.random.default_rng(seed)
+    names = region_names(n)
+
+    installed = pd.DataFrame({"state": names})
+    for column in CAPACITY_COLUMNS:
+        median, zero_share = CAPACITY_PROFILE[column]
+        values = rng.lognormal(np.log(median), 1.2, n).round(1)
+        values[rng.random(n) < zero_share] = 0.0
+        installed[column] = values
+    installed["total_mw"] = installed[CAPACITY_COLUMNS].sum(axis=1)
+
+    geography = pd.DataFrame({"state": names})
+    for flag in GEOGRAPHY_FLAGS:
+        geography[flag] = (rng.random(n) < FLAG_SHARE[flag]).astype(int)
+    # First set flag names the region, as in the real table
+    flags = geography[GEOGRAPHY_FLAGS].to_numpy()
+    labels = np.array([GEO_NAMES[flag] for flag in GEOGRAPHY_FLAGS] + ["Mixed"])
+    first = np.where(flags.any(axis=1), flags.argmax(axis=1), len(GEOGRAPHY_FLAGS))
+    geography["dominant_geo"] = labels[first]
+    return installed, geography
+
+
+def state_records(installed, seed=0):
+    """Rows shaped like main_simple.STATES_DATA: percentile scores, rank, cluster, outlier"""
+    rng = np.random.default_rng(seed)
+    frame = installed.copy()
+    scores = {}
+    for column, score in zip(RESOURCE_COLUMNS, ["solar_score", "wind_score", "small_hydro_score", "bio_score"]):
+        scores[score] = (frame[column].rank(pct=True) * 100).round(1)
+    frame = frame.assign(**scores)
+    frame["final_score"] = frame[list(scores)].mean(axis=1).round(1)
+    frame["rank"] = frame["final_score"].rank(ascending=False, method="min").astype(int)
+    frame["cluster"] = rng.integers(0, len(CLUSTER_NAMES), len(frame))
+    frame["cluster_name"] = np.asarray(CLUSTER_NAMES)[frame["cluster"]]
+    frame["is_outlier"] = frame["total_mw"] >= frame["total_mw"].quantile(0.99)
+    frame = frame.sort_values(["rank", "state"], kind="stable")
+    # Column-wise tolist() yields plain Python values, as in the hand-written table
+    columns = {column: frame[column].tolist() for column in frame.columns}
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def grid_geojson(names, points_per_edge=3):
+    """FeatureCollection of adjacent squares, one per name, with ST_NM set"""
+    n = len(names)
+    columns = int(np.ceil(np.sqrt(n)))
+    rows = int(np.ceil(n / columns))
+    west, south, east, north = BOUNDS
+    width, height = (east - west) / columns, (north - south) / rows
+
+    # One closed ring template on the unit square, scaled and shifted per region
+    t = np.linspace(0.0, 1.0, points_per_edge + 1)[:-1]
+    zeros, ones = np.zeros_like(t), np.ones_like(t)
+    unit = np.concatenate([
+        np.column_stack([t, zeros]), np.column_stack([ones, t]),
+        np.column_stack([1 - t, ones]), np.column_stack([zeros, 1 - t]), [[0.0, 0.0]],
+    ])
+    index = np.arange(n)
+    origins = np.column_stack([west + (index % columns) * width, south + (index // columns) * height])
+    rings = np.round(origins[:, None, :] + unit[None, :, :] * [width, height], 6).tolist()
+
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"name": name, "ST_NM": name},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        }
+        for name, ring in zip(names, rings)
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def write_dataset(n, directory, seed=0):
+    """installed.csv, geography.csv and india_states.geojson for n regions"""
+    os.makedirs(directory, exist_ok=True)
+    installed, geography = generate_regions(n, seed=seed)
+    installed.to_csv(os.path.join(directory, "installed.csv"), index=False)
+    geography.to_csv(os.path.join(directory, "geography.csv"), index=False)
+    with open(os.path.join(directory, "india_states.geojson"), "w", encoding="utf-8") as f:
+        json.dump(grid_geojson(installed["state"].tolist()), f)
+    return installed, geography
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("regions", type=int)
+    parser.add_argument("directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_dataset(args.regions, args.directory, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main_cli()
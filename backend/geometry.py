@@ -0,0 +1,273 @@
+# Map geometry pipeline: shared-arc topology, per-zoom simplification, quantization
+import numpy as np
+
+# Grid resolution for quantized coordinates (TopoJSON "transform")
+QUANTIZATION = 100000
+
+# Detail levels: (simplification tolerance in grid units, GeoJSON decimal places)
+LEVELS = {
+    'low': (150, 2),
+    'medium': (40, 3),
+    'high': (8, 4),
+}
+FULL_LEVEL = 'full'
+
+
+def to_feature_collection(geo):
+    """GeoJSON FeatureCollection for either GeoJSON or TopoJSON input"""
+    if geo.get('type') != 'Topology':
+        return geo
+
+    transform = geo.get('transform')
+    arcs = []
+    for arc in geo['arcs']:
+        points = np.asarray(arc, dtype=float)
+        if transform:
+            points = np.cumsum(points, axis=0) * transform['scale'] + transform['translate']
+        arcs.append(points.tolist())
+
+    def ring(indexes):
+        coords = []
+        for index in indexes:
+            points = arcs[index] if index >= 0 else arcs[~index][::-1]
+            coords.extend(points[1:] if coords else points)
+        return coords
+
+    features = []
+    for obj in geo['objects'].values():
+        for geometry in obj.get('geometries', [obj]):
+            if geometry['type'] == 'Polygon':
+                coordinates = [ring(r) for r in geometry['arcs']]
+            elif geometry['type'] == 'MultiPolygon':
+                coordinates = [[ring(r) for r in polygon] for polygon in geometry['arcs']]
+            else:
+                continue
+            features.append({
+                'type': 'Feature',
+                'properties': geometry.get('properties', {}),
+                'geometry': {'type': geometry['type'], 'coordinates': coordinates}
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def polygons_of(geometry):
+    """List of polygons (each a list of rings) for Polygon / MultiPolygon"""
+    if not geometry:
+        return None
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return None
+
+
+class Topology:
+    """Polygon features decomposed into arcs shared between neighbouring rings"""
+
+    def __init__(self, collection, quantization=QUANTIZATION):
+        features = collection.get('features', [])
+        all_points = [
+            np.asarray(ring, dtype=float)[:, :2]
+            for feature in features
+            for polygon in (polygons_of(feature.get('geometry')) or [])
+            for ring in polygon if len(ring)
+        ]
+        stacked = np.vstack(all_points) if all_points else np.zeros((1, 2))
+        lower, upper = stacked.min(axis=0), stacked.max(axis=0)
+        self.translate = lower
+        self.scale = np.where(upper > lower, (upper - lower) / (quantization - 1), 1.0)
+
+        # Quantize every ring to the integer grid
+        rings = []
+        self.features = []
+        for feature in features:
+            polygons = polygons_of(feature.get('geometry'))
+            if polygons is None:
+                self.features.append((feature, None))
+                continue
+            structure = []
+            for polygon in polygons:
+                ring_ids = []
+                for ring in polygon:
+                    quantized = self._quantize(ring)
+                    if quantized is not None:
+                        ring_ids.append(len(rings))
+                        rings.append(quantized)
+                if ring_ids:
+                    structure.append(ring_ids)
+            self.features.append((feature, structure))
+
+        self.arcs = []
+        self._arc_ids = {}
+        owners = self._edge_owners(rings)
+        self.ring_arcs = [self._cut_ring(ring, i, owners) for i, ring in enumerate(rings)]
+
+    def _quantize(self, ring):
+        points = np.rint((np.asarray(ring, dtype=float)[:, :2] - self.translate) / self.scale)
+        points = points.astype(np.int64)
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+        points = points[keep]
+        if len(points) and tuple(points[0]) != tuple(points[-1]):
+            points = np.vstack([points, points[:1]])
+        return points if len(points) >= 4 else None
+
+    @staticmethod
+    def _edge_owners(rings):
+        owners = {}
+        for ring_id, ring in enumerate(rings):
+            pts = list(map(tuple, ring))
+            for a, b in zip(pts[:-1], pts[1:]):
+                owners.setdefault((min(a, b), max(a, b)), set()).add(ring_id)
+        return owners
+
+    def _cut_ring(self, ring, ring_id, owners):
+        """Split a closed ring at junctions and return signed arc indexes"""
+        pts = list(map(tuple, ring[:-1]))
+        n = len(pts)
+        signatures = [
+            frozenset(owners[(min(pts[k], pts[(k + 1) % n]), max(pts[k], pts[(k + 1) % n]))])
+            for k in range(n)
+        ]
+        junctions = [k for k in range(n) if signatures[k - 1] != signatures[k]]
+
+        if not junctions:
+            # Whole ring is one arc: start at the smallest point so identical
+            # rings (e.g. an enclave and its hole) produce the same arc
+            start = min(range(n), key=lambda k: pts[k])
+            rotated = pts[start:] + pts[:start]
+            return [self._arc_index(rotated + [rotated[0]])]
+
+        indexes = []
+        for j, start in enumerate(junctions):
+            stop = junctions[(j + 1) % len(junctions)]
+            if stop <= start:
+                stop += n
+            indexes.append(self._arc_index([pts[k % n] for k in range(start, stop + 1)]))
+        return indexes
+
+    def _arc_index(self, points):
+        key = tuple(points)
+        if key in self._arc_ids:
+            return self._arc_ids[key]
+        reverse = key[::-1]
+        if reverse in self._arc_ids:
+            return ~self._arc_ids[reverse]
+        self._arc_ids[key] = len(self.arcs)
+        self.arcs.append(np.asarray(points, dtype=np.int64))
+        return self._arc_ids[key]
+
+    def simplified_arcs(self, tolerance):
+        """Arcs simplified with Douglas-Peucker; rings that would collapse keep full detail"""
+        if tolerance <= 0:
+            return list(self.arcs)
+        arcs = [simplify_arc(arc, tolerance) for arc in self.arcs]
+        for ring in self.ring_arcs:
+            if len(self._stitch(ring, arcs)) < 4:
+                for index in ring:
+                    arcs[index if index >= 0 else ~index] = self.arcs[index if index >= 0 else ~index]
+        return arcs
+
+    @staticmethod
+    def _stitch(ring, arcs):
+        coords = []
+        for index in ring:
+            points = arcs[index] if index >= 0 else arcs[~index][::-1]
+            coords.extend(points[1:] if coords else points)
+        return coords
+
+    def to_geojson(self, tolerance, decimals):
+        """FeatureCollection rebuilt from (simplified) shared arcs"""
+        arcs = self.simplified_arcs(tolerance)
+        arcs = [np.round(arc * self.scale + self.translate, decimals) for arc in arcs]
+
+        features = []
+        for feature, structure in self.features:
+            if not structure:
+                features.append(feature)
+                continue
+            polygons = [
+                [np.asarray(self._stitch(self.ring_arcs[r], arcs)).tolist() for r in polygon]
+                for polygon in structure
+            ]
+            geometry = (
+                {'type': 'Polygon', 'coordinates': polygons[0]} if len(polygons) == 1
+                else {'type': 'MultiPolygon', 'coordinates': polygons}
+            )
+            features.append({**feature, 'geometry': geometry})
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def to_topojson(self, tolerance, object_name='states'):
+        """TopoJSON Topology with delta-encoded, quantized arcs"""
+        arcs = self.simplified_arcs(tolerance)
+        geometries = []
+        for feature, structure in self.features:
+            properties = feature.get('properties') or {}
+            if not structure:
+                geometries.append({'type': None, 'properties': properties})
+                continue
+            polygons = [[self.ring_arcs[r] for r in polygon] for polygon in structure]
+            if len(polygons) == 1:
+                geometries.append({'type': 'Polygon', 'arcs': polygons[0], 'properties': properties})
+            else:
+                geometries.append({'type': 'MultiPolygon', 'arcs': polygons, 'properties': properties})
+
+        return {
+            'type': 'Topology',
+            'transform': {'scale': self.scale.tolist(), 'translate': self.translate.tolist()},
+            'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+            'arcs': [np.diff(arc, axis=0, prepend=[[0, 0]]).tolist() for arc in arcs]
+        }
+
+
+def simplify_arc(points, tolerance):
+    """Douglas-Peucker over an integer arc, always keeping both endpoints"""
+    n = len(points)
+    if n <= 2:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    points_f = points.astype(float)
+
+    stack = [(0, n - 1)]
+    if np.array_equal(points[0], points[-1]):
+        # Closed arc: split at the point farthest from the start first
+        far = int(np.argmax(np.hypot(*(points_f - points_f[0]).T)))
+        if far in (0, n - 1):
+            return points
+        keep[far] = True
+        stack = [(0, far), (far, n - 1)]
+
+    while stack:
+        start, stop = stack.pop()
+        if stop - start < 2:
+            continue
+        segment = points_f[start + 1:stop]
+        a, b = points_f[start], points_f[stop]
+        direction = b - a
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(*(segment - a).T)
+        else:
+            offset = segment - a
+            distances = np.abs(direction[0] * offset[:, 1] - direction[1] * offset[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, stop))
+    return points[keep]
+
+
+def build_geometry_levels(geo):
+    """Precompute GeoJSON and TopoJSON content for every detail level"""
+    collection = to_feature_collection(geo)
+    topology = Topology(collection)
+
+    levels = {(FULL_LEVEL, 'geojson'): geo if geo.get('type') != 'Topology' else collection,
+              (FULL_LEVEL, 'topojson'): topology.to_topojson(0)}
+    for level, (tolerance, decimals) in LEVELS.items():
+        levels[(level, 'geojson')] = topology.to_geojson(tolerance, decimals)
+        levels[(level, 'topojson')] = topology.to_topojson(tolerance)
+    return levels
@@ -0,0 +1,105 @@
+# Background jobs with progress polling
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 50
+# Pending plus running jobs admitted before submit() refuses new ones
+MAX_ACTIVE_JOBS = 16
+
+
+class TooManyJobs(Exception):
+    """Raised by submit() instead of queueing when max_active jobs are pending or running"""
+
+
+class JobRegistry:
+    """Runs long computations off the request path and records their progress.
+
+    A job function is called as func(progress, *args), where progress(fraction)
+    may be called as work completes; its return value becomes the job result.
+    """
+
+    def __init__(self, max_workers=2, max_finished=MAX_FINISHED_JOBS, max_active=MAX_ACTIVE_JOBS):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs")
+        self.max_finished = max_finished
+        self.max_active = max_active
+
+    def submit(self, kind, func, *args, params=None, job_id=None):
+        """Start func in the background; a given job_id replaces any job under that id.
+
+        Raises TooManyJobs if max_active jobs are already pending or running.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "pending",
+            "progress": 0.0,
+            "params": params,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "result": None,
+        }
+        with self._lock:
+            active = sum(1 for other in self._jobs.values()
+                         if other["status"] in ("pending", "running") and other["job_id"] != job_id)
+            if active >= self.max_active:
+                raise TooManyJobs()
+            self._jobs[job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job_id, func, args)
+        return self.get(job_id)
+
+    def get(self, job_id, include_result=True):
+        """Copy of a job's state, or None if unknown or pruned"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if not include_result:
+            job.pop("result")
+        return job
+
+    def list(self, kind=None):
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if kind in (None, job["kind"])]
+        for job in jobs:
+            job.pop("result")
+        return jobs
+
+    def _run(self, job_id, func, args):
+        self._update(job_id, status="running", started=time.time())
+
+        def progress(fraction):
+            self._update(job_id, progress=round(min(max(float(fraction), 0.0), 1.0), 4))
+
+        try:
+            result = func(progress, *args)
+        except Exception as exc:
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status="failed", error=repr(exc), finished=time.time())
+            return
+        self._update(job_id, status="done", progress=1.0, result=result, finished=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job["status"] in ("done", "failed")),
+            key=lambda job: job["finished"]
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job["job_id"]]
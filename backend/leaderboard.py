@@ -0,0 +1,130 @@
+# Order indexes by final and component score for top-k and rank-neighbour queries
+import numpy as np
+
+# Metric name -> score column
+METRICS = {
+    'final': 'final_score',
+    'solar': 'solar_score',
+    'wind': 'wind_score',
+    'small_hydro': 'small_hydro_score',
+    'bio': 'bio_score',
+}
+
+# Above this share of changed rows a full re-sort is cheaper than merging
+INCREMENTAL_MAX_CHANGED = 0.25
+
+# Largest k the leaderboard and rank-neighbour endpoints accept (both apps)
+MAX_K = 100
+
+
+def check_k(k):
+    """ValueError unless 1 <= k <= MAX_K"""
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+
+
+class MetricOrder:
+    """States in descending and ascending score order; ties keep row order"""
+
+    def __init__(self, scores, descending=None, ascending=None):
+        self.scores = np.asarray(scores, dtype=float)
+        rows = np.arange(len(self.scores))
+        self.descending = (np.lexsort((rows, -self.scores)) if descending is None
+                           else descending)
+        self.ascending = (np.lexsort((rows, self.scores)) if ascending is None
+                          else ascending)
+        self.position = np.empty(len(self.scores), dtype=np.int64)
+        self.position[self.descending] = np.arange(len(self.scores))
+        # Sorted keys for O(log n) competition ranks
+        self._sorted_negated = -self.scores[self.descending]
+
+    def rank(self, row):
+        """1 + number of rows with a strictly higher score"""
+        return int(np.searchsorted(self._sorted_negated, -self.scores[row], side='left')) + 1
+
+    def updated(self, scores):
+        """MetricOrder for new scores over the same rows, merged incrementally.
+
+        Unchanged rows keep their relative order, so only the changed rows are
+        removed and binary-searched back in.
+        """
+        scores = np.asarray(scores, dtype=float)
+        changed = np.flatnonzero(scores != self.scores)
+        if len(changed) == 0:
+            return self
+        if len(changed) > INCREMENTAL_MAX_CHANGED * len(scores):
+            return MetricOrder(scores)
+        return MetricOrder(
+            scores,
+            descending=_merge(self.descending, -scores, changed),
+            ascending=_merge(self.ascending, scores, changed)
+        )
+
+
+def _merge(order, keys, changed):
+    """Re-insert `changed` rows into `order`, sorted by (keys, row)"""
+    is_changed = np.zeros(len(keys), dtype=bool)
+    is_changed[changed] = True
+    kept = order[~is_changed[order]]
+    kept_keys = keys[kept]
+
+    changed = changed[np.lexsort((changed, keys[changed]))]
+    slots = np.empty(len(changed), dtype=np.int64)
+    for i, row in enumerate(changed):
+        # Among equal keys, rows stay in index order
+        lo = np.searchsorted(kept_keys, keys[row], side='left')
+        hi = np.searchsorted(kept_keys, keys[row], side='right')
+        slots[i] = lo + np.searchsorted(kept[lo:hi], row)
+    return np.insert(kept, slots, changed)
+
+
+class Leaderboard:
+    """One MetricOrder per metric over a fixed list of states"""
+
+    def __init__(self, frame, orders=None):
+        self.states = frame['state'].tolist()
+        self.row_of = {state: i for i, state in enumerate(self.states)}
+        self.orders = orders or {
+            metric: MetricOrder(frame[column].to_numpy())
+            for metric, column in METRICS.items()
+        }
+
+    def updated(self, frame):
+        """Leaderboard for a reloaded frame, reusing orders where possible"""
+        if frame['state'].tolist() != self.states:
+            return Leaderboard(frame)
+        return Leaderboard(frame, orders={
+            metric: self.orders[metric].updated(frame[column].to_numpy())
+            for metric, column in METRICS.items()
+        })
+
+    def order(self, metric):
+        if metric not in self.orders:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+        return self.orders[metric]
+
+    def top_rows(self, metric, k):
+        return self.order(metric).descending[:k].tolist()
+
+    def bottom_rows(self, metric, k):
+        return self.order(metric).ascending[:k].tolist()
+
+    def entries(self, metric, rows):
+        order = self.order(metric)
+        return [
+            {'rank': order.rank(row), 'state': self.states[row], 'score': float(order.scores[row])}
+            for row in rows
+        ]
+
+    def top(self, metric, k, bottom=False):
+        """Best (or worst) k entries, O(k)"""
+        rows = self.bottom_rows(metric, k) if bottom else self.top_rows(metric, k)
+        return self.entries(metric, rows)
+
+    def neighbours(self, metric, state, k):
+        """The state plus up to k entries on each side of it, O(k)"""
+        order = self.order(metric)
+        row = self.row_of[state]
+        position = int(order.position[row])
+        rows = order.descending[max(0, position - k):position + k + 1].tolist()
+        return self.entries(metric, rows)
@@ -1,10 +1,11 @@
 # FastAPI Backend for Energy Transition Dashboard
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional, Dict, Union
 import sys
 import os
+import itertools
 
 # Add parent directory to path to import existing modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'energy_transition_app'))
@@ -15,21 +16,55 @@ from scoring import (
     compute_baseline_bounds, compute_scores
 )
 from geo_weights import recommended_weights
-from state_matching import align_states_to_geojson
 from recommendations import generate_recommendations, get_quick_win_scenario
 from ml_analysis import (
     train_comprehensive_ml_models, perform_pca_analysis,
     get_cluster_statistics, get_gmm_confidence, is_outlier, get_model_comparison
 )
+from api_response import FastJSONResponse, CompressionMiddleware, frame_records
+from scenario_engine import ScenarioEngine, DEFAULT_WEIGHTS
+from optimizer import GoalSeek, target_threshold, RESOURCE_KEYS
+from weighting import WeightModel, parse_weights, quantize_weights, WEIGHT_NAMES
+from response_cache import build_payloads, CachedPayload, LRUCache
+from state_index import StateIndex
+from state_query import StateTable
+from leaderboard import Leaderboard, check_k
+from similarity import NeighbourGraph, MAX_SIMILAR_K, standardized
+from ml_predict import ScenarioPredictor
+from stages import StageTracker
+import model_cache
+import shared_table
+from region_store import open_region_store
+from geometry import build_geometry_levels, to_feature_collection, FULL_LEVEL, LEVELS as GEOMETRY_LEVELS
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from jobs import JobRegistry, TooManyJobs
+from offload import BoundedExecutor, PoolSaturated
+import sensitivity
+import ml_jobs
+import metrics
+import multiprocessing
+import asyncio
 import json
+import threading
+import time
+import logging
+import hmac
+import numpy as np
 import pandas as pd
 
 app = FastAPI(
     title="Energy Transition Readiness API",
     description="API for India Energy Transition Readiness Dashboard",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+logger = logging.getLogger(__name__)
+
+# Compress large uncompressed responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -37,12 +72,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+# ?profile=1 (admin only) returns a sampled profile of that request instead of its body
+app.add_middleware(metrics.ProfileMiddleware, authorize=lambda token: require_admin(token))
+
+# Per-route latency, status and in-flight counts for /metrics (outermost, so it times everything)
+app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+
 # Global variables for caching
 DB_PATH = "../../energy_transition_app/energy_transition.db"
 DATA_DIR = "../../energy_transition_app/data"
 cached_data = {}
+data_version = 0
+init_lock = threading.RLock()
+
+# Staged startup: 'scores' serves rankings/scenarios, 'ml' adds clusters/PCA
+stages = StageTracker(['scores', 'ml'])
+background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup")
+RETRY_AFTER_SECONDS = 5
+
+# Hot reload: admin endpoint and optional polling of the DB / shared table
+reload_lock = threading.Lock()
+pending_reload = None
+reloads = StageTracker(['reload'])
+DATA_WATCH_INTERVAL = float(os.environ.get("DATA_WATCH_INTERVAL", "0"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Set to share the state table between workers via memory-mapped files
+SHARED_DATA_DIR = os.environ.get("SHARED_DATA_DIR")
+
+# Worker processes for CPU-heavy analyses (Monte Carlo), created on first use
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+analysis_pool = None
+analysis_pool_lock = threading.Lock()
+
+# Threads for CPU-bound handlers (scenarios, optimizer, uncached builds); cheap
+# cached reads stay on the event loop. Beyond workers + queue depth, requests
+# get 429 instead of waiting. COMPUTE_WORKERS=0 runs handlers inline.
+COMPUTE_WORKERS = int(os.environ.get("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+COMPUTE_QUEUE_DEPTH = int(os.environ.get("COMPUTE_QUEUE_DEPTH", "32"))
+BUSY_RETRY_AFTER_SECONDS = 1
+SATURATED_STREAM_DELAY = 0.05
+compute_pool = BoundedExecutor(COMPUTE_WORKERS, COMPUTE_QUEUE_DEPTH)
+
+# Long-running analyses run as jobs that clients poll for progress. Beyond
+# MAX_PENDING_JOBS pending or running jobs, new ones get 429 instead of queueing.
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", "16"))
+JOBS_RETRY_AFTER_SECONDS = 10
+jobs = JobRegistry(max_active=MAX_PENDING_JOBS)
+
+# ML job results keyed by a hash of the input data and job parameters; the
+# key changes with the data, so reloads need not clear it
+ml_job_cache = LRUCache(maxsize=32)
+
+# Partitioned Parquet dataset with district-level, monthly capacity
+REGION_DATA_DIR = os.environ.get("REGION_DATA_DIR")
+
+# Hyperparameters for train_comprehensive_ml_models (part of the artifact key)
+ML_PARAMS = {'n_clusters': 4}
+
+# Geometry only changes on reload, so clients may reuse it for a day
+GEOMETRY_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+# Serialized /api/states/{state_name} payloads keyed by (state, data version)
+state_detail_cache = LRUCache(maxsize=256)
+
+# Serialized district / time-series payloads keyed by query and data version
+region_cache = LRUCache(maxsize=512)
+
+# Rescored views (scores, ranks, query and scenario indexes) keyed by quantized weights
+weighting_cache = LRUCache(maxsize=64)
+
+# Filtered / paginated /api/states pages keyed by query and data version
+states_query_cache = LRUCache(maxsize=512)
+
+# Serialized k-NN graphs keyed by (space, k, data version)
+similarity_graph_cache = LRUCache(maxsize=8)
+
+# Similarity space -> startup stage that provides its coordinates
+SIMILARITY_SPACES = {'scores': 'scores', 'pca': 'ml'}
 
 # Pydantic models
 class StateScore(BaseModel):
@@ -59,18 +169,10 @@ class StateScore(BaseModel):
     wind_score: float
     small_hydro_score: float
     bio_score: float
-    cluster: int
-    cluster_name: str
-    is_outlier: bool
-
-class MLInsights(BaseModel):
-    kmeans_cluster: str
-    gmm_confidence: str
-    gmm_probability: float
-    is_outlier: bool
-    outlier_score: float
-    pca1: float
-    pca2: float
+    # None until the 'ml' startup stage has finished
+    cluster: Optional[int] = None
+    cluster_name: Optional[str] = None
+    is_outlier: Optional[bool] = None
 
 class ScenarioRequest(BaseModel):
     state: str
@@ -79,8 +181,22 @@ class ScenarioRequest(BaseModel):
     delta_wind: float
     delta_hydro: float
     delta_bio: float
+    # Comma-separated string, list of 4 numbers or 'recommended'; default equal weights
+    weights: Optional[Union[List[float], str]] = None
+    # Also score the changed state with the IsolationForest (~11 ms); otherwise
+    # ml.outlier_score / ml.is_outlier are null
+    outliers: bool = False
+
+class ScenarioUpdate(BaseModel):
+    """One slider update on a /ws/scenario session (state is fixed per session)"""
+    seq: Optional[int] = None
+    mode: str = 'mw'
+    delta_solar: float = 0.0
+    delta_wind: float = 0.0
+    delta_hydro: float = 0.0
+    delta_bio: float = 0.0
 
-class ScenarioResponse(BaseModel):
+class ScenarioDelta(BaseModel):
     base_score: float
     new_score: float
     delta_score: float
@@ -88,20 +204,99 @@ class ScenarioResponse(BaseModel):
     new_rank: int
     delta_rank: int
 
-def initialize_data():
-    """Initialize and cache all data"""
-    global cached_data
-    
-    if cached_data:
-        return cached_data
-    
+class RankShift(BaseModel):
+    state: str
+    base_rank: int
+    new_rank: int
+
+class ScenarioML(BaseModel):
+    """Fitted-model view of the scenario state; fields of models missing from the cache are null,
+    as are outlier_score / is_outlier unless the request set `outliers`"""
+    cluster: Optional[int] = None
+    cluster_name: Optional[str] = None
+    base_cluster: Optional[int] = None
+    cluster_changed: Optional[bool] = None
+    gmm_cluster: Optional[int] = None
+    gmm_probabilities: Optional[List[float]] = None
+    gmm_confidence: Optional[float] = None
+    base_gmm_confidence: Optional[float] = None
+    outlier_score: Optional[float] = None
+    base_outlier_score: Optional[float] = None
+    is_outlier: Optional[bool] = None
+    base_is_outlier: Optional[bool] = None
+
+class ScenarioResponse(ScenarioDelta):
+    rank_shifts: List[RankShift] = []
+    # None until the 'ml' stage is ready, and on /ws/scenario unless requested
+    ml: Optional[ScenarioML] = None
+
+class BatchScenarioRequest(BaseModel):
+    scenarios: List[ScenarioRequest]
+
+class BatchScenarioResult(ScenarioDelta):
+    state: str
+    ml: Optional[ScenarioML] = None
+
+class BatchScenarioResponse(BaseModel):
+    results: List[BatchScenarioResult]
+
+MAX_BATCH_SCENARIOS = 5000
+
+class SensitivityRequest(BaseModel):
+    samples: int = 2000
+    # Dirichlet concentration around the default weights; 0 samples the whole simplex
+    weight_concentration: float = 50.0
+    # Std. dev. of multiplicative log-normal noise on each state's capacities
+    capacity_noise: float = 0.1
+    interval: float = 0.9
+    chunk_size: int = 1000
+    # Results are reproducible for a given (seed, chunk_size)
+    seed: Optional[int] = None
+    background: bool = True
+
+class OptimizeRequest(BaseModel):
+    state: str
+    target_rank: Optional[int] = None
+    target_score: Optional[float] = None
+    # Per-resource cost of adding 1 MW (solar, wind, hydro, bio); default 1.0 each
+    costs: Optional[Dict[str, float]] = None
+    # Per-resource cap on MW added; default DEFAULT_MAX_ADD_MW, 0 excludes a resource
+    max_add_mw: Optional[Dict[str, float]] = None
+    weights: Optional[Union[List[float], str]] = None
+    budget_ms: int = 200
+    max_options: int = 12
+    seed: Optional[int] = None
+
+class MLJobRequest(BaseModel):
+    # 'recluster': KMeans/GMM over chosen features; 'retrain': the full startup pipeline
+    task: str = 'recluster'
+    # One cluster count or several to compare, e.g. [3, 4, 5, 6, 7, 8]
+    n_clusters: Union[int, List[int]] = 4
+    # Recluster only; defaults to ml_jobs.DEFAULT_FEATURES
+    features: Optional[List[str]] = None
+    seed: int = 42
+
+DEFAULT_MAX_ADD_MW = 20000.0
+MAX_OPTIMIZE_BUDGET_MS = 2000
+
+MAX_SENSITIVITY_SAMPLES = 100000
+MAX_SYNC_SENSITIVITY_SAMPLES = 5000
+MAX_SENSITIVITY_CHUNK = 10000
+
+def load_state_tables():
+    """Read capacities and geography from SQLite and score the baseline"""
     # Initialize database
-    conn = bootstrap_db(DB_PATH, DATA_DIR)
+    with metrics.span('bootstrap_db'):
+        conn = bootstrap_db(DB_PATH, DATA_DIR)
     
     # Load data
-    installed = fetch_installed_capacity(conn)
-    geography = fetch_geography(conn)
-    
+    with metrics.span('fetch_tables'):
+        installed = fetch_installed_capacity(conn)
+        geography = fetch_geography(conn)
+    return score_state_tables(installed, geography)
+
+def score_state_tables(installed, geography):
+    """Merge geography into the capacity table and score the baseline"""
     # Merge geography
     df = installed.merge(geography, on="state", how="left")
     for flag in ["coastal", "arid_desert", "mountain_himalayan", "high_agri_biomass"]:
@@ -112,18 +307,122 @@ def initialize_data():
     
     # Compute baseline scores
     bounds = compute_baseline_bounds(installed)
-    baseline_scored, weights = compute_scores(installed, bounds, 0.25, 0.25, 0.25, 0.25)
+    with metrics.span('compute_scores'):
+        baseline_scored, weights = compute_scores(installed, bounds, *DEFAULT_WEIGHTS)
+    
+    tables = {
+        'installed': installed,
+        'geography': geography,
+        'df': df,
+        'baseline_scored': baseline_scored
+    }
+    return tables, {'weights': weights}
+
+def build_score_snapshot(force=False):
+    """Load the state tables and derive everything score endpoints need"""
+    if SHARED_DATA_DIR:
+        # One worker loads and publishes; the others map the same block. The
+        # stamp is read under the loader lock, after the first load has
+        # bootstrapped the database
+        shared = shared_table.attach_or_publish(
+            SHARED_DATA_DIR, lambda: shared_table.source_stamp(DB_PATH), load_state_tables,
+            force=force
+        )
+        tables, meta = shared.frames(), shared.meta
+        shared_version = shared.version
+        source = shared.manifest['source']
+    else:
+        tables, meta = load_state_tables()
+        shared_version = None
+        source = shared_table.source_stamp(DB_PATH)
+    
+    installed = tables['installed']
+    geography = tables['geography']
+    df = tables['df']
+    baseline_scored = tables['baseline_scored']
+    weights = meta['weights']
+    bounds = compute_baseline_bounds(installed)
     
-    # Train ML models
-    ml_results = train_comprehensive_ml_models(baseline_scored, n_clusters=4)
-    pca_components, explained_variance, pca_loadings, pca_model, pca_scaler = perform_pca_analysis(baseline_scored)
+    # Vectorized scenario scoring against the baseline
+    scenario_engine = ScenarioEngine(installed, bounds, baseline_scored)
+    
+    # Component basis for reweighting, plus each state's geography-recommended weights
+    geo_rows = df.set_index('state').loc[baseline_scored['state']].reset_index()
+    weight_model = WeightModel(
+        installed, bounds, baseline_scored, DEFAULT_WEIGHTS,
+        [quantize_weights(recommended_weights(row)) for row in geo_rows.to_dict('records')]
+    )
+    
+    # Load GeoJSON
+    with metrics.span('load_geojson'):
+        with open(os.path.join(DATA_DIR, "india_states.geojson"), "r", encoding="utf-8") as f:
+            geojson = json.load(f)
+    
+    # Name-keyed positions into every cached structure
+    state_index = StateIndex(baseline_scored, df, installed, to_feature_collection(geojson))
+    
+    # Simplified, quantized and precompressed map geometry per detail level
+    with metrics.span('build_geometry'):
+        geometry_payloads = {
+            key: CachedPayload(content, precompress=True, cache_control=GEOMETRY_CACHE_CONTROL)
+            for key, content in build_geometry_levels(geojson).items()
+        }
+    
+    return {
+        'source': source,
+        'shared_version': shared_version,
+        'installed': installed,
+        'geography': geography,
+        'df': df,
+        'bounds': bounds,
+        'baseline_scored': baseline_scored,
+        'geojson': geojson,
+        'geometry_payloads': geometry_payloads,
+        'weights': weights,
+        'scenario_engine': scenario_engine,
+        'weight_model': weight_model,
+        'state_index': state_index,
+        # Nearest states by standardized component scores ('pca' added with the ML stage)
+        'similarity': {'scores': NeighbourGraph(standardized(baseline_scored))},
+        # Opened lazily per query; nothing is read into memory here
+        'region_store': open_region_store(REGION_DATA_DIR)
+    }
+
+def fit_ml_artifacts(baseline_scored):
+    """Train ML models and PCA over the baseline scores"""
+    with metrics.span('train_comprehensive_ml_models'):
+        ml_results = train_comprehensive_ml_models(baseline_scored, **ML_PARAMS)
+    with metrics.span('perform_pca_analysis'):
+        pca_components, explained_variance, pca_loadings, pca_model, pca_scaler = perform_pca_analysis(baseline_scored)
     cluster_stats = get_cluster_statistics(
         baseline_scored, 
         ml_results['kmeans']['labels'], 
         ml_results['kmeans']['names']
     )
     
-    # Add ML info to baseline
+    return {
+        'ml_results': ml_results,
+        'pca_components': pca_components,
+        'explained_variance': explained_variance,
+        'pca_loadings': pca_loadings,
+        'pca_model': pca_model,
+        'pca_scaler': pca_scaler,
+        'cluster_stats': cluster_stats
+    }
+
+def add_ml_models(data):
+    """Return a copy of a score snapshot with ML models and columns added"""
+    baseline_scored = data['baseline_scored']
+    
+    # Load fitted models from disk, training only on a cache miss
+    artifacts, _ = model_cache.load_or_train(
+        baseline_scored, ML_PARAMS, lambda: fit_ml_artifacts(baseline_scored)
+    )
+    ml_results = artifacts['ml_results']
+    pca_components = artifacts['pca_components']
+    
+    # Add ML info to a copy of the baseline; readers keep the old snapshot
+    baseline_scored = baseline_scored.copy(deep=False)
     baseline_scored['cluster'] = ml_results['kmeans']['labels']
     baseline_scored['cluster_name'] = baseline_scored['cluster'].map(ml_results['kmeans']['names'])
     baseline_scored['is_outlier'] = ml_results['isolation_forest']['labels'] == -1
@@ -131,32 +430,243 @@ def initialize_data():
     baseline_scored['pca1'] = pca_components[:, 0]
     baseline_scored['pca2'] = pca_components[:, 1]
     
-    # Load GeoJSON
-    with open(os.path.join(DATA_DIR, "india_states.geojson"), "r", encoding="utf-8") as f:
-        geojson = json.load(f)
-    
-    cached_data = {
-        'conn': conn,
-        'installed': installed,
-        'geography': geography,
-        'df': df,
-        'bounds': bounds,
+    return {
+        **data,
         'baseline_scored': baseline_scored,
         'ml_results': ml_results,
         'pca_components': pca_components,
-        'explained_variance': explained_variance,
-        'pca_loadings': pca_loadings,
-        'cluster_stats': cluster_stats,
-        'geojson': geojson,
-        'weights': weights
+        'explained_variance': artifacts['explained_variance'],
+        'pca_loadings': artifacts['pca_loadings'],
+        'cluster_stats': artifacts['cluster_stats'],
+        'similarity': {**data['similarity'], 'pca': NeighbourGraph(pca_components[:, :2])},
+        # Cluster / outlier predictions for scenario results, from the fitted models
+        'scenario_predictor': ScenarioPredictor.from_results(ml_results)
     }
+
+def publish_snapshot(data):
+    """Serialize responses for a snapshot and swap it in as cached_data.
+    
+    Snapshots are never mutated after publishing: requests that already hold
+    the previous dict keep a consistent view until they finish.
+    """
+    global cached_data, data_version
     
+    builders = RESPONSE_BUILDERS if 'ml_results' in data else SCORE_RESPONSE_BUILDERS
+    with init_lock:
+        data_version += 1
+        data = {**data, 'version': data_version}
+        
+        # Sorted indexes for filtered / paginated /api/states queries
+        data['state_table'] = StateTable(states_frame(data))
+        
+        # Score order indexes, merged with the previous snapshot's where unchanged
+        previous = cached_data.get('leaderboard')
+        data['leaderboard'] = (previous.updated(data['baseline_scored']) if previous is not None
+                               else Leaderboard(data['baseline_scored']))
+        
+        # Serialize read-only responses once per data load
+        with metrics.span('build_payloads'):
+            data['responses'] = build_payloads(builders, data)
+        
+        cached_data = data
+        return cached_data
+
+def initialize_data():
+    """Initialize and cache score data (the 'scores' stage)"""
+    with init_lock:
+        if cached_data:
+            return cached_data
+        return publish_snapshot(build_score_snapshot())
+
+def train_ml_models():
+    """Train ML models over the cached scores (the 'ml' stage)"""
+    return publish_snapshot(add_ml_models(initialize_data()))
+
+def load_stages():
+    """Run the startup stages in order, then warm per-state caches"""
+    stages.run('scores', initialize_data)
+    data = stages.run('ml', train_ml_models)
+    warm_state_details(data)
+    
+    if DATA_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_data_source, name="data-watcher", daemon=True).start()
+
+def reload_data(force=True):
+    """Rebuild every stage from the database and swap the result in atomically"""
+    if not reload_lock.acquire(blocking=False):
+        return None
+    try:
+        data = reloads.run('reload', lambda: add_ml_models(build_score_snapshot(force=force)))
+        data = publish_snapshot(data)
+        
+        # Per-state payloads for older versions can no longer be served
+        state_detail_cache.clear()
+        region_cache.clear()
+        states_query_cache.clear()
+        weighting_cache.clear()
+        similarity_graph_cache.clear()
+        warm_state_details(data)
+        return data
+    finally:
+        reload_lock.release()
+
+def source_changed(data):
+    """True if the DB file or the shared table moved past this snapshot"""
+    stamp = shared_table.source_stamp(DB_PATH)
+    if SHARED_DATA_DIR:
+        # An unknown source keeps the published table (see attach_or_publish)
+        if stamp is not None and stamp != data.get('source'):
+            return True
+        return shared_table.current_version(SHARED_DATA_DIR) != data.get('shared_version')
+    return stamp != data.get('source')
+
+def watch_data_source():
+    """Poll for new capacity data and reload when it changes"""
+    while True:
+        time.sleep(DATA_WATCH_INTERVAL)
+        try:
+            if cached_data and source_changed(cached_data):
+                # Not forced: in shared mode this attaches to a newer table if one exists
+                reload_data(force=False)
+        except Exception:
+            logger.exception("Data source watcher failed to reload")
+
+def require_stage(stage):
+    """Return cached data once `stage` is ready, else 503 with Retry-After"""
+    if not stages.is_ready(stage):
+        status = stages.status(stage)
+        detail = f"'{stage}' data is not ready ({status['status']})"
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
     return cached_data
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize data on startup"""
-    initialize_data()
+    """Load data in the background so the server accepts requests immediately"""
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(background_executor, load_stages)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop compute threads and analysis worker processes"""
+    compute_pool.shutdown()
+    if analysis_pool is not None:
+        analysis_pool.shutdown(wait=False, cancel_futures=True)
+
+def get_analysis_pool():
+    """Process pool for analyses; spawned workers inherit our import path"""
+    global analysis_pool
+    with analysis_pool_lock:
+        if analysis_pool is None:
+            analysis_pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=sensitivity.init_worker,
+                initargs=(list(sys.path),)
+            )
+        return analysis_pool
+
+def discard_analysis_pool(broken):
+    """Drop a pool whose workers died so the next get_analysis_pool() starts fresh ones"""
+    global analysis_pool
+    with analysis_pool_lock:
+        if analysis_pool is broken:
+            analysis_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def run_on_analysis_pool(func):
+    """func(pool) on the analysis pool. A dead worker (OOM kill, crash) breaks
+    the whole pool, so it is replaced and func retried once; if that fails
+    too the job fails, but the next one still gets a fresh pool."""
+    pool = get_analysis_pool()
+    try:
+        return func(pool)
+    except BrokenProcessPool:
+        logger.warning("Analysis worker died; restarting the pool and retrying")
+        discard_analysis_pool(pool)
+    pool = get_analysis_pool()
+    try:
+        return func(pool)
+    except BrokenProcessPool:
+        discard_analysis_pool(pool)
+        raise
+
+async def offload(func, *args):
+    """Run blocking work on the compute pool; 429 when it is saturated"""
+    try:
+        return await compute_pool.run(metrics.follow(func), *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=429,
+            detail="Server is busy, retry shortly",
+            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)}
+        )
+
+async def cached_offload(cache, key, builder):
+    """Cache hit on the event loop; on a miss, build on the compute pool"""
+    value = cache.lookup(key)
+    if value is None:
+        value = await offload(cache.get_or_build, key, builder)
+    return value
+
+@app.get("/api/health/ready")
+async def get_readiness():
+    """Report per-stage startup readiness"""
+    snapshot = stages.snapshot()
+    ready = snapshot['scores']['status'] == 'ready'
+    return FastJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "fully_ready": all(stage['status'] == 'ready' for stage in snapshot.values()),
+            "data_version": data_version,
+            "shared_version": cached_data.get('shared_version'),
+            "stages": snapshot,
+            "compute": compute_pool.stats()
+        }
+    )
+
+def require_admin(token):
+    """Reject admin calls unless ADMIN_TOKEN is configured and matches"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    # Constant-time comparison; bytes, since compare_digest rejects non-ASCII str
+    if not hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/api/admin/reload", status_code=202)
+async def trigger_reload(x_admin_token: Optional[str] = Header(None)):
+    """Rebuild the dataset from the database in the background"""
+    global pending_reload
+    require_admin(x_admin_token)
+    
+    # Join a reload that is queued or running instead of queuing another
+    # (the check and the assignment both run on the event loop)
+    queued = pending_reload is not None and not pending_reload.done()
+    if queued or reload_lock.locked():
+        return {
+            "status": "running" if reload_lock.locked() else "queued",
+            "coalesced": True,
+            "data_version": data_version
+        }
+    
+    loop = asyncio.get_running_loop()
+    pending_reload = loop.run_in_executor(background_executor, reload_data)
+    return {"status": "started", "coalesced": False, "data_version": data_version}
+
+@app.get("/api/admin/reload")
+async def get_reload_status(x_admin_token: Optional[str] = Header(None)):
+    """Get the status of the last reload"""
+    require_admin(x_admin_token)
+    return {
+        "running": reload_lock.locked(),
+        "data_version": data_version,
+        "shared_version": cached_data.get('shared_version'),
+        "last_reload": reloads.status('reload')
+    }
 
 @app.get("/")
 async def root():
@@ -166,61 +676,146 @@ async def root():
         "docs": "/docs"
     }
 
-@app.get("/api/states", response_model=List[StateScore])
-async def get_all_states():
-    """Get all states with scores and rankings"""
-    data = initialize_data()
+# Column dtypes of the /api/states records, taken from the response model
+STATE_FIELDS = list(StateScore.model_fields)
+STATE_FIELD_TYPES = {
+    name: field.annotation for name, field in StateScore.model_fields.items()
+    if field.annotation in (int, float)
+}
+STATE_ML_FIELD_TYPES = {'cluster': int, 'cluster_name': str, 'is_outlier': bool}
+
+def states_frame(data):
+    """Scored states with exactly the StateScore columns and dtypes"""
     baseline = data['baseline_scored']
     
-    states = []
-    for _, row in baseline.iterrows():
-        states.append(StateScore(
-            state=row['state'],
-            rank=int(row['rank']),
-            final_score=float(row['final_score']),
-            solar_mw=float(row['solar_mw']),
-            wind_mw=float(row['wind_mw']),
-            small_hydro_mw=float(row['small_hydro_mw']),
-            bio_power_mw=float(row['bio_power_mw']),
-            large_hydro_mw=float(row['large_hydro_mw']),
-            total_mw=float(row['total_mw']),
-            solar_score=float(row['solar_score']),
-            wind_score=float(row['wind_score']),
-            small_hydro_score=float(row['small_hydro_score']),
-            bio_score=float(row['bio_score']),
-            cluster=int(row['cluster']),
-            cluster_name=str(row['cluster_name']),
-            is_outlier=bool(row['is_outlier'])
-        ))
-    
+    states = baseline.reindex(columns=STATE_FIELDS).astype(STATE_FIELD_TYPES)
+    if 'ml_results' in data:
+        states = states.astype(STATE_ML_FIELD_TYPES)
+    else:
+        states[list(STATE_ML_FIELD_TYPES)] = None
     return states
 
-@app.get("/api/states/{state_name}")
-async def get_state_details(state_name: str):
-    """Get detailed information for a specific state"""
-    data = initialize_data()
+def build_states_payload(data):
+    """Build all states with scores and rankings"""
+    return frame_records(states_frame(data))
+
+def weighted_view(data, weights):
+    """The snapshot rescored under custom weights, memoized per quantized vector.
+    
+    `weights` is a parse_weights() key; None or the default weights return
+    the snapshot itself.
+    """
+    if weights is None or weights == quantize_weights(DEFAULT_WEIGHTS):
+        return data
+    return weighting_cache.get_or_build(
+        (weights, data['version']), lambda: build_weighted_view(data, weights)
+    )
+
+def build_weighted_view(data, weights):
+    """Reweight with one matrix-vector product; rank and index the result"""
+    model = data['weight_model']
+    scores = model.final_scores(weights)
+    baseline = data['baseline_scored'].assign(
+        final_score=scores,
+        rank=pd.Series(scores).rank(ascending=False, method='min').astype(int).to_numpy()
+    )
+    
+    view = {**data, 'baseline_scored': baseline, 'weights': weights}
+    view['state_table'] = StateTable(states_frame(view))
+    # The NumPy scorer is linear in the weights; otherwise rescore with compute_scores
+    view['scenario_engine'] = ScenarioEngine(
+        data['installed'], data['bounds'], baseline, weights=model.row_weights(weights),
+        vectorized=model.linear
+    )
+    return view
+
+def request_weights(spec):
+    try:
+        return parse_weights(spec)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/weights")
+async def get_weights():
+    """Get the default weights and each state's geography-recommended weights"""
+    data = require_stage('scores')
+    model = data['weight_model']
+    return {
+        "default": dict(zip(WEIGHT_NAMES, quantize_weights(DEFAULT_WEIGHTS))),
+        "recommended": [
+            {"state": state, **dict(zip(WEIGHT_NAMES, weights))}
+            for state, weights in zip(model.states.tolist(), model.recommended.tolist())
+        ]
+    }
+
+@app.get("/api/states", response_model=List[StateScore])
+async def get_all_states(
+    request: Request,
+    fields: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None,
+    cluster: Optional[int] = None,
+    is_outlier: Optional[bool] = None,
+    min_score: Optional[float] = None,
+    weights: Optional[str] = None
+):
+    """Get states with scores and rankings, optionally filtered, sorted and paged.
+    
+    `weights` rescales the components ("0.4,0.3,0.15,0.15" or "recommended").
+    Paged responses carry X-Total-Count and, if more rows follow, X-Next-Cursor.
+    """
+    weights = request_weights(weights)
+    query = {
+        'fields': fields, 'sort': sort, 'order': order, 'limit': limit, 'offset': offset,
+        'cursor': cursor, 'cluster': cluster, 'is_outlier': is_outlier, 'min_score': min_score,
+        'weights': weights
+    }
+    if all(value is None for value in query.values()):
+        data = require_stage('scores')
+        return data['responses']['states'].response(request)
+    
+    # Cluster and outlier fields only exist once the models are trained
+    ml_query = cluster is not None or is_outlier is not None or (sort or '') in STATE_ML_FIELD_TYPES
+    data = require_stage('ml' if ml_query else 'scores')
+    
+    def build():
+        view = weighted_view(data, weights)
+        records, total, next_cursor = view['state_table'].query(
+            fields=fields, sort=sort or 'rank', order=order or 'asc', limit=limit,
+            offset=offset or 0, cursor=cursor,
+            filters={'cluster': cluster, 'is_outlier': is_outlier,
+                     'final_score': ('>=', min_score) if min_score is not None else None}
+        )
+        return CachedPayload(records), total, next_cursor
+    
+    try:
+        payload, total, next_cursor = await cached_offload(
+            states_query_cache, (*query.values(), data['version']), build
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    
+    response = payload.response(request)
+    response.headers['X-Total-Count'] = str(total)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def build_state_detail(data, entry):
+    """Build detailed information for a specific state"""
     baseline = data['baseline_scored']
     df = data['df']
-    ml_results = data['ml_results']
-    
-    # Find state
-    state_data = baseline[baseline['state'] == state_name]
-    if state_data.empty:
-        raise HTTPException(status_code=404, detail="State not found")
     
-    row = state_data.iloc[0]
-    state_idx = state_data.index[0]
+    row = baseline.iloc[entry.baseline_pos]
     
     # Get geography
-    geo_data = df[df['state'] == state_name].iloc[0]
+    geo_data = df.iloc[entry.df_pos]
     
-    # Get ML insights
-    gmm_conf = get_gmm_confidence(ml_results['gmm']['probabilities'], state_idx)
-    outlier_info = is_outlier(
-        ml_results['isolation_forest']['labels'],
-        ml_results['isolation_forest']['scores'],
-        state_idx
-    )
+    # Get ML insights (None until the 'ml' stage is ready)
+    ml_insights = build_ml_insights(data, entry, row) if 'ml_results' in data else None
     
     # Get recommendations
     recommendations = generate_recommendations(
@@ -228,22 +823,22 @@ async def get_state_details(state_name: str):
     )
     
     return {
-        "state": state_name,
-        "score": float(row['final_score']),
-        "rank": int(row['rank']),
+        "state": entry.state,
+        "score": row['final_score'],
+        "rank": row['rank'],
         "capacity": {
-            "solar": float(row['solar_mw']),
-            "wind": float(row['wind_mw']),
-            "small_hydro": float(row['small_hydro_mw']),
-            "bio_power": float(row['bio_power_mw']),
-            "large_hydro": float(row['large_hydro_mw']),
-            "total": float(row['total_mw'])
+            "solar": row['solar_mw'],
+            "wind": row['wind_mw'],
+            "small_hydro": row['small_hydro_mw'],
+            "bio_power": row['bio_power_mw'],
+            "large_hydro": row['large_hydro_mw'],
+            "total": row['total_mw']
         },
         "scores": {
-            "solar": float(row['solar_score']),
-            "wind": float(row['wind_score']),
-            "small_hydro": float(row['small_hydro_score']),
-            "bio": float(row['bio_score'])
+            "solar": row['solar_score'],
+            "wind": row['wind_score'],
+            "small_hydro": row['small_hydro_score'],
+            "bio": row['bio_score']
         },
         "geography": {
             "dominant": str(geo_data['dominant_geo']),
@@ -252,31 +847,177 @@ async def get_state_details(state_name: str):
             "mountain": bool(geo_data['mountain_himalayan']),
             "high_biomass": bool(geo_data['high_agri_biomass'])
         },
-        "ml_insights": {
-            "cluster": str(row['cluster_name']),
-            "cluster_id": int(row['cluster']),
-            "gmm_confidence": gmm_conf['confidence'],
-            "gmm_probability": float(gmm_conf['probability']),
-            "is_outlier": bool(outlier_info['is_outlier']),
-            "outlier_score": float(outlier_info['normalized_score']),
-            "pca": {
-                "pc1": float(row['pca1']),
-                "pc2": float(row['pca2'])
-            }
-        },
+        "ml_insights": ml_insights,
         "recommendations": recommendations
     }
 
+def build_ml_insights(data, entry, row):
+    """Build the ML section of a state's details"""
+    ml_results = data['ml_results']
+    gmm_conf = get_gmm_confidence(ml_results['gmm']['probabilities'], entry.ml_pos)
+    outlier_info = is_outlier(
+        ml_results['isolation_forest']['labels'],
+        ml_results['isolation_forest']['scores'],
+        entry.ml_pos
+    )
+    
+    return {
+        "cluster": row['cluster_name'],
+        "cluster_id": row['cluster'],
+        "gmm_confidence": gmm_conf['confidence'],
+        "gmm_probability": gmm_conf['probability'],
+        "is_outlier": outlier_info['is_outlier'],
+        "outlier_score": outlier_info['normalized_score'],
+        "pca": {
+            "pc1": row['pca1'],
+            "pc2": row['pca2']
+        }
+    }
+
+async def cached_state_detail(data, entry):
+    """Serialized state detail, memoized per data version"""
+    return await cached_offload(
+        state_detail_cache, (entry.state, data['version']),
+        lambda: CachedPayload(build_state_detail(data, entry))
+    )
+
+def warm_state_details(data):
+    """Precompute detail payloads for this data version, as many as the cache holds"""
+    entries = itertools.islice(data['state_index'].entries.values(), state_detail_cache.maxsize)
+    for entry in entries:
+        state_detail_cache.warm(
+            (entry.state, data['version']),
+            lambda: CachedPayload(build_state_detail(data, entry))
+        )
+
+@app.get("/api/states/{state_name}")
+async def get_state_details(state_name: str, request: Request):
+    """Get detailed information for a specific state"""
+    data = require_stage('scores')
+    
+    # Find state
+    entry = data['state_index'].get(state_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    
+    return (await cached_state_detail(data, entry)).response(request)
+
+def require_region_state(data, state_name):
+    """Region store and state name for district / time-series queries, else 404"""
+    store = data.get('region_store')
+    if store is None:
+        raise HTTPException(status_code=404, detail="District-level data is not available")
+    
+    entry = data['state_index'].get(state_name)
+    state = entry.state if entry is not None else state_name
+    if not store.has_state(state):
+        raise HTTPException(status_code=404, detail="State not found")
+    return store, state
+
+async def cached_region_payload(data, key, builder):
+    """Serialized region query result, memoized per data version"""
+    try:
+        return await cached_offload(region_cache, (*key, data['version']), lambda: CachedPayload(builder()))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/districts/{state_name}")
+async def get_districts(state_name: str, request: Request, period: Optional[str] = None,
+                        fields: Optional[str] = None):
+    """Get district-level capacity for a state in one period (latest by default)"""
+    data = require_stage('scores')
+    store, state = require_region_state(data, state_name)
+    
+    def build():
+        metrics = store.select_metrics(fields)
+        resolved, districts = store.districts(state, period=period, metrics=metrics)
+        return {"state": state, "period": resolved, "districts": districts}
+    
+    payload = await cached_region_payload(data, ('districts', state, period, fields), build)
+    return payload.response(request)
+
+@app.get("/api/timeseries/{state_name}")
+async def get_timeseries(state_name: str, request: Request, start: Optional[str] = None,
+                         end: Optional[str] = None, fields: Optional[str] = None):
+    """Get monthly state capacity totals, optionally between two YYYY-MM periods"""
+    data = require_stage('scores')
+    store, state = require_region_state(data, state_name)
+    
+    def build():
+        metrics = store.select_metrics(fields)
+        return {"state": state, "series": store.timeseries(state, start=start, end=end, metrics=metrics)}
+    
+    payload = await cached_region_payload(data, ('timeseries', state, start, end, fields), build)
+    return payload.response(request)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the state detail cache"""
+    return {
+        "data_version": data_version,
+        "state_details": state_detail_cache.stats(),
+        "regions": region_cache.stats(),
+        "state_queries": states_query_cache.stats(),
+        "weightings": weighting_cache.stats(),
+        "ml_jobs": ml_job_cache.stats(),
+        "similarity_graphs": similarity_graph_cache.stats()
+    }
+
+def collect_app_metrics():
+    """Cache, startup stage and compute pool state for /metrics, read at scrape time"""
+    caches = {
+        "state_details": state_detail_cache,
+        "regions": region_cache,
+        "state_queries": states_query_cache,
+        "weightings": weighting_cache,
+        "ml_jobs": ml_job_cache,
+        "similarity_graphs": similarity_graph_cache
+    }
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+    stage_stats = {**stages.snapshot(), **reloads.snapshot()}
+    pool = compute_pool.stats()
+    return [
+        ("app_cache_hits_total", "counter", "Cache lookups served from the cache",
+         [({"cache": name}, stats["hits"]) for name, stats in cache_stats.items()]),
+        ("app_cache_misses_total", "counter", "Cache lookups that had to build the value",
+         [({"cache": name}, stats["misses"]) for name, stats in cache_stats.items()]),
+        ("app_cache_entries", "gauge", "Entries currently cached",
+         [({"cache": name}, stats["size"]) for name, stats in cache_stats.items()]),
+        ("app_stage_duration_seconds", "gauge", "Duration of the last run of each startup / reload stage",
+         [({"stage": name}, stage["seconds"]) for name, stage in stage_stats.items()
+          if stage["seconds"] is not None]),
+        ("app_stage_ready", "gauge", "1 if the stage last completed successfully",
+         [({"stage": name}, int(stage["status"] == "ready")) for name, stage in stage_stats.items()]),
+        ("app_compute_pool_pending", "gauge", "Handlers running or queued on the compute pool",
+         [({}, pool["pending"])]),
+        ("app_compute_pool_rejected_total", "counter", "Requests shed with 429 because the compute pool was full",
+         [({}, pool["rejected"])]),
+        ("app_data_version", "gauge", "Version of the published data snapshot",
+         [({}, data_version)]),
+    ]
+
+metrics.registry.add_collector(collect_app_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, span, cache and stage metrics"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/api/geojson")
-async def get_geojson():
-    """Get India states GeoJSON (TopoJSON format)"""
-    data = initialize_data()
-    return data['geojson']
+async def get_geojson(request: Request, level: str = FULL_LEVEL, format: str = 'geojson'):
+    """Get India states geometry as GeoJSON or TopoJSON at a detail level"""
+    data = require_stage('scores')
+    
+    payload = data['geometry_payloads'].get((level, format))
+    if payload is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"level must be one of {[FULL_LEVEL, *GEOMETRY_LEVELS]}, format one of ['geojson', 'topojson']"
+        )
+    return payload.response(request)
 
-@app.get("/api/ml/clusters")
-async def get_cluster_info():
-    """Get ML clustering information"""
-    data = initialize_data()
+def build_cluster_payload(data):
+    """Build ML clustering information"""
     cluster_stats = data['cluster_stats']
     ml_results = data['ml_results']
     
@@ -292,78 +1033,609 @@ async def get_cluster_info():
         "outliers": ml_results['isolation_forest']['outliers']
     }
 
-@app.get("/api/ml/pca")
-async def get_pca_data():
-    """Get PCA visualization data"""
-    data = initialize_data()
+@app.get("/api/ml/clusters")
+async def get_cluster_info(request: Request):
+    """Get ML clustering information"""
+    data = require_stage('ml')
+    return data['responses']['clusters'].response(request)
+
+def build_pca_payload(data):
+    """Build PCA visualization data"""
     baseline = data['baseline_scored']
     
-    pca_data = []
-    for _, row in baseline.iterrows():
-        pca_data.append({
-            "state": row['state'],
-            "pc1": float(row['pca1']),
-            "pc2": float(row['pca2']),
-            "cluster": int(row['cluster']),
-            "cluster_name": str(row['cluster_name']),
-            "score": float(row['final_score']),
-            "is_outlier": bool(row['is_outlier'])
-        })
+    pca_data = baseline[
+        ['state', 'pca1', 'pca2', 'cluster', 'cluster_name', 'final_score', 'is_outlier']
+    ].astype({'pca1': float, 'pca2': float, 'cluster': int, 'cluster_name': str,
+              'final_score': float, 'is_outlier': bool})
+    pca_data = pca_data.rename(columns={'pca1': 'pc1', 'pca2': 'pc2', 'final_score': 'score'})
     
     return {
-        "data": pca_data,
-        "explained_variance": [float(v) for v in data['explained_variance']],
+        "data": frame_records(pca_data),
+        "explained_variance": data['explained_variance'],
         "loadings": data['pca_loadings'].to_dict()
     }
 
+@app.get("/api/ml/pca")
+async def get_pca_data(request: Request):
+    """Get PCA visualization data"""
+    data = require_stage('ml')
+    return data['responses']['pca'].response(request)
+
 @app.post("/api/scenario", response_model=ScenarioResponse)
 async def run_scenario(request: ScenarioRequest):
     """Run what-if scenario analysis"""
-    from scoring import apply_whatif, scenario_delta
+    data = require_stage('scores')
     
-    data = initialize_data()
-    installed = data['installed']
-    bounds = data['bounds']
-    baseline = data['baseline_scored']
+    entry = data['state_index'].get(request.state)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    
+    weights = request_weights(request.weights)
+    
+    def rescore():
+        # Rescore only this state against the baseline order index
+        engine = weighted_view(data, weights)['scenario_engine']
+        return rescore_scenario(
+            data, engine, entry, request.mode == 'percent',
+            [request.delta_solar, request.delta_wind, request.delta_hydro, request.delta_bio],
+            outliers=request.outliers
+        )
+    
+    return ScenarioResponse(**await offload(rescore))
+
+def rescore_scenario(data, engine, entry, percent, deltas, outliers=False, ml=True):
+    """engine.rescore for one state, plus (with `ml`) cluster and (with
+    `outliers`) outlier predictions once models are loaded"""
+    predictor = data.get('scenario_predictor') if ml else None
+    if predictor is None:
+        return engine.rescore(entry.installed_pos, percent, deltas)
+    result = engine.rescore(entry.installed_pos, percent, deltas, features=predictor.features)
+    predictions = predictor.predict([result.pop('features')], [entry.ml_pos], outliers=outliers)
+    result['ml'] = frame_records(predictions)[0]
+    return result
+
+def resource_vector(values, default, name):
+    """Per-resource values in RESOURCE_KEYS order from an optional dict"""
+    values = values or {}
+    unknown = set(values) - set(RESOURCE_KEYS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name} keys: {', '.join(sorted(unknown))} (expected {', '.join(RESOURCE_KEYS)})"
+        )
+    vector = [float(values.get(key, default)) for key in RESOURCE_KEYS]
+    if any(v < 0 for v in vector):
+        raise HTTPException(status_code=400, detail=f"{name} must be non-negative")
+    return vector
+
+# Resource names get_quick_win_scenario may use, mapped to delta positions
+QUICK_WIN_RESOURCES = {
+    'solar': 0, 'wind': 1, 'hydro': 2, 'small_hydro': 2, 'bio': 3, 'bio_power': 3
+}
+
+def quick_win_deltas(data, entry):
+    """The recommendations module's quick win, and its deltas if it names one resource"""
+    row = data['baseline_scored'].iloc[entry.baseline_pos]
+    quick_win = get_quick_win_scenario(row, data['bounds'], data['df'].iloc[entry.df_pos])
+    if not isinstance(quick_win, dict):
+        return None, None
+    position = QUICK_WIN_RESOURCES.get(str(quick_win.get('resource', '')).lower())
+    try:
+        amount = float(quick_win.get('delta_mw'))
+    except (TypeError, ValueError):
+        return quick_win, None
+    if position is None:
+        return quick_win, None
+    deltas = np.zeros(len(RESOURCE_KEYS))
+    deltas[position] = amount
+    return quick_win, deltas
+
+def run_goal_seek(data, entry, weights, costs, max_add, request):
+    """Goal-seek response for one state (CPU-bound; runs on the compute pool)"""
+    engine = weighted_view(data, weights)['scenario_engine']
+    threshold = target_threshold(engine, entry.installed_pos, request.target_rank, request.target_score)
+    quick_win, quick_deltas = quick_win_deltas(data, entry)
+    
+    search = GoalSeek(engine, entry.installed_pos, threshold, costs, max_add, seed=request.seed)
+    started = time.perf_counter()
+    extra = [quick_deltas] if quick_deltas is not None else []
+    reason = search.run(request.budget_ms / 1000.0, extra_candidates=extra)
+    
+    best = search.options(search.best[1], search.best[2])[0] if search.best else None
+    quick = (search.options(quick_deltas, search.evaluate([quick_deltas]))[0]
+             if quick_deltas is not None else None)
+    return {
+        "state": entry.state,
+        "base_score": float(engine.base_scores[entry.installed_pos]),
+        "base_rank": int(engine.base_ranks[entry.installed_pos]),
+        "target": {
+            "rank": request.target_rank,
+            "score": threshold if np.isfinite(threshold) else None
+        },
+        "feasible": best is not None,
+        "best": best,
+        "pareto": search.options(*search.pareto(request.max_options)),
+        "quick_win": {**quick_win, **quick} if quick is not None else quick_win,
+        "search": {
+            'evaluated': search.evaluated,
+            'elapsed_ms': (time.perf_counter() - started) * 1000,
+            'stop_reason': reason
+        }
+    }
+
+@app.post("/api/scenario/optimize")
+async def optimize_scenario(request: OptimizeRequest):
+    """Cheapest capacity additions that reach a target rank or score.
+    
+    Returns the cheapest option found, the cost/score Pareto frontier of
+    everything evaluated and the quick-win scenario, within budget_ms.
+    """
+    data = require_stage('scores')
+    
+    entry = data['state_index'].get(request.state)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    if request.target_rank is None and request.target_score is None:
+        raise HTTPException(status_code=400, detail="Provide target_rank and/or target_score")
+    if request.target_rank is not None and not 1 <= request.target_rank <= len(data['baseline_scored']):
+        raise HTTPException(status_code=400, detail="target_rank is out of range")
+    if not 1 <= request.budget_ms <= MAX_OPTIMIZE_BUDGET_MS:
+        raise HTTPException(status_code=400, detail=f"budget_ms must be between 1 and {MAX_OPTIMIZE_BUDGET_MS}")
+    if not 1 <= request.max_options <= 100:
+        raise HTTPException(status_code=400, detail="max_options must be between 1 and 100")
+    
+    costs = resource_vector(request.costs, 1.0, 'costs')
+    max_add = resource_vector(request.max_add_mw, DEFAULT_MAX_ADD_MW, 'max_add_mw')
+    weights = request_weights(request.weights)
+    
+    return await offload(run_goal_seek, data, entry, weights, costs, max_add, request)
+
+@app.websocket("/ws/scenario")
+async def scenario_stream(websocket: WebSocket, state: str, ml: bool = False):
+    """Stream what-if results for one state as the client moves sliders.
     
-    # Apply scenario
-    scenario_installed = apply_whatif(
-        installed, request.state, request.mode,
-        request.delta_solar, request.delta_wind,
-        request.delta_hydro, request.delta_bio
+    Only the newest pending update is computed: updates that arrive while a
+    result is being computed replace each other and are counted as dropped.
+    Cluster predictions run the fitted models through sklearn (~2 ms against
+    ~0.06 ms for the rescore), so results only include `ml` with ?ml=true.
+    """
+    await websocket.accept()
+    
+    if not stages.is_ready('scores'):
+        await websocket.close(code=1013, reason="Score data is still loading")
+        return
+    entry = cached_data['state_index'].get(state)
+    if entry is None:
+        await websocket.close(code=1008, reason="State not found")
+        return
+    
+    pending = {'update': None, 'dropped': 0}
+    wakeup = asyncio.Event()
+    
+    async def receive_updates():
+        while True:
+            message = await websocket.receive_text()
+            try:
+                update = ScenarioUpdate.model_validate_json(message)
+            except ValidationError as exc:
+                await websocket.send_json({"type": "error", "detail": exc.errors(include_url=False)})
+                continue
+            if pending['update'] is not None:
+                pending['dropped'] += 1
+            pending['update'] = update
+            wakeup.set()
+    
+    async def send_results():
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            update, pending['update'] = pending['update'], None
+            if update is None:
+                continue
+            
+            # Same scoring as /api/scenario (never with the IsolationForest: too
+            # slow per slider move), on the newest snapshot; positions are per
+            # snapshot, so look the state up again after a reload
+            data = cached_data
+            current = data['state_index'].get(entry.state)
+            if current is None:
+                await websocket.close(code=1008, reason="State not found")
+                return
+            def rescore():
+                return rescore_scenario(
+                    data, data['scenario_engine'], current, update.mode == 'percent',
+                    [update.delta_solar, update.delta_wind, update.delta_hydro, update.delta_bio],
+                    ml=ml
+                )
+            try:
+                result = await compute_pool.run(rescore)
+            except PoolSaturated:
+                # Retry later unless a newer update has superseded this one
+                if pending['update'] is None:
+                    pending['update'] = update
+                await asyncio.sleep(SATURATED_STREAM_DELAY)
+                wakeup.set()
+                continue
+            await websocket.send_json({
+                "type": "result",
+                "seq": update.seq,
+                "state": entry.state,
+                "dropped": pending['dropped'],
+                **ScenarioResponse(**result).model_dump()
+            })
+    
+    receiver = asyncio.create_task(receive_updates())
+    sender = asyncio.create_task(send_results())
+    try:
+        done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        sender.cancel()
+
+@app.post("/api/scenarios/batch", response_model=BatchScenarioResponse)
+async def run_scenario_batch(request: BatchScenarioRequest):
+    """Run many what-if scenarios, possibly across states, in one pass"""
+    data = require_stage('scores')
+    
+    if not request.scenarios:
+        return BatchScenarioResponse(results=[])
+    if len(request.scenarios) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_SCENARIOS} scenarios per batch"
+        )
+    
+    return await offload(evaluate_batch, data, request.scenarios)
+
+def evaluate_batch(data, scenarios):
+    """Group scenarios by weighting and score each group in one vectorized pass"""
+    state_index = data['state_index']
+    positions = []
+    ml_positions = []
+    groups = {}
+    for i, scenario in enumerate(scenarios):
+        entry = state_index.get(scenario.state)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"State not found: {scenario.state}")
+        positions.append(entry.installed_pos)
+        ml_positions.append(entry.ml_pos)
+        groups.setdefault(request_weights(scenario.weights), []).append(i)
+    
+    predictor = data.get('scenario_predictor')
+    features = predictor.features if predictor is not None else None
+    
+    percent = [scenario.mode == 'percent' for scenario in scenarios]
+    deltas = [
+        [s.delta_solar, s.delta_wind, s.delta_hydro, s.delta_bio]
+        for s in scenarios
+    ]
+    
+    # One pass per distinct weighting (usually just one)
+    parts = []
+    for weights, rows in groups.items():
+        engine = weighted_view(data, weights)['scenario_engine']
+        part = engine.evaluate(
+            [positions[i] for i in rows], [percent[i] for i in rows], [deltas[i] for i in rows],
+            features=features
+        )
+        parts.append(part.set_axis(rows))
+    results = pd.concat(parts).sort_index() if len(parts) > 1 else parts[0]
+    
+    if predictor is None:
+        records = frame_records(results)
+    else:
+        # All scenarios through each fitted model at once
+        predictions = predictor.predict(results[features].to_numpy(), ml_positions,
+                                        outliers=[s.outliers for s in scenarios])
+        records = frame_records(results.drop(columns=features))
+        for record, ml in zip(records, frame_records(predictions)):
+            record['ml'] = ml
+    # Encoded here, off the event loop; a Response skips response_model re-validation
+    return FastJSONResponse(content={"results": records})
+
+def sensitivity_context(data):
+    """Worker context for the snapshot: capacities, bounds and component basis"""
+    model = data['weight_model']
+    return sensitivity.make_context(
+        data['installed'], data['bounds'], data['baseline_scored'],
+        DEFAULT_WEIGHTS, model.basis, model.linear
     )
+
+def run_sensitivity(progress, context, request):
+    def run(pool):
+        return sensitivity.run(
+            context, request.samples, request.chunk_size,
+            concentration=request.weight_concentration, capacity_noise=request.capacity_noise,
+            seed=request.seed, interval=request.interval, pool=pool, progress=progress
+        )
+    if request.samples > request.chunk_size:
+        return run_on_analysis_pool(run)
+    return run(None)
+
+def submit_job(kind, func, *args, **kwargs):
+    """jobs.submit; 429 when MAX_PENDING_JOBS are already pending or running"""
+    try:
+        return jobs.submit(kind, func, *args, **kwargs)
+    except TooManyJobs:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many analysis jobs in progress, retry later",
+            headers={"Retry-After": str(JOBS_RETRY_AFTER_SECONDS)}
+        )
+
+@app.post("/api/analysis/sensitivity")
+async def run_sensitivity_analysis(request: SensitivityRequest):
+    """Monte Carlo ranking robustness over random weights and capacity noise.
     
-    # Compute new scores
-    scenario_scored, _ = compute_scores(scenario_installed, bounds, 0.25, 0.25, 0.25, 0.25)
+    Runs as a background job by default (202 + job id to poll); set
+    background=false for a synchronous result on small sample counts.
+    """
+    data = require_stage('scores')
     
-    # Calculate delta
-    delta = scenario_delta(baseline, scenario_scored, request.state)
+    limit = MAX_SENSITIVITY_SAMPLES if request.background else MAX_SYNC_SENSITIVITY_SAMPLES
+    if not 1 <= request.samples <= limit:
+        raise HTTPException(status_code=400, detail=f"samples must be between 1 and {limit}")
+    if not 1 <= request.chunk_size <= MAX_SENSITIVITY_CHUNK:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {MAX_SENSITIVITY_CHUNK}")
+    if not 0 < request.interval < 1 or request.capacity_noise < 0 or request.weight_concentration < 0:
+        raise HTTPException(status_code=400, detail="interval must be in (0, 1); noise and concentration non-negative")
+    if len(data['baseline_scored']) > sensitivity.MAX_STATES:
+        raise HTTPException(status_code=400, detail=f"At most {sensitivity.MAX_STATES} states")
     
-    if not delta:
-        raise HTTPException(status_code=400, detail="Could not calculate scenario")
+    context = sensitivity_context(data)
+    if not request.background:
+        return await offload(run_sensitivity, None, context, request)
     
-    return ScenarioResponse(**delta)
+    job = submit_job('sensitivity', run_sensitivity, context, request,
+                      params=request.model_dump(exclude={'background'}))
+    return FastJSONResponse(
+        status_code=202,
+        content={**job, "status_url": f"/api/analysis/sensitivity/{job['job_id']}"}
+    )
 
-@app.get("/api/stats/summary")
-async def get_summary_stats():
-    """Get summary statistics"""
-    data = initialize_data()
+@app.get("/api/analysis/sensitivity/{job_id}")
+async def get_sensitivity_job(job_id: str):
+    """Poll a sensitivity job; the result is included once it is done"""
+    job = jobs.get(job_id)
+    if job is None or job['kind'] != 'sensitivity':
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def ml_job_params(request):
+    """Validated, normalized parameters for an ML job (also its cache key)"""
+    if request.task not in ml_jobs.TASKS:
+        raise HTTPException(status_code=400, detail=f"task must be one of {ml_jobs.TASKS}")
+    counts = request.n_clusters if isinstance(request.n_clusters, list) else [request.n_clusters]
+    counts = sorted(set(counts))
+    if not counts or not all(ml_jobs.MIN_CLUSTERS <= k <= ml_jobs.MAX_CLUSTERS for k in counts):
+        raise HTTPException(
+            status_code=400,
+            detail=f"n_clusters must be between {ml_jobs.MIN_CLUSTERS} and {ml_jobs.MAX_CLUSTERS}"
+        )
+    
+    params = {'n_clusters': counts}
+    if request.task == 'retrain':
+        if request.features is not None:
+            raise HTTPException(status_code=400, detail="features apply to recluster jobs only")
+        return params
+    
+    features = list(dict.fromkeys(request.features or ml_jobs.DEFAULT_FEATURES))
+    unknown = [f for f in features if f not in ml_jobs.FEATURES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown features {unknown}, expected some of {ml_jobs.FEATURES}"
+        )
+    return {**params, 'features': features, 'seed': request.seed}
+
+def ml_job_frame(data, task, params):
+    """Input rows for an ML job: the whole baseline for retrain, else the features"""
+    baseline = data['baseline_scored']
+    if task == 'retrain':
+        return baseline.drop(columns=[c for c in baseline.columns if c in STATE_ML_FIELD_TYPES
+                                      or c in ('outlier_score', 'pca1', 'pca2')])
+    return baseline[['state', *params['features']]].reset_index(drop=True)
+
+def run_ml_job(progress, key, frame, task, params):
+    def run(pool):
+        return ml_jobs.run(frame, task, params, pool=pool, progress=progress)
+
+    def compute():
+        if len(params['n_clusters']) > 1 or task == 'retrain':
+            return run_on_analysis_pool(run)
+        return run(None)
+    return ml_job_cache.get_or_build(key, compute)
+
+def ml_job_links(job):
+    job_id = job['job_id']
+    return {
+        **job,
+        "status_url": f"/api/ml/jobs/{job_id}",
+        "result_url": f"/api/ml/jobs/{job_id}/result"
+    }
+
+@app.post("/api/ml/jobs")
+async def submit_ml_job(request: MLJobRequest):
+    """Recluster or retrain with new parameters in the worker pool.
+    
+    Jobs are identified by a hash of the data and normalized parameters, so
+    resubmitting an identical job returns the existing one (200) instead of
+    starting another (202).
+    """
+    data = require_stage('scores')
+    params = ml_job_params(request)
+    frame = ml_job_frame(data, request.task, params)
+    key = model_cache.artifact_key(frame, {'task': request.task, **params})
+    
+    job = jobs.get(key, include_result=False)
+    if job is not None and job['status'] != 'failed':
+        return FastJSONResponse(status_code=200, content={**ml_job_links(job), "cached": True})
+    
+    cached = key in ml_job_cache
+    job = submit_job('ml', run_ml_job, key, frame, request.task, params,
+                      params={'task': request.task, **params, 'data_version': data['version']},
+                      job_id=key)
+    job.pop('result')
+    return FastJSONResponse(
+        status_code=200 if cached else 202,
+        content={**ml_job_links(job), "cached": cached}
+    )
+
+@app.get("/api/ml/jobs")
+async def list_ml_jobs():
+    """Recent ML jobs without their results"""
+    return {"jobs": [ml_job_links(job) for job in jobs.list('ml')]}
+
+def require_ml_job(job_id, include_result=False):
+    job = jobs.get(job_id, include_result=include_result)
+    if job is None or job['kind'] != 'ml':
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/ml/jobs/{job_id}")
+async def get_ml_job(job_id: str):
+    """Status and progress of an ML job"""
+    return ml_job_links(require_ml_job(job_id))
+
+@app.get("/api/ml/jobs/{job_id}/result")
+async def get_ml_job_result(job_id: str):
+    """Result of a finished ML job; 409 while it is still running"""
+    job = require_ml_job(job_id, include_result=True)
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job['status'] != 'done':
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job['status']} ({job['progress']:.0%})",
+            headers={"Retry-After": "1"}
+        )
+    return job['result']
+
+def build_summary_payload(data):
+    """Build summary statistics"""
     baseline = data['baseline_scored']
+    leaderboard = data['leaderboard']
+    podium = baseline[['state', 'final_score', 'rank']]
     
     return {
         "total_states": len(baseline),
-        "avg_score": float(baseline['final_score'].mean()),
-        "total_capacity": {
-            "solar": float(baseline['solar_mw'].sum()),
-            "wind": float(baseline['wind_mw'].sum()),
-            "small_hydro": float(baseline['small_hydro_mw'].sum()),
-            "bio_power": float(baseline['bio_power_mw'].sum()),
-            "total": float(baseline['total_mw'].sum())
-        },
-        "top_states": baseline.nsmallest(5, 'rank')[['state', 'final_score', 'rank']].to_dict('records'),
-        "bottom_states": baseline.nlargest(5, 'rank')[['state', 'final_score', 'rank']].to_dict('records')
+        "avg_score": baseline['final_score'].mean(),
+        "total_capacity": dict(zip(
+            ['solar', 'wind', 'small_hydro', 'bio_power', 'total'],
+            baseline[['solar_mw', 'wind_mw', 'small_hydro_mw', 'bio_power_mw', 'total_mw']].sum()
+        )),
+        "top_states": frame_records(podium.iloc[leaderboard.top_rows('final', 5)]),
+        "bottom_states": frame_records(podium.iloc[leaderboard.bottom_rows('final', 5)])
     }
 
+def check_leaderboard_k(k):
+    try:
+        check_k(k)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(metric: str = 'final', k: int = 10, bottom: bool = False):
+    """Get the top (or bottom) k states by final or component score"""
+    data = require_stage('scores')
+    check_leaderboard_k(k)
+    try:
+        entries = data['leaderboard'].top(metric, k, bottom=bottom)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"metric": metric, "entries": entries}
+
+@app.get("/api/states/{state_name}/neighbours")
+async def get_rank_neighbours(state_name: str, metric: str = 'final', k: int = 2):
+    """Get the states ranked just above and below a state"""
+    data = require_stage('scores')
+    check_leaderboard_k(k)
+    
+    entry = data['state_index'].get(state_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    try:
+        entries = data['leaderboard'].neighbours(metric, entry.state, k)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"metric": metric, "state": entry.state, "entries": entries}
+
+def require_similarity(space, k):
+    """Cached data with `space` built, else 400 (bad space / k) or 503 (stage loading)"""
+    stage = SIMILARITY_SPACES.get(space)
+    if stage is None:
+        raise HTTPException(status_code=400, detail=f"space must be one of {list(SIMILARITY_SPACES)}")
+    if not 1 <= k <= MAX_SIMILAR_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_SIMILAR_K}")
+    return require_stage(stage)
+
+@app.get("/api/states/{state_name}/similar")
+async def get_similar_states(state_name: str, k: int = 5, space: str = 'scores'):
+    """Get the k states closest to a state in standardized score or PCA space"""
+    data = require_similarity(space, k)
+    
+    entry = data['state_index'].get(state_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    
+    rows, distances = data['similarity'][space].neighbours(entry.baseline_pos, k)
+    baseline = data['baseline_scored']
+    states = baseline['state'].to_numpy()
+    final_scores = baseline['final_score'].to_numpy()
+    ranks = baseline['rank'].to_numpy()
+    return {
+        "state": entry.state,
+        "space": space,
+        "neighbours": [
+            {"state": states[row], "distance": float(distance),
+             "final_score": float(final_scores[row]), "rank": int(ranks[row])}
+            for row, distance in zip(rows, distances)
+        ]
+    }
+
+def build_similarity_graph(data, space, k):
+    """Every state's k nearest states, as positions into `states`"""
+    indices, distances = data['similarity'][space].graph(k)
+    return CachedPayload({
+        "space": space,
+        "k": indices.shape[1],
+        "states": data['baseline_scored']['state'].tolist(),
+        "neighbours": indices.tolist(),
+        "distances": np.round(distances, 6).tolist()
+    })
+
+@app.get("/api/similar/graph")
+async def get_similarity_graph(request: Request, k: int = 5, space: str = 'scores'):
+    """Get the precomputed k-nearest-neighbour graph over all states"""
+    data = require_similarity(space, k)
+    payload = await cached_offload(
+        similarity_graph_cache, (space, k, data['version']),
+        lambda: build_similarity_graph(data, space, k)
+    )
+    return payload.response(request)
+
+@app.get("/api/stats/summary")
+async def get_summary_stats(request: Request):
+    """Get summary statistics"""
+    data = require_stage('scores')
+    return data['responses']['summary'].response(request)
+
+# Read-only payloads, serialized once per data load
+SCORE_RESPONSE_BUILDERS = {
+    'states': build_states_payload,
+    'summary': build_summary_payload
+}
+RESPONSE_BUILDERS = {
+    **SCORE_RESPONSE_BUILDERS,
+    'clusters': build_cluster_payload,
+    'pca': build_pca_payload
+}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
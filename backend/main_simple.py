@@ -1,11 +1,21 @@
 # Simplified FastAPI Backend - Standalone
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
 import json
 
-app = FastAPI(title="GreenScore AI API")
+import numpy as np
+import pandas as pd
+
+from api_response import FastJSONResponse, CompressionMiddleware, frame_records
+from leaderboard import Leaderboard, check_k
+from state_names import normalize_state_name
+
+app = FastAPI(title="GreenScore AI API", default_response_class=FastJSONResponse)
+
+# Compress large responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware)
 
 # CORS
 app.add_middleware(
@@ -56,6 +66,27 @@ STATES_DATA = [
     {"state": "Lakshadweep", "rank": 36, "final_score": 16.5, "solar_mw": 30, "wind_mw": 10, "small_hydro_mw": 2, "bio_power_mw": 15, "large_hydro_mw": 10, "total_mw": 67, "solar_score": 12, "wind_score": 3, "small_hydro_score": 20, "bio_score": 15, "cluster": 2, "cluster_name": "Emerging States", "is_outlier": False},
 ]
 
+def load_states(records):
+    """Serve `records` (rows shaped like STATES_DATA) and rebuild the derived indexes"""
+    global STATES_DATA, STATE_INDEX, STATES_FRAME, LEADERBOARD
+    STATES_DATA = records
+    # Name index over STATES_DATA, keyed like main.py's StateIndex
+    STATE_INDEX = {normalize_state_name(s["state"]): s for s in STATES_DATA}
+    
+    # Columnar copy of STATES_DATA for the aggregate endpoints
+    STATES_FRAME = pd.DataFrame(STATES_DATA)
+    LEADERBOARD = Leaderboard(STATES_FRAME)
+
+load_states(STATES_DATA)
+
+CAPACITY_TOTALS = {
+    "solar": "solar_mw",
+    "wind": "wind_mw",
+    "small_hydro": "small_hydro_mw",
+    "bio_power": "bio_power_mw",
+    "total": "total_mw"
+}
+
 @app.get("/")
 def root():
     return {"message": "GreenScore AI API", "status": "online"}
@@ -111,71 +142,62 @@ def get_geojson():
 
 @app.get("/api/stats/summary")
 def get_summary_stats():
-    total_solar = sum(s["solar_mw"] for s in STATES_DATA)
-    total_wind = sum(s["wind_mw"] for s in STATES_DATA)
-    total_hydro = sum(s["small_hydro_mw"] for s in STATES_DATA)
-    total_bio = sum(s["bio_power_mw"] for s in STATES_DATA)
-    total_capacity = sum(s["total_mw"] for s in STATES_DATA)
-    avg_score = sum(s["final_score"] for s in STATES_DATA) / len(STATES_DATA)
+    totals = STATES_FRAME[list(CAPACITY_TOTALS.values())].sum().to_dict()
     
     return {
         "total_states": len(STATES_DATA),
-        "avg_score": avg_score,
-        "total_capacity": {
-            "solar": total_solar,
-            "wind": total_wind,
-            "small_hydro": total_hydro,
-            "bio_power": total_bio,
-            "total": total_capacity
-        },
-        "top_states": STATES_DATA[:5],
-        "bottom_states": STATES_DATA[-5:]
+        "avg_score": STATES_FRAME["final_score"].mean(),
+        "total_capacity": {key: totals[column] for key, column in CAPACITY_TOTALS.items()},
+        "top_states": [STATES_DATA[i] for i in LEADERBOARD.top_rows("final", 5)],
+        "bottom_states": [STATES_DATA[i] for i in reversed(LEADERBOARD.bottom_rows("final", 5))]
     }
 
+def check_leaderboard_k(k):
+    try:
+        check_k(k)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/leaderboard")
+def get_leaderboard(metric: str = "final", k: int = 10, bottom: bool = False):
+    check_leaderboard_k(k)
+    if metric not in LEADERBOARD.orders:
+        raise HTTPException(status_code=400, detail="Unknown metric")
+    return {"metric": metric, "entries": LEADERBOARD.top(metric, k, bottom=bottom)}
+
+@app.get("/api/states/{state_name}/neighbours")
+def get_rank_neighbours(state_name: str, metric: str = "final", k: int = 2):
+    check_leaderboard_k(k)
+    state = STATE_INDEX.get(normalize_state_name(state_name))
+    if not state:
+        raise HTTPException(status_code=404, detail="State not found")
+    if metric not in LEADERBOARD.orders:
+        raise HTTPException(status_code=400, detail="Unknown metric")
+    entries = LEADERBOARD.neighbours(metric, state["state"], k)
+    return {"metric": metric, "state": state["state"], "entries": entries}
+
+def summarize_clusters(frame):
+    """Per-cluster size, members and average scores, in order of first appearance"""
+    return frame.groupby("cluster", sort=False).agg(
+        cluster_name=("cluster_name", "first"),
+        num_states=("state", "size"),
+        states=("state", list),
+        avg_score=("final_score", "mean"),
+        avg_solar=("solar_score", "mean"),
+        avg_wind=("wind_score", "mean"),
+        avg_hydro=("small_hydro_score", "mean"),
+        avg_bio=("bio_score", "mean")
+    ).rename_axis("cluster_id").reset_index()
+
 @app.get("/api/ml/clusters")
 def get_cluster_info():
     # Group states by cluster
-    clusters = {}
-    for state in STATES_DATA:
-        cluster_id = state["cluster"]
-        cluster_name = state["cluster_name"]
-        if cluster_id not in clusters:
-            clusters[cluster_id] = {
-                "cluster_id": cluster_id,
-                "cluster_name": cluster_name,
-                "states": [],
-                "scores": [],
-                "solar": [],
-                "wind": [],
-                "hydro": [],
-                "bio": []
-            }
-        clusters[cluster_id]["states"].append(state["state"])
-        clusters[cluster_id]["scores"].append(state["final_score"])
-        clusters[cluster_id]["solar"].append(state["solar_score"])
-        clusters[cluster_id]["wind"].append(state["wind_score"])
-        clusters[cluster_id]["hydro"].append(state["small_hydro_score"])
-        clusters[cluster_id]["bio"].append(state["bio_score"])
-    
-    # Calculate averages
-    cluster_stats = []
-    for cluster_id, data in clusters.items():
-        cluster_stats.append({
-            "cluster_id": cluster_id,
-            "cluster_name": data["cluster_name"],
-            "num_states": len(data["states"]),
-            "states": data["states"],
-            "avg_score": sum(data["scores"]) / len(data["scores"]),
-            "avg_solar": sum(data["solar"]) / len(data["solar"]),
-            "avg_wind": sum(data["wind"]) / len(data["wind"]),
-            "avg_hydro": sum(data["hydro"]) / len(data["hydro"]),
-            "avg_bio": sum(data["bio"]) / len(data["bio"])
-        })
+    cluster_stats = summarize_clusters(STATES_FRAME)
     
-    outliers = [s["state"] for s in STATES_DATA if s.get("is_outlier", False)]
+    outliers = STATES_FRAME.loc[STATES_FRAME["is_outlier"], "state"].tolist()
     
     return {
-        "clusters": cluster_stats,
+        "clusters": frame_records(cluster_stats),
         "metrics": {
             "kmeans": {
                 "silhouette": 0.68,
@@ -196,28 +218,21 @@ def get_cluster_info():
 
 @app.get("/api/ml/pca")
 def get_pca_data():
-    # Generate PCA coordinates based on state scores
-    import math
-    pca_data = []
-    for i, state in enumerate(STATES_DATA):
-        # Simple PCA simulation based on scores
-        angle = (i / len(STATES_DATA)) * 2 * math.pi
-        radius = state["final_score"] / 100
-        pc1 = radius * math.cos(angle) * 2
-        pc2 = radius * math.sin(angle) * 1.5
-        
-        pca_data.append({
-            "state": state["state"],
-            "pc1": pc1,
-            "pc2": pc2,
-            "cluster": state["cluster"],
-            "cluster_name": state["cluster_name"],
-            "score": state["final_score"],
-            "is_outlier": state.get("is_outlier", False)
-        })
+    # Simulated PCA coordinates based on state scores
+    angle = np.arange(len(STATES_FRAME)) / len(STATES_FRAME) * 2 * np.pi
+    radius = STATES_FRAME["final_score"] / 100
+    pca_data = pd.DataFrame({
+        "state": STATES_FRAME["state"],
+        "pc1": radius * np.cos(angle) * 2,
+        "pc2": radius * np.sin(angle) * 1.5,
+        "cluster": STATES_FRAME["cluster"],
+        "cluster_name": STATES_FRAME["cluster_name"],
+        "score": STATES_FRAME["final_score"],
+        "is_outlier": STATES_FRAME["is_outlier"]
+    })
     
     return {
-        "data": pca_data,
+        "data": frame_records(pca_data),
         "explained_variance": [0.62, 0.28],
         "loadings": {
             "PC1": {"solar": 0.52, "wind": 0.48, "hydro": 0.35, "bio": 0.42},
@@ -228,7 +243,7 @@ def get_pca_data():
 @app.get("/api/states/{state_name}")
 def get_state_details(state_name: str):
     # Find the state
-    state = next((s for s in STATES_DATA if s["state"] == state_name), None)
+    state = STATE_INDEX.get(normalize_state_name(state_name))
     if not state:
         return {"error": "State not found"}, 404
     
@@ -355,7 +370,7 @@ def run_scenario_simulation(request: dict):
     delta_bio = request.get("delta_bio", 0)
     
     # Find the state
-    state = next((s for s in STATES_DATA if s["state"] == state_name), None)
+    state = STATE_INDEX.get(normalize_state_name(state_name))
     if not state:
         return {"error": "State not found"}, 404
     
@@ -0,0 +1,413 @@
+# Prometheus-format metrics, timing spans and per-request sampling profiles
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import HTTPException
+from starlette.routing import Match
+
+from api_response import encode_json
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SPAN_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Sampling period for ?profile=1; the achieved rate is reported with the profile
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "1")) / 1000
+PROFILE_TOP = 40
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+
+    def render(self):
+        with self._lock:
+            values = [(key, list(series["counts"]), series["sum"]) for key, series in self._values.items()]
+        lines = self.header()
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics updated as things happen, plus collectors that read state at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns [(name, kind, help, [(labels dict, value), ...]), ...]"""
+        self.collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labels, labels.values())} {_number(value)}"
+                          for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route"]))
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "Completed requests by route template and status",
+    ["method", "route", "status"]))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    ["method", "route"]))
+SPAN_SECONDS = registry.register(Histogram(
+    "app_span_duration_seconds", "Duration of instrumented load and training steps",
+    ["span"], buckets=SPAN_BUCKETS))
+
+
+@contextmanager
+def span(name):
+    """Time a block into app_span_duration_seconds{span=name}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - started, span=name)
+
+
+def route_template(router, scope):
+    """Path template of the route serving scope ('/api/states/{state_name}'), or 'unmatched'.
+
+    Templates rather than raw paths keep the label set bounded.
+    """
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Latency histogram, status counter and in-flight gauge per route template"""
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(self.router, scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=route)
+            REQUESTS.inc(method=method, route=route, status=status)
+            IN_FLIGHT.dec(method=method, route=route)
+
+
+# Sampler of the request being profiled, if any (visible to offloaded work via follow())
+active_profile = contextvars.ContextVar("active_profile", default=None)
+
+# Leaf frames that mean a thread is waiting, not working
+IDLE_FUNCTIONS = {"select", "poll"}
+
+
+class Sampler:
+    """Samples the stacks of registered threads on a background thread.
+
+    The event loop thread is registered for the whole request; pool threads
+    only while they run work the request handed off (see follow()). Other
+    requests running concurrently on the loop show up too, so profile
+    on a quiet instance.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = TallyCounter()
+        self.samples = 0
+        self.idle = 0
+        self._threads = TallyCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+
+    def add_thread(self, ident):
+        with self._lock:
+            self._threads[ident] += 1
+
+    def remove_thread(self, ident):
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = list(self._threads)
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                # Pool threads: stop at follow()'s wrapper, the executor frames above it are noise
+                while frame is not None and frame.f_code is not _run_followed.__code__:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name, code.co_firstlineno))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.samples += 1
+                if stack[0][1] in IDLE_FUNCTIONS:
+                    self.idle += 1
+                else:
+                    self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self, top=PROFILE_TOP):
+        """Self/total samples per function and the hottest collapsed stacks"""
+        busy = sum(self.stacks.values())
+        own, total = TallyCounter(), TallyCounter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+
+        def name(function):
+            return f"{function[0]}:{function[1]}:{function[2]}"
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "effective_interval_ms": self.seconds * 1000 / self.samples if self.samples else None,
+            "samples": self.samples,
+            "idle_samples": self.idle,
+            "functions": [
+                {"function": name(function), "self": own[function], "total": count,
+                 "self_pct": 100 * own[function] / busy, "total_pct": 100 * count / busy}
+                for function, count in total.most_common(top)
+            ],
+            # Flame-graph input: "outer;...;inner count"
+            "stacks": [
+                {"stack": ";".join(name(function) for function in stack), "samples": count}
+                for stack, count in self.stacks.most_common(top)
+            ],
+        }
+
+
+def _run_followed(sampler, func, args, kwargs):
+    ident = threading.get_ident()
+    sampler.add_thread(ident)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.remove_thread(ident)
+
+
+def follow(func):
+    """Wrap func so a profile of the current request also samples the thread running it"""
+    sampler = active_profile.get()
+    if sampler is None:
+        return func
+
+    @functools.wraps(func)
+    def profiled(*args, **kwargs):
+        return _run_followed(sampler, func, args, kwargs)
+    return profiled
+
+
+class ProfileMiddleware:
+    """?profile=1 with a valid X-Admin-Token: run the request under the
+    sampler and respond with the profile instead of the normal body.
+
+    authorize(token) raises HTTPException when the caller is not an admin.
+    """
+
+    def __init__(self, app, authorize):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or b"profile=" not in scope.get("query_string", b""):
+            await self.app(scope, receive, send)
+            return
+        query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        if dict(query).get("profile") not in ("1", "true"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            self.authorize(headers.get(b"x-admin-token", b"").decode("latin-1") or None)
+        except HTTPException as exc:
+            await self._respond(send, exc.status_code, {"detail": exc.detail})
+            return
+
+        # The endpoint sees the request without the profile parameter
+        scope = {**scope, "query_string": urlencode([(k, v) for k, v in query if k != "profile"]).encode()}
+        status, size = None, 0
+
+        async def capture(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        sampler = Sampler()
+        token = active_profile.set(sampler)
+        sampler.add_thread(threading.get_ident())
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            active_profile.reset(token)
+
+        await self._respond(send, 200, {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": elapsed * 1000,
+            "response_bytes": size,
+            **sampler.report(),
+        })
+
+    @staticmethod
+    async def _respond(send, status, content):
+        body = encode_json(content)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"cache-control", b"no-store")],
+        })
+        await send({"type": "http.response.body", "body": body})
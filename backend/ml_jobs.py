@@ -0,0 +1,116 @@
+# Off-line ML recomputation (reclustering, retraining) run in worker processes
+from concurrent.futures import as_completed
+
+import numpy as np
+
+TASKS = ['recluster', 'retrain']
+
+# Columns a recluster job may use as features
+FEATURES = [
+    'solar_score', 'wind_score', 'small_hydro_score', 'bio_score', 'final_score',
+    'solar_mw', 'wind_mw', 'small_hydro_mw', 'bio_power_mw', 'total_mw'
+]
+DEFAULT_FEATURES = ['solar_score', 'wind_score', 'small_hydro_score', 'bio_score']
+
+MIN_CLUSTERS = 2
+MAX_CLUSTERS = 12
+
+
+def fit_clustering(frame, features, n_clusters, seed):
+    """KMeans + GMM for one k over standardized features (runs in a worker)"""
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    from sklearn.mixture import GaussianMixture
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    X = scaler.fit_transform(frame[features].to_numpy(dtype=float))
+    kmeans = KMeans(n_clusters, n_init=10, random_state=seed).fit(X)
+    gmm = GaussianMixture(n_clusters, random_state=seed).fit(X)
+    labels = kmeans.labels_
+    probabilities = gmm.predict_proba(X)
+
+    distinct = len(np.unique(labels))
+    return {
+        'n_clusters': n_clusters,
+        'metrics': {
+            'inertia': float(kmeans.inertia_),
+            # Undefined unless 2 <= distinct labels < samples
+            'silhouette': (float(silhouette_score(X, labels))
+                           if 1 < distinct < len(X) else None),
+            'gmm_bic': float(gmm.bic(X)),
+            'gmm_aic': float(gmm.aic(X)),
+        },
+        'cluster_sizes': np.bincount(labels, minlength=n_clusters).tolist(),
+        # Centroids back in feature units
+        'centroids': [
+            dict(zip(features, center))
+            for center in scaler.inverse_transform(kmeans.cluster_centers_).tolist()
+        ],
+        'assignments': [
+            {'state': state, 'cluster': int(label), 'gmm_cluster': int(p.argmax()),
+             'gmm_probability': float(p.max())}
+            for state, label, p in zip(frame['state'], labels, probabilities)
+        ],
+    }
+
+
+def retrain(frame, n_clusters):
+    """The full startup ML pipeline with a different cluster count (runs in a worker)"""
+    from ml_analysis import train_comprehensive_ml_models, get_cluster_statistics
+
+    ml_results = train_comprehensive_ml_models(frame, n_clusters=n_clusters)
+    kmeans = ml_results['kmeans']
+    forest = ml_results['isolation_forest']
+    cluster_stats = get_cluster_statistics(frame, kmeans['labels'], kmeans['names'])
+
+    return {
+        'n_clusters': n_clusters,
+        'cluster_names': {int(k): v for k, v in kmeans['names'].items()},
+        'metrics': ml_results.get('metrics'),
+        'cluster_stats': cluster_stats.to_dict('records'),
+        'outliers': list(forest.get('outliers', [])),
+        'assignments': [
+            {'state': state, 'cluster': int(label), 'is_outlier': bool(outlier == -1)}
+            for state, label, outlier in zip(frame['state'], kmeans['labels'], forest['labels'])
+        ],
+    }
+
+
+def silhouette(fit):
+    """Silhouette of a fit; retrain metrics nest it under 'kmeans'"""
+    metrics = fit.get('metrics') or {}
+    value = metrics.get('silhouette', (metrics.get('kmeans') or {}).get('silhouette'))
+    return None if value is None else float(value)
+
+
+def run(frame, task, params, pool=None, progress=None):
+    """Run a job's fits, one per cluster count, on `pool` if given"""
+    if task == 'retrain':
+        calls = [(retrain, frame, k) for k in params['n_clusters']]
+    else:
+        calls = [
+            (fit_clustering, frame, params['features'], k, params['seed'])
+            for k in params['n_clusters']
+        ]
+
+    if pool is None:
+        results = (func(*args) for func, *args in calls)
+    else:
+        results = (f.result() for f in as_completed([pool.submit(*call) for call in calls]))
+
+    fits = []
+    for fit in results:
+        fits.append(fit)
+        if progress is not None:
+            progress(len(fits) / len(calls))
+    fits.sort(key=lambda fit: fit['n_clusters'])
+
+    scored = [fit for fit in fits if silhouette(fit) is not None]
+    best = max(scored, key=silhouette) if scored else None
+    return {
+        'task': task,
+        'params': params,
+        'best_n_clusters': best['n_clusters'] if best else None,
+        'fits': fits,
+    }
@@ -0,0 +1,120 @@
+# Cluster, GMM membership and outlier predictions for what-if rows from the cached fitted models
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from scenario_engine import COMPONENT_COLUMNS
+
+
+def _model(ml_results, name):
+    section = ml_results.get(name)
+    return section.get('model') if isinstance(section, dict) else None
+
+
+def _baseline(ml_results, name, key):
+    section = ml_results.get(name)
+    values = section.get(key) if isinstance(section, dict) else None
+    return None if values is None else np.asarray(values)
+
+
+class ScenarioPredictor:
+    """Applies the fitted scaler, KMeans, GMM and IsolationForest to scenario
+    feature rows: one vectorized call per model, never refitting.
+
+    ml_results comes from train_comprehensive_ml_models (possibly via the
+    model cache, so older artifacts may lack a model); whatever is missing
+    is left out of the predictions. Baseline values are looked up by
+    StateEntry.ml_pos.
+    """
+
+    def __init__(self, ml_results, scaler, features):
+        self.scaler = scaler
+        self.features = features
+        self.kmeans = _model(ml_results, 'kmeans')
+        self.gmm = _model(ml_results, 'gmm')
+        self.isolation_forest = _model(ml_results, 'isolation_forest')
+
+        kmeans = ml_results.get('kmeans') or {}
+        self.cluster_names = kmeans.get('names') or {}
+        self.base_clusters = _baseline(ml_results, 'kmeans', 'labels')
+        self.base_probabilities = _baseline(ml_results, 'gmm', 'probabilities')
+        self.base_outlier_scores = _baseline(ml_results, 'isolation_forest', 'scores')
+        self.base_outlier_labels = _baseline(ml_results, 'isolation_forest', 'labels')
+
+    @classmethod
+    def from_results(cls, ml_results):
+        """A predictor, or None if the results lack a scaler, usable features or any model"""
+        if not isinstance(ml_results, dict) or ml_results.get('scaler') is None:
+            return None
+        features = list(ml_results.get('features') or COMPONENT_COLUMNS)
+        if not set(features) <= set(COMPONENT_COLUMNS):
+            return None
+        predictor = cls(ml_results, ml_results['scaler'], features)
+        if predictor.kmeans is None and predictor.gmm is None and predictor.isolation_forest is None:
+            return None
+        return predictor
+
+    def scale(self, values):
+        """scaler.transform; StandardScaler is applied directly, skipping
+        sklearn's input validation (~1.5 ms, more than the models themselves)"""
+        scaler = self.scaler
+        if isinstance(scaler, StandardScaler):
+            if scaler.with_mean:
+                values = values - scaler.mean_
+            if scaler.with_std:
+                values = values / scaler.scale_
+            return values
+        # Match what the scaler was fitted on, to keep sklearn's feature-name check quiet
+        if hasattr(scaler, 'feature_names_in_'):
+            values = pd.DataFrame(values, columns=self.features)
+        return scaler.transform(values)
+
+    def predict(self, values, ml_positions, outliers=False):
+        """Predictions for feature rows (in self.features order) of the states at ml_positions.
+
+        Returns one row per input: new vs. baseline cluster, GMM probabilities
+        and confidence, and baseline outlier score and flag. IsolationForest
+        score_samples walks every tree (~11 ms even for one row), so the new
+        outlier score and flag are only computed for rows selected by
+        `outliers` (a bool, or one bool per row) and are None elsewhere.
+        """
+        ml_positions = np.asarray(ml_positions, dtype=int)
+        X = self.scale(np.asarray(values, dtype=float))
+        columns = {}
+
+        if self.kmeans is not None:
+            clusters = self.kmeans.predict(X)
+            columns['cluster'] = clusters
+            columns['cluster_name'] = [self.cluster_names.get(int(c), f"Cluster {int(c)}") for c in clusters]
+            if self.base_clusters is not None:
+                columns['base_cluster'] = self.base_clusters[ml_positions]
+                columns['cluster_changed'] = clusters != columns['base_cluster']
+
+        if self.gmm is not None:
+            probabilities = self.gmm.predict_proba(X)
+            columns['gmm_cluster'] = probabilities.argmax(axis=1)
+            columns['gmm_probabilities'] = np.round(probabilities, 6).tolist()
+            columns['gmm_confidence'] = probabilities.max(axis=1)
+            if self.base_probabilities is not None:
+                columns['base_gmm_confidence'] = self.base_probabilities[ml_positions].max(axis=1)
+
+        if self.isolation_forest is not None:
+            rows = np.broadcast_to(np.asarray(outliers, dtype=bool), (len(X),))
+            scores = np.full(len(X), None, dtype=object)
+            flags = np.full(len(X), None, dtype=object)
+            if rows.any():
+                selected = X[rows]
+                scored = self.isolation_forest.score_samples(selected)
+                # predict() is score_samples() < offset_; avoid a second pass when we can
+                offset = getattr(self.isolation_forest, 'offset_', None)
+                scores[rows] = scored.tolist()
+                flags[rows] = (scored < offset if offset is not None
+                               else self.isolation_forest.predict(selected) == -1).tolist()
+            columns['outlier_score'] = scores
+            columns['is_outlier'] = flags
+            if self.base_outlier_scores is not None:
+                columns['base_outlier_score'] = self.base_outlier_scores[ml_positions]
+            if self.base_outlier_labels is not None:
+                columns['base_is_outlier'] = self.base_outlier_labels[ml_positions] == -1
+
+        return pd.DataFrame(columns)
@@ -0,0 +1,88 @@
+# On-disk cache of fitted ML artifacts keyed by input content
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import joblib
+import pandas as pd
+import sklearn
+
+ARTIFACT_DIR = os.environ.get(
+    "ML_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache")
+)
+MAX_ARTIFACTS = 8
+
+
+def artifact_key(frame, params):
+    """Content hash of the training frame, hyperparameters and sklearn version"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, frame.columns))).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(sklearn.__version__.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def artifact_path(key):
+    return os.path.join(ARTIFACT_DIR, f"ml-{key}.joblib")
+
+
+def load_or_train(frame, params, train):
+    """Load artifacts for (frame, params) from disk, or train and store them.
+
+    Writes are atomic (temp file + rename). If another worker stores the same
+    key first, its artifacts are returned so every worker serves one model.
+    Returns (artifacts, hit).
+    """
+    path = artifact_path(artifact_key(frame, params))
+
+    cached = _load(path)
+    if cached is not None:
+        return cached, True
+
+    artifacts = train()
+
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    cached = _load(path)
+    if cached is not None:
+        return cached, True
+
+    fd, tmp_path = tempfile.mkstemp(dir=ARTIFACT_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(artifacts, f, compress=3)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return artifacts, False
+
+    _prune()
+    return artifacts, False
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        # Truncated or written by an incompatible version: retrain
+        return None
+
+
+def _prune():
+    """Keep only the newest MAX_ARTIFACTS files"""
+    paths = sorted(
+        glob.glob(os.path.join(ARTIFACT_DIR, "ml-*.joblib")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for stale in paths[MAX_ARTIFACTS:]:
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
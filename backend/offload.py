@@ -0,0 +1,74 @@
+# Bounded thread pool for CPU-bound request handlers, with backpressure
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when every worker and queue slot is taken"""
+
+
+class BoundedExecutor:
+    """Runs blocking work off the event loop, admitting at most
+    max_workers + max_queue tasks at once.
+
+    A slot is freed when the task finishes in its thread, not when the
+    awaiting request goes away, so cancelled requests still count until
+    their work is done. With max_workers=0 tasks run inline on the caller's
+    thread (for comparison and debugging).
+    """
+
+    def __init__(self, max_workers, max_queue, name="compute"):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._executor = (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+                          if max_workers > 0 else None)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            self.peak = max(self.peak, self._pending)
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, func, *args):
+        """Await func(*args) on the pool; PoolSaturated if no slot is free"""
+        if self._executor is None:
+            return func(*args)
+        if not self._acquire():
+            raise PoolSaturated()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending if self._executor is not None else None,
+                "pending": self._pending,
+                "queued": max(0, self._pending - self.max_workers),
+                "peak": self.peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
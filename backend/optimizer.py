@@ -0,0 +1,173 @@
+# Goal-seek: cheapest capacity additions that reach a target rank or score
+import time
+
+import numpy as np
+
+from scenario_engine import RESOURCE_COLUMNS
+
+RESOURCE_KEYS = ['solar', 'wind', 'hydro', 'bio']
+
+# Candidate scales per direction in one vectorized batch
+SCALE_STEPS = 24
+# New mix directions per search round
+DIRECTIONS_PER_ROUND = 48
+# Stop once the cheapest feasible cost improves by less than this for PATIENCE rounds
+CONVERGENCE_TOLERANCE = 0.005
+PATIENCE = 2
+MAX_ROUNDS = 12
+
+
+def target_threshold(engine, position, target_rank=None, target_score=None):
+    """Lowest final score that meets the target, given the other states' scores"""
+    thresholds = []
+    if target_score is not None:
+        thresholds.append(float(target_score))
+    if target_rank is not None:
+        others = np.delete(engine.base_scores, position)
+        if target_rank <= len(others):
+            # Rank r needs no more than r - 1 strictly higher scores
+            thresholds.append(float(np.sort(others)[::-1][target_rank - 1]))
+        else:
+            thresholds.append(-np.inf)
+    return max(thresholds)
+
+
+class GoalSeek:
+    """Vectorized search over MW additions for one state.
+
+    Every candidate is a direction (a mix across resources) times a scale;
+    each round scores all (direction, scale) pairs of a batch of directions
+    with one ScenarioEngine pass, then samples new directions around the
+    cheapest feasible one.
+    """
+
+    def __init__(self, engine, position, threshold, costs, max_add, seed=None):
+        self.engine = engine
+        self.position = position
+        self.threshold = threshold
+        self.costs = np.asarray(costs, dtype=float)
+        self.max_add = np.asarray(max_add, dtype=float)
+        self.rng = np.random.default_rng(seed)
+
+        self.deltas = []
+        self.scores = []
+        self.evaluated = 0
+        self.best = None  # (cost, deltas, score)
+
+    def evaluate(self, deltas):
+        """Scores for a (k, 4) array of MW additions to this state"""
+        deltas = np.clip(np.asarray(deltas, dtype=float), 0, self.max_add)
+        positions = np.full(len(deltas), self.position)
+        rows = self.engine.apply_deltas(positions, np.zeros(len(deltas), dtype=bool), deltas)
+        scores = self.engine.score_rows(rows, positions)
+
+        self.deltas.append(deltas)
+        self.scores.append(scores)
+        self.evaluated += len(deltas)
+
+        costs = deltas @ self.costs
+        feasible = np.flatnonzero(scores >= self.threshold)
+        if len(feasible):
+            i = feasible[np.argmin(costs[feasible])]
+            if self.best is None or costs[i] < self.best[0]:
+                self.best = (float(costs[i]), deltas[i], float(scores[i]))
+        return scores
+
+    def scan(self, directions):
+        """Evaluate each direction at geometrically spaced scales up to its bounds"""
+        directions = np.asarray(directions, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reach = np.where(directions > 0, self.max_add / directions, np.inf).min(axis=1)
+        fractions = np.geomspace(1e-3, 1.0, SCALE_STEPS)
+        candidates = directions[:, None, :] * (reach[:, None] * fractions)[:, :, None]
+        self.evaluate(candidates.reshape(-1, len(RESOURCE_COLUMNS)))
+
+    def refine(self):
+        """Shrink the best feasible mix to the smallest scale that still meets the target"""
+        if self.best is None:
+            return
+        _, deltas, _ = self.best
+        low, high = 0.0, 1.0
+        for _ in range(3):
+            scales = np.linspace(low, high, 33)
+            scores = self.evaluate(np.outer(scales, deltas))
+            first = int(np.argmax(scores >= self.threshold))
+            low, high = scales[max(first - 1, 0)], scales[first]
+
+    def run(self, budget_seconds, extra_candidates=()):
+        """Search until converged, out of rounds or out of time; returns the stop reason"""
+        deadline = time.perf_counter() + budget_seconds
+        usable = self.max_add > 0
+        if not usable.any():
+            return 'no_feasible_resources'
+
+        # Round 0: each resource alone, plus a cost-efficient even split
+        directions = [np.eye(len(RESOURCE_COLUMNS))[j] for j in np.flatnonzero(usable)]
+        directions.append(usable / np.maximum(self.costs, 1e-9))
+        self.scan(np.array(directions))
+        if len(extra_candidates):
+            self.evaluate(extra_candidates)
+
+        reason, stale = 'max_rounds', 0
+        for _ in range(MAX_ROUNDS):
+            if time.perf_counter() >= deadline:
+                reason = 'budget'
+                break
+            previous = self.best[0] if self.best else None
+
+            if self.best is None:
+                # Nothing reaches the target yet: explore the whole simplex
+                alpha = np.ones(len(RESOURCE_COLUMNS))
+            else:
+                mix = self.best[1] / max(self.best[1].sum(), 1e-12)
+                alpha = 1 + 50 * mix
+            directions = self.rng.dirichlet(alpha, DIRECTIONS_PER_ROUND) * usable
+            self.scan(directions[directions.sum(axis=1) > 0])
+
+            if previous is not None and self.best[0] >= previous * (1 - CONVERGENCE_TOLERANCE):
+                stale += 1
+                if stale >= PATIENCE:
+                    reason = 'converged'
+                    break
+            else:
+                stale = 0
+
+        self.refine()
+        return reason
+
+    def pareto(self, max_options):
+        """Cost vs score frontier over everything evaluated, thinned to max_options"""
+        deltas = np.concatenate(self.deltas)
+        scores = np.concatenate(self.scores)
+        costs = deltas @ self.costs
+
+        order = np.lexsort((-scores, costs))
+        frontier, best_score = [], -np.inf
+        for i in order:
+            if scores[i] > best_score + 1e-9:
+                frontier.append(i)
+                best_score = scores[i]
+        if len(frontier) > max_options:
+            keep = np.unique(np.linspace(0, len(frontier) - 1, max_options).round().astype(int))
+            frontier = [frontier[k] for k in keep]
+        return deltas[frontier], scores[frontier]
+
+    def options(self, deltas, scores):
+        """Response dicts for candidate additions"""
+        deltas = np.atleast_2d(deltas)
+        scores = np.atleast_1d(scores)
+        ranks = self.engine.rank_of(np.full(len(scores), self.position), scores)
+        base_score = float(self.engine.base_scores[self.position])
+        base_rank = int(self.engine.base_ranks[self.position])
+        return [
+            {
+                'deltas_mw': dict(zip(RESOURCE_KEYS, d.tolist())),
+                'cost': float(d @ self.costs),
+                'new_score': float(s),
+                'delta_score': float(s) - base_score,
+                'new_rank': int(r),
+                'delta_rank': int(r) - base_rank,
+                'meets_target': bool(s >= self.threshold),
+            }
+            for d, s, r in zip(deltas, scores, ranks)
+        ]
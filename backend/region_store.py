@@ -0,0 +1,175 @@
+# District-level, monthly capacity history in Parquet partitioned by state
+import argparse
+import logging
+import os
+import re
+
+import pandas as pd
+
+from state_names import normalize_state_name
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+CAPACITY_COLUMNS = [
+    'solar_mw', 'wind_mw', 'small_hydro_mw', 'bio_power_mw', 'large_hydro_mw', 'total_mw'
+]
+KEY_COLUMNS = ['state', 'district', 'period']
+PARTITION_COLUMN = 'state_key'
+PERIOD_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# Rows per Parquet row group; period filters skip whole groups via their statistics
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def partition_key(state):
+    """Directory-safe partition value: the state-name key with '-' separators"""
+    return normalize_state_name(state, separator="-")
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def write_region_dataset(frame, directory):
+    """Write a state/district/period capacity table as Parquet partitioned by state.
+
+    Periods are normalized to 'YYYY-MM' and rows are sorted by period within
+    each state, so period filters prune row groups as well as partitions.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required to write the region dataset")
+
+    columns = KEY_COLUMNS + [c for c in CAPACITY_COLUMNS if c in frame.columns]
+    frame = frame[columns].copy()
+    frame['period'] = pd.to_datetime(frame['period']).dt.strftime('%Y-%m')
+    frame[PARTITION_COLUMN] = frame['state'].map(partition_key)
+    frame = frame.sort_values([PARTITION_COLUMN, 'period', 'district'])
+
+    ds.write_dataset(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        directory,
+        format="parquet",
+        partitioning=_partitioning(),
+        existing_data_behavior="delete_matching",
+        max_rows_per_group=ROW_GROUP_SIZE,
+        min_rows_per_group=min(ROW_GROUP_SIZE, len(frame)) or 1
+    )
+
+
+class RegionStore:
+    """Column- and partition-pruned reads over the region dataset.
+
+    Nothing is loaded up front: each query reads only the requested columns
+    from one state's files, memory-mapped so workers share the page cache.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.dataset = ds.dataset(
+            directory,
+            format="parquet",
+            partitioning=_partitioning(),
+            filesystem=fs.LocalFileSystem(use_mmap=True)
+        )
+        names = self.dataset.schema.names
+        self.metrics = [c for c in CAPACITY_COLUMNS if c in names]
+        self.state_keys = {
+            ds.get_partition_keys(fragment.partition_expression).get(PARTITION_COLUMN)
+            for fragment in self.dataset.get_fragments()
+        }
+
+    def has_state(self, state):
+        return partition_key(state) in self.state_keys
+
+    def select_metrics(self, fields=None):
+        """Requested capacity columns (comma-separated), all of them by default"""
+        if not fields:
+            return list(self.metrics)
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in self.metrics]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return selected
+
+    def periods(self, state):
+        """Sorted periods available for a state"""
+        table = self.dataset.to_table(columns=['period'], filter=self._state_filter(state))
+        return sorted(set(table.column('period').to_pylist()))
+
+    def districts(self, state, period=None, metrics=None):
+        """(period, rows) with one row per district; latest period by default"""
+        metrics = self.metrics if metrics is None else metrics
+        if period is None:
+            periods = self.periods(state)
+            if not periods:
+                return None, []
+            period = periods[-1]
+        _check_period(period)
+
+        table = self.dataset.to_table(
+            columns=['district'] + metrics,
+            filter=self._state_filter(state) & (ds.field('period') == period)
+        )
+        return period, table.sort_by('district').to_pylist()
+
+    def timeseries(self, state, start=None, end=None, metrics=None):
+        """State totals per period (summed over districts), oldest first"""
+        metrics = self.metrics if metrics is None else metrics
+        condition = self._state_filter(state)
+        if start is not None:
+            _check_period(start)
+            condition &= ds.field('period') >= start
+        if end is not None:
+            _check_period(end)
+            condition &= ds.field('period') <= end
+
+        table = self.dataset.to_table(columns=['period'] + metrics, filter=condition)
+        totals = table.group_by('period').aggregate([(m, 'sum') for m in metrics])
+        totals = totals.rename_columns([
+            name[:-len('_sum')] if name.endswith('_sum') else name
+            for name in totals.column_names
+        ])
+        return totals.select(['period'] + metrics).sort_by('period').to_pylist()
+
+    @staticmethod
+    def _state_filter(state):
+        return ds.field(PARTITION_COLUMN) == partition_key(state)
+
+
+def _check_period(period):
+    if not PERIOD_PATTERN.match(period):
+        raise ValueError(f"Invalid period '{period}', expected YYYY-MM")
+
+
+def open_region_store(directory):
+    """RegionStore for `directory`, or None if unset, missing or pyarrow is absent"""
+    if not directory or not os.path.isdir(directory):
+        return None
+    if pa is None:
+        logger.warning("REGION_DATA_DIR is set but pyarrow is not installed; district data disabled")
+        return None
+    return RegionStore(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a state/district/period capacity table (CSV or Parquet) "
+                    "into the partitioned region dataset"
+    )
+    parser.add_argument("source")
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.source.endswith(".parquet"):
+        source = pd.read_parquet(args.source)
+    else:
+        source = pd.read_csv(args.source)
+    write_region_dataset(source, args.directory)
+    print(f"Wrote {len(source)} rows to {args.directory}")
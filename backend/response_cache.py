@@ -0,0 +1,131 @@
+# Pre-serialized responses for read-only endpoints
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+import api_response
+from api_response import brotli, choose_encoding, encode_json
+
+
+class CachedPayload:
+    """A JSON body encoded once, with a strong ETag over its bytes.
+
+    With precompress=True the body is also stored gzip- (and, if the brotli
+    package is installed, br-) compressed and negotiated per request.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content, precompress=False, cache_control="no-cache"):
+        self.body = encode_json(content)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self.cache_control = cache_control
+
+        self.encoded = {}
+        if precompress:
+            small = len(self.body) <= api_response.PRECOMPRESS_MAX_LEVEL_SIZE
+            if brotli is not None:
+                quality = 11 if small else api_response.BROTLI_QUALITY
+                self.encoded["br"] = brotli.compress(self.body, quality=quality)
+            level = 9 if small else api_response.GZIP_LEVEL
+            self.encoded["gzip"] = gzip.compress(self.body, compresslevel=level, mtime=0)
+
+    def matches(self, if_none_match, etag=None):
+        """True if an If-None-Match header value covers this payload"""
+        if not if_none_match:
+            return False
+        etag = etag or self.etag
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+    def response(self, request: Request):
+        """Serve the ready bytes, or 304 if the client already has them"""
+        body, etag, headers = self.body, self.etag, {"Cache-Control": self.cache_control}
+        if self.encoded:
+            headers["Vary"] = "Accept-Encoding"
+            coding = choose_encoding(request.headers.get("accept-encoding", ""))
+            if coding in self.encoded:
+                body, etag = self.encoded[coding], self.etag[:-1] + "-" + coding + '"'
+                headers["Content-Encoding"] = coding
+        headers["ETag"] = etag
+
+        if self.matches(request.headers.get("if-none-match"), etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def build_payloads(builders, data):
+    """Run each payload builder once over the cached data"""
+    return {name: CachedPayload(builder(data), precompress=True) for name, builder in builders.items()}
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with hit/miss counters"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        """Return the cached value for key, building it on a miss"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss just builds twice
+        value = builder()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def lookup(self, key):
+        """The cached value for key (counted as a hit), or None without counting a miss"""
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def warm(self, key, builder):
+        """Build and store key ahead of demand without touching the counters"""
+        with self._lock:
+            if key in self._items:
+                return
+        value = builder()
+        with self._lock:
+            self._items.setdefault(key, value)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
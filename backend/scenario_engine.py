@@ -0,0 +1,231 @@
+# Vectorized what-if scoring against the cached baseline
+import logging
+
+import numpy as np
+import pandas as pd
+
+from scoring import compute_scores
+
+logger = logging.getLogger(__name__)
+
+# Capacity columns touched by a scenario, in ScenarioRequest delta order
+RESOURCE_COLUMNS = ['solar_mw', 'wind_mw', 'small_hydro_mw', 'bio_power_mw']
+# Per-resource scores compute_scores adds (the ML models' features), in
+# RESOURCE_COLUMNS order
+COMPONENT_COLUMNS = ['solar_score', 'wind_score', 'small_hydro_score', 'bio_score']
+DEFAULT_WEIGHTS = (0.25, 0.25, 0.25, 0.25)
+# How closely the NumPy scores must reproduce the baseline to be used
+SCORE_TOLERANCE = 1e-6
+
+
+class ScenarioEngine:
+    """Scores many single-state scenarios in one pass.
+
+    Bounds are fixed at baseline, so a state's scores only depend on its own
+    capacities: only the edited rows are rescored, and the new rank is found
+    by binary search over the other states' baseline scores. Positions are
+    row positions in `installed` (StateEntry.installed_pos).
+
+    `weights` is one weight tuple for every state, or an (n, 4) array of
+    per-state weights aligned with the `baseline` rows.
+
+    compute_scores on a one-row frame costs ~10 ms, so rows are scored with
+    its formula (log-scaled capacity between the bounds, weighted mean)
+    evaluated on NumPy arrays. That copy is checked against the baseline
+    once here: if it does not reproduce every baseline component and final
+    score, or `vectorized` is False (weights the scoring module is not
+    linear in), rows go through compute_scores instead.
+    """
+
+    def __init__(self, installed, bounds, baseline, weights=DEFAULT_WEIGHTS, vectorized=True):
+        self.installed = installed.reset_index(drop=True)
+        self.bounds = bounds
+        self.lows = np.array([bounds[c][0] for c in RESOURCE_COLUMNS], dtype=float)
+        self.spans = np.array([bounds[c][1] for c in RESOURCE_COLUMNS], dtype=float) - self.lows
+
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim == 1:
+            weights = np.broadcast_to(weights, (len(baseline), len(weights)))
+        self.weights = pd.DataFrame(weights, index=baseline['state']).loc[
+            self.installed['state']
+        ].to_numpy()
+        self.shares = self.weights / self.weights.sum(axis=1, keepdims=True)
+
+        aligned = baseline.set_index('state').loc[self.installed['state']]
+        self.capacities = self.installed[RESOURCE_COLUMNS].to_numpy(dtype=float)
+        self.base_scores = aligned['final_score'].to_numpy(dtype=float)
+        self.base_ranks = aligned['rank'].to_numpy(dtype=int)
+        self.states = self.installed['state'].to_numpy()
+
+        # Baseline order index: sorted_scores[k] == base_scores[order[k]]
+        self.order = np.argsort(self.base_scores, kind='stable')
+        self.sorted_scores = self.base_scores[self.order]
+
+        self.vectorized = vectorized and self._reproduces(aligned)
+        if vectorized and not self.vectorized:
+            logger.warning("NumPy scores differ from compute_scores' baseline; "
+                           "scenarios fall back to compute_scores")
+
+    def _reproduces(self, aligned):
+        """True if the NumPy formula rescores every state to its baseline scores"""
+        scores, components = self._vectorized_scores(self.capacities, np.arange(len(self.capacities)))
+        expected = [(scores, self.base_scores)]
+        if set(COMPONENT_COLUMNS) <= set(aligned.columns):
+            expected.append((components, aligned[COMPONENT_COLUMNS].to_numpy(dtype=float)))
+        return all(
+            actual.shape == target.shape
+            and np.allclose(actual, target, rtol=SCORE_TOLERANCE, atol=SCORE_TOLERANCE, equal_nan=True)
+            for actual, target in expected
+        )
+
+    def updated_capacities(self, positions, percent, deltas):
+        """RESOURCE_COLUMNS capacities before and after each scenario's deltas"""
+        positions = np.asarray(positions, dtype=int)
+        percent = np.asarray(percent, dtype=bool)[:, None]
+        deltas = np.asarray(deltas, dtype=float)
+
+        current = self.capacities[positions]
+        updated = np.where(percent, current * (1 + deltas / 100.0), current + deltas)
+        return current, np.clip(updated, 0, None)
+
+    def apply_deltas(self, positions, percent, deltas):
+        """Vectorized apply_whatif: one modified installed row per scenario"""
+        current, updated = self.updated_capacities(positions, percent, deltas)
+        rows = self.installed.iloc[np.asarray(positions, dtype=int)].reset_index(drop=True)
+        rows[RESOURCE_COLUMNS] = updated
+        if 'total_mw' in rows.columns:
+            rows['total_mw'] = rows['total_mw'].to_numpy() + (updated - current).sum(axis=1)
+        return rows
+
+    def score_capacities(self, capacities, positions):
+        """(final scores, (n, 4) COMPONENT_COLUMNS scores) for RESOURCE_COLUMNS capacity rows"""
+        if self.vectorized:
+            return self._vectorized_scores(capacities, positions)
+        return self._compute_scores(capacities, positions)
+
+    def _vectorized_scores(self, capacities, positions):
+        capacities = np.asarray(capacities, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            components = 100 * np.clip((np.log1p(capacities) - self.lows) / self.spans, 0, 1)
+
+        # Accumulate left to right, like compute_scores' sum()
+        shares = self.shares[np.asarray(positions, dtype=int)]
+        scores = np.zeros(len(capacities))
+        for k in range(len(RESOURCE_COLUMNS)):
+            scores = scores + shares[:, k] * components[:, k]
+        return scores, components
+
+    def _compute_scores(self, capacities, positions):
+        """score_capacities through compute_scores, one call per distinct weight vector"""
+        positions = np.asarray(positions, dtype=int)
+        rows = self.installed.iloc[positions].reset_index(drop=True)
+        rows[RESOURCE_COLUMNS] = np.asarray(capacities, dtype=float)
+
+        weights = self.weights[positions]
+        unique, groups = np.unique(weights, axis=0, return_inverse=True)
+        groups = groups.ravel()
+        scores = np.empty(len(rows))
+        components = np.empty((len(rows), len(COMPONENT_COLUMNS)))
+        for group, vector in enumerate(unique):
+            mask = groups == group
+            scored, _ = compute_scores(rows[mask], self.bounds, *vector)
+            scores[mask] = scored['final_score'].to_numpy(dtype=float)
+            components[mask] = scored[COMPONENT_COLUMNS].to_numpy(dtype=float)
+        return scores, components
+
+    def _features(self, components, features):
+        return components[:, [COMPONENT_COLUMNS.index(name) for name in features]]
+
+    def score_rows(self, rows, positions, features=None):
+        """Final scores for scenario rows, in input order.
+
+        With `features` (score column names, e.g. the ML models' inputs) also
+        returns those columns as an (n, len(features)) array.
+        """
+        scores, components = self.score_capacities(rows[RESOURCE_COLUMNS].to_numpy(dtype=float), positions)
+        if features:
+            return scores, self._features(components, features)
+        return scores
+
+    def rank_of(self, positions, scores):
+        """Rank each score among the other states' baseline scores"""
+        positions = np.asarray(positions, dtype=int)
+        scores = np.asarray(scores, dtype=float)
+        n = len(self.sorted_scores)
+
+        # Competition ranking: 1 + number of strictly better scores
+        higher = n - np.searchsorted(self.sorted_scores, scores, side='right')
+        higher -= (self.base_scores[positions] > scores).astype(int)
+        return higher + 1
+
+    def evaluate(self, positions, percent, deltas, features=None):
+        """Score and rank deltas for a batch of scenarios (plus the `features` score columns)"""
+        positions = np.asarray(positions, dtype=int)
+        _, updated = self.updated_capacities(positions, percent, deltas)
+        new_scores, components = self.score_capacities(updated, positions)
+        new_ranks = self.rank_of(positions, new_scores)
+
+        base_scores = self.base_scores[positions]
+        base_ranks = self.base_ranks[positions]
+        frame = pd.DataFrame({
+            'state': self.states[positions],
+            'base_score': base_scores,
+            'new_score': new_scores,
+            'delta_score': new_scores - base_scores,
+            'base_rank': base_ranks,
+            'new_rank': new_ranks,
+            'delta_rank': new_ranks - base_ranks,
+        })
+        if features:
+            frame[list(features)] = self._features(components, features)
+        return frame
+
+    def rank_shifts(self, position, new_score):
+        """Other states whose rank moves when one state's score changes.
+
+        A state at score s is overtaken (rank + 1) if old <= s < new and is
+        passed back (rank - 1) if new <= s < old; both ranges are found by
+        binary search on the sorted baseline, so cost is O(log n + shifted).
+        """
+        old_score = self.base_scores[position]
+        low, high = sorted((old_score, new_score))
+        start = np.searchsorted(self.sorted_scores, low, side='left')
+        stop = np.searchsorted(self.sorted_scores, high, side='left')
+        step = 1 if new_score > old_score else -1
+
+        shifts = []
+        for other in self.order[start:stop]:
+            if other == position:
+                continue
+            base_rank = int(self.base_ranks[other])
+            shifts.append({
+                'state': self.states[other],
+                'base_rank': base_rank,
+                'new_rank': base_rank + step
+            })
+        shifts.sort(key=lambda shift: shift['base_rank'])
+        return shifts
+
+    def rescore(self, position, percent, deltas, features=None):
+        """Rescore one state and report its new rank and the states it displaces.
+
+        With `features`, the result also holds those score columns as 'features'.
+        """
+        _, updated = self.updated_capacities([position], [percent], [deltas])
+        new_scores, components = self.score_capacities(updated, [position])
+        new_score = float(new_scores[0])
+        new_rank = int(self.rank_of([position], [new_score])[0])
+        base_score = float(self.base_scores[position])
+        base_rank = int(self.base_ranks[position])
+        result = {
+            'base_score': base_score,
+            'new_score': new_score,
+            'delta_score': new_score - base_score,
+            'base_rank': base_rank,
+            'new_rank': new_rank,
+            'delta_rank': new_rank - base_rank,
+            'rank_shifts': self.rank_shifts(position, new_score)
+        }
+        if features:
+            result['features'] = self._features(components, features)[0]
+        return result
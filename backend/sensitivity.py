@@ -0,0 +1,204 @@
+# Monte Carlo ranking robustness under weight and capacity uncertainty
+import sys
+from concurrent.futures import as_completed
+
+import numpy as np
+
+# Kept in sync with scenario_engine.RESOURCE_COLUMNS / weighting.WEIGHT_NAMES;
+# this module is imported by worker processes, so it avoids the scoring imports
+RESOURCE_COLUMNS = ['solar_mw', 'wind_mw', 'small_hydro_mw', 'bio_power_mw']
+WEIGHT_NAMES = ['solar', 'wind', 'small_hydro', 'bio']
+
+# Rank histograms are n x n, so the analysis is limited to this many states
+MAX_STATES = 2000
+
+
+def init_worker(paths):
+    """Process-pool initializer: make the scoring module importable under spawn"""
+    for path in paths:
+        if path not in sys.path:
+            sys.path.append(path)
+
+
+def make_context(installed, bounds, baseline, base_weights, basis, linear):
+    """Everything a worker needs, aligned with the baseline rows"""
+    installed = installed.set_index('state').loc[baseline['state']].reset_index()
+    weights = np.asarray(base_weights, dtype=float)
+    return {
+        'installed': installed,
+        'bounds': bounds,
+        'states': baseline['state'].tolist(),
+        'base_scores': baseline['final_score'].to_numpy(dtype=float),
+        'base_ranks': baseline['rank'].to_numpy(dtype=int),
+        'base_weights': weights / weights.sum(),
+        'basis': np.asarray(basis, dtype=float),
+        'linear': linear,
+    }
+
+
+def sample_weights(rng, size, base_weights, concentration):
+    """Dirichlet weight vectors: around the base weights, or uniform on the simplex"""
+    if not concentration:
+        alpha = np.ones(len(base_weights))
+    else:
+        alpha = np.maximum(concentration * np.asarray(base_weights), 1e-3)
+    return rng.dirichlet(alpha, size)
+
+
+def competition_ranks(scores):
+    """Row-wise competition ranks (1 + number of strictly higher scores)"""
+    samples, n = scores.shape
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ordered = np.take_along_axis(scores, order, axis=1)
+    starts = np.ones((samples, n), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    first = np.maximum.accumulate(np.where(starts, np.arange(n), 0), axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, first + 1, axis=1)
+    return ranks
+
+
+def chunk_scores(context, weights, capacity_noise, rng):
+    """(samples, n) final scores under sampled weights and perturbed capacities"""
+    size, n = len(weights), len(context['states'])
+    if capacity_noise <= 0 and context['linear']:
+        # Fixed capacities: the baseline basis already holds every component score
+        return weights @ context['basis'].T
+
+    from scoring import compute_scores
+
+    installed = context['installed']
+    capacities = installed[RESOURCE_COLUMNS].to_numpy(dtype=float)
+    factors = np.exp(rng.normal(0.0, capacity_noise, (size, n, len(RESOURCE_COLUMNS))))
+    perturbed = (capacities * factors).reshape(-1, len(RESOURCE_COLUMNS))
+
+    # One stacked frame per chunk; bounds stay at baseline so rows are independent
+    stacked = installed.iloc[np.tile(np.arange(n), size)].reset_index(drop=True)
+    stacked[RESOURCE_COLUMNS] = perturbed
+    if 'total_mw' in stacked.columns:
+        added = perturbed - np.tile(capacities, (size, 1))
+        stacked['total_mw'] = stacked['total_mw'].to_numpy() + added.sum(axis=1)
+
+    def final_scores(rows, vector):
+        scored, _ = compute_scores(rows, context['bounds'], *vector)
+        return scored['final_score'].reindex(rows.index).to_numpy(dtype=float)
+
+    if context['linear']:
+        unit = np.eye(len(WEIGHT_NAMES))
+        basis = np.stack([final_scores(stacked, unit[j]) for j in range(len(unit))], axis=-1)
+        return np.einsum('snj,sj->sn', basis.reshape(size, n, -1), weights)
+
+    return np.stack([
+        final_scores(stacked.iloc[s * n:(s + 1) * n], weights[s]) for s in range(size)
+    ])
+
+
+def score_chunk(context, seed, size, concentration, capacity_noise):
+    """Partial accumulators for one chunk of samples (runs in a worker process)"""
+    rng = np.random.default_rng(seed)
+    n = len(context['states'])
+    weights = sample_weights(rng, size, context['base_weights'], concentration)
+    ranks = competition_ranks(chunk_scores(context, weights, capacity_noise, rng))
+
+    # Adjacent baseline pairs (higher, lower): does the lower one overtake?
+    order = np.argsort(context['base_ranks'], kind='stable')
+    higher, lower = order[:-1], order[1:]
+    flipped = ranks[:, lower] < ranks[:, higher]
+
+    return {
+        'samples': size,
+        'histogram': np.bincount(
+            (np.arange(n) * n + ranks - 1).ravel(), minlength=n * n
+        ).reshape(n, n),
+        'flips': flipped.sum(axis=0),
+        'flip_weight_sum': flipped.T.astype(float) @ weights,
+        'weight_sum': weights.sum(axis=0),
+    }
+
+
+def merge(total, part):
+    if total is None:
+        return part
+    return {key: total[key] + part[key] for key in total}
+
+
+def run(context, samples, chunk_size, concentration=50.0, capacity_noise=0.1, seed=None,
+        interval=0.9, pool=None, progress=None):
+    """Score `samples` random scenarios in chunks, on `pool` if given, and summarize"""
+    n = len(context['states'])
+    if n > MAX_STATES:
+        raise ValueError(f"Sensitivity analysis supports at most {MAX_STATES} states")
+
+    sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(context, s, size, concentration, capacity_noise) for s, size in zip(seeds, sizes)]
+
+    total, done = None, 0
+    if pool is None:
+        results = (score_chunk(*a) for a in args)
+    else:
+        results = (f.result() for f in as_completed([pool.submit(score_chunk, *a) for a in args]))
+    for part in results:
+        total = merge(total, part)
+        done += part['samples']
+        if progress is not None:
+            progress(done / samples)
+
+    return summarize(context, total, interval, {
+        'samples': samples, 'chunk_size': chunk_size, 'weight_concentration': concentration,
+        'capacity_noise': capacity_noise, 'seed': seed, 'interval': interval
+    })
+
+
+def summarize(context, total, interval, params):
+    """Rank distributions, stability intervals and flip regions from the accumulators"""
+    samples = total['samples']
+    histogram = total['histogram']
+    cumulative = np.cumsum(histogram, axis=1)
+    tail = (1 - interval) / 2
+
+    def percentile(fraction):
+        return (np.argmax(cumulative >= fraction * samples, axis=1) + 1).tolist()
+
+    low, median, high = percentile(tail), percentile(0.5), percentile(1 - tail)
+    ranks = np.arange(1, histogram.shape[1] + 1)
+    mean = (histogram @ ranks) / samples
+
+    states = []
+    for i, state in enumerate(context['states']):
+        nonzero = np.flatnonzero(histogram[i])
+        states.append({
+            'state': state,
+            'base_rank': int(context['base_ranks'][i]),
+            'mean_rank': float(mean[i]),
+            'median_rank': median[i],
+            'rank_interval': [low[i], high[i]],
+            'p_top1': float(histogram[i, 0] / samples),
+            'distribution': {int(r + 1): float(histogram[i, r] / samples) for r in nonzero},
+        })
+    states.sort(key=lambda entry: (entry['base_rank'], entry['state']))
+
+    order = np.argsort(context['base_ranks'], kind='stable')
+    flips = []
+    for k, (hi, lo) in enumerate(zip(order[:-1], order[1:])):
+        count = int(total['flips'][k])
+        if count == 0:
+            continue
+        flip = {
+            'higher': context['states'][hi],
+            'lower': context['states'][lo],
+            'probability': count / samples,
+            'flip_weight_centroid': dict(zip(WEIGHT_NAMES, (total['flip_weight_sum'][k] / count).tolist())),
+        }
+        if context['linear']:
+            # At baseline capacities the lower state overtakes where boundary . w < 0
+            flip['boundary'] = dict(zip(WEIGHT_NAMES, (context['basis'][hi] - context['basis'][lo]).tolist()))
+        flips.append(flip)
+    flips.sort(key=lambda flip: -flip['probability'])
+
+    return {
+        'params': params,
+        'mean_weights': dict(zip(WEIGHT_NAMES, (total['weight_sum'] / samples).tolist())),
+        'states': states,
+        'flips': flips,
+    }
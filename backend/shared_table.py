@@ -0,0 +1,187 @@
+# Memory-mapped columnar state table shared across uvicorn workers
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no loader election, publishing is still atomic
+    fcntl = None
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = 3
+# Bumped when the on-disk layout changes; older versions are rebuilt, not read
+LAYOUT_VERSION = 2
+
+
+def source_stamp(path):
+    """Identity of the source database, used to decide if a table is fresh"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"path": os.path.abspath(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+class SharedTable:
+    """Read-only view over one published version of the state table"""
+
+    def __init__(self, directory, version):
+        self.directory = directory
+        self.version = version
+        self.path = os.path.join(directory, version)
+        with open(os.path.join(self.path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("layout") != LAYOUT_VERSION:
+            raise ValueError(f"Unsupported shared table layout in {self.path}")
+
+    @property
+    def meta(self):
+        return self.manifest["meta"]
+
+    def column(self, entry):
+        """One stored column; numeric and string columns stay memory-mapped"""
+        # np.load with mmap_mode maps the page cache: every worker shares it
+        values = np.load(os.path.join(self.path, entry["file"]), mmap_mode="r")
+        if entry.get("missing"):
+            # Object column with None/NaN: rebuild it with the gaps restored
+            missing = np.load(os.path.join(self.path, entry["missing"]))
+            values = values.astype(object)
+            values[missing] = None
+        return values
+
+    def frame(self, name):
+        """DataFrame for one published frame, backed by the mapped columns"""
+        entries = self.manifest["frames"][name]
+        return pd.DataFrame({entry["name"]: self.column(entry) for entry in entries}, copy=False)
+
+    def frames(self):
+        return {name: self.frame(name) for name in self.manifest["frames"]}
+
+    def is_stale(self):
+        """True once a newer version has been published"""
+        return current_version(self.directory) != self.version
+
+
+def current_version(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def attach(directory):
+    """Attach to the current version, or None if nothing is published"""
+    version = current_version(directory)
+    if version is None:
+        return None
+    try:
+        return SharedTable(directory, version)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def publish(directory, frames, source=None, meta=None):
+    """Write frames as one columnar block and make it the current version"""
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    staging = tempfile.mkdtemp(dir=directory, prefix=".staging-")
+
+    # Columns are stored per frame: frames may share column names but not
+    # row order or length
+    layout = {}
+    for frame_pos, (name, frame) in enumerate(frames.items()):
+        os.makedirs(os.path.join(staging, str(frame_pos)))
+        entries = layout[name] = []
+        for i, column in enumerate(frame.columns):
+            entry = {"name": str(column), "file": f"{frame_pos}/{i}.npy"}
+            values = frame[column].to_numpy()
+            if values.dtype == object:
+                missing = pd.isna(values)
+                if missing.any():
+                    entry["missing"] = f"{frame_pos}/{i}.missing.npy"
+                    np.save(os.path.join(staging, entry["missing"]), missing)
+                    values = np.where(missing, "", values)
+                values = values.astype(str)
+            np.save(os.path.join(staging, entry["file"]), np.ascontiguousarray(values))
+            entries.append(entry)
+
+    manifest = {
+        "version": version,
+        "layout": LAYOUT_VERSION,
+        "frames": layout,
+        "source": source,
+        "meta": meta or {}
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, default=float)
+
+    os.replace(staging, os.path.join(directory, version))
+    _write_current(directory, version)
+    _prune(directory, version)
+    return SharedTable(directory, version)
+
+
+def attach_or_publish(directory, source, build, force=False):
+    """Attach to a table built from `source`, building and publishing it if needed.
+
+    Workers serialize on a file lock, so only the first one calls build();
+    the rest wait and attach. build() returns (frames, meta). `source` is a
+    stamp, or a function returning one; a function is called under the lock
+    and again after build(), so a source that build() creates (a freshly
+    bootstrapped database) is stamped as it is once built. With an unknown
+    (None) source any published table is reused. `force` rebuilds even if
+    the published table matches `source`.
+    """
+    current = source if callable(source) else (lambda: source)
+    os.makedirs(directory, exist_ok=True)
+    with _loader_lock(directory):
+        table = attach(directory)
+        if not force and table is not None:
+            stamp = current()
+            if stamp is None or table.manifest["source"] == stamp:
+                return table
+        frames, meta = build()
+        return publish(directory, frames, source=current(), meta=meta)
+
+
+class _loader_lock:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, LOCK_FILE)
+        self.handle = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.handle = open(self.path, "a")
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+
+
+def _write_current(directory, version):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".current-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+
+
+def _prune(directory, keep):
+    """Drop old versions; mapped files stay valid for workers still attached"""
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith("v") and name != keep
+    )
+    for stale in versions[:-(KEEP_VERSIONS - 1) or None]:
+        shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
@@ -0,0 +1,49 @@
+# Nearest-neighbour "similar states" over standardized scores or PCA coordinates
+import numpy as np
+from sklearn.neighbors import KDTree
+
+# Component scores compared in the 'scores' space (the ML models' features)
+SCORE_COLUMNS = ['solar_score', 'wind_score', 'small_hydro_score', 'bio_score']
+
+# Neighbours precomputed per state; larger k would need another tree query
+MAX_SIMILAR_K = 20
+
+
+def standardized(frame, columns=SCORE_COLUMNS):
+    """z-scores per column; constant columns become 0"""
+    values = frame[columns].to_numpy(dtype=float)
+    std = values.std(axis=0)
+    return (values - values.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+
+class NeighbourGraph:
+    """The max_k nearest other rows of every row, from one KD-tree query.
+
+    Rows are baseline_scored positions. Ties keep the tree's order, and
+    with fewer than max_k + 1 rows every other row is a neighbour.
+    """
+
+    def __init__(self, points, max_k=MAX_SIMILAR_K):
+        points = np.asarray(points, dtype=float)
+        n = len(points)
+        self.max_k = min(max_k, max(n - 1, 0))
+        if self.max_k == 0:
+            self.indices = np.empty((n, 0), dtype=np.int64)
+            self.distances = np.empty((n, 0))
+            return
+
+        # k + 1 because each row finds itself; drop it (or, among exact
+        # duplicates, the last column when it was pushed out)
+        distances, indices = KDTree(points).query(points, k=self.max_k + 1)
+        not_self = indices != np.arange(n)[:, None]
+        keep = np.argsort(~not_self, axis=1, kind='stable')[:, :self.max_k]
+        self.indices = np.take_along_axis(indices, keep, axis=1)
+        self.distances = np.take_along_axis(distances, keep, axis=1)
+
+    def neighbours(self, row, k):
+        """(rows, distances) of the k nearest other rows, closest first"""
+        return self.indices[row, :k], self.distances[row, :k]
+
+    def graph(self, k):
+        """(indices, distances) arrays of shape (n, k) for every row"""
+        return self.indices[:, :k], self.distances[:, :k]
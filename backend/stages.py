@@ -0,0 +1,47 @@
+# Readiness tracking for the staged startup
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageTracker:
+    """Records when each startup stage ran, how long it took and whether it failed"""
+
+    def __init__(self, names):
+        self._lock = threading.Lock()
+        self._stages = {
+            name: {"status": "pending", "seconds": None, "error": None}
+            for name in names
+        }
+
+    def run(self, name, func, *args, **kwargs):
+        """Run func as stage `name`; errors are recorded and re-raised"""
+        self._update(name, status="running", error=None)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            self._update(name, status="failed", error=repr(exc),
+                         seconds=time.perf_counter() - started)
+            logger.exception("Stage %r failed", name)
+            raise
+        self._update(name, status="ready", seconds=time.perf_counter() - started)
+        return result
+
+    def is_ready(self, name):
+        with self._lock:
+            return self._stages[name]["status"] == "ready"
+
+    def status(self, name):
+        with self._lock:
+            return dict(self._stages[name])
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    def _update(self, name, **fields):
+        with self._lock:
+            self._stages[name].update(fields)
@@ -0,0 +1,83 @@
+# Name-keyed index from state to its position in every cached structure
+from dataclasses import dataclass
+from typing import Optional
+
+from state_matching import align_states_to_geojson
+from state_names import normalize_state_name
+
+GEOJSON_NAME_KEYS = ("ST_NM", "st_nm", "NAME_1", "name")
+
+
+def feature_name(feature):
+    """State name stored on a GeoJSON feature, if any"""
+    properties = feature.get("properties") or {}
+    for key in GEOJSON_NAME_KEYS:
+        if properties.get(key):
+            return properties[key]
+    return None
+
+
+@dataclass(frozen=True)
+class StateEntry:
+    state: str
+    baseline_pos: int
+    df_pos: int
+    installed_pos: int
+    feature_pos: Optional[int]
+
+    @property
+    def ml_pos(self):
+        """Row in the GMM / IsolationForest arrays (trained on baseline order)"""
+        return self.baseline_pos
+
+
+class StateIndex:
+    """O(1) lookup of a state by canonical name, alias or GeoJSON name"""
+
+    def __init__(self, baseline, df, installed, geojson):
+        states = list(baseline['state'])
+        df_pos = {state: i for i, state in enumerate(df['state'])}
+        installed_pos = {state: i for i, state in enumerate(installed['state'])}
+
+        features = geojson.get('features', []) if geojson else []
+        feature_pos = {}
+        for i, feature in enumerate(features):
+            name = feature_name(feature)
+            if name is not None:
+                feature_pos.setdefault(normalize_state_name(name), i)
+
+        # GeoJSON spellings for data-side names (e.g. "Orissa" -> "Odisha")
+        aligned = align_states_to_geojson(states, geojson) or {}
+
+        self.entries = {}
+        self._keys = {}
+        for i, state in enumerate(states):
+            geo_name = aligned.get(state) or state
+            entry = StateEntry(
+                state=state,
+                baseline_pos=i,
+                df_pos=df_pos[state],
+                installed_pos=installed_pos[state],
+                feature_pos=feature_pos.get(normalize_state_name(geo_name)),
+            )
+            self.entries[state] = entry
+            self._keys[normalize_state_name(state)] = entry
+            self._keys.setdefault(normalize_state_name(geo_name), entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        """Entry for a state name in any supported spelling, or None"""
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self._keys.get(normalize_state_name(name))
+        return entry
+
+    def canonical(self, name):
+        """Dataset spelling of a state name, or None if unknown"""
+        entry = self.get(name)
+        return entry.state if entry else None
@@ -0,0 +1,8 @@
+# State-name keys shared by main.py, main_simple.py and the region store (standard library only)
+import re
+
+
+def normalize_state_name(name, separator=" "):
+    """Case-, spacing-, punctuation- and '&'-insensitive key for a state name"""
+    key = str(name).casefold().replace("&", " and ")
+    return re.sub(r"[^a-z0-9]+", separator, key).strip(separator)
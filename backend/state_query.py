@@ -0,0 +1,122 @@
+# Filtering, sorting and pagination over the published state records
+import base64
+import json
+
+import numpy as np
+
+SORT_ORDERS = ("asc", "desc")
+
+
+def encode_cursor(state):
+    """Opaque keyset cursor: continue after `state` in the requested order"""
+    return base64.urlsafe_b64encode(json.dumps({"after": state}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class StateTable:
+    """Column lists plus a precomputed sort order per field.
+
+    Built once per snapshot; a query only masks and slices an existing
+    order, it never sorts.
+    """
+
+    def __init__(self, frame):
+        self.fields = list(frame.columns)
+        self.values = {field: frame[field].tolist() for field in self.fields}
+        self.row_of = {state: i for i, state in enumerate(self.values["state"])}
+
+        self.arrays = {}
+        self.orders = {}
+        self.positions = {}
+        for field in self.fields:
+            column = frame[field]
+            if column.isna().any():
+                # ML fields before the 'ml' stage: neither sortable nor filterable
+                continue
+            array = column.to_numpy()
+            self.arrays[field] = array
+            ascending = np.argsort(array, kind="stable")
+            if array.dtype.kind in "biuf":
+                descending = np.argsort(-array.astype(float), kind="stable")
+            else:
+                descending = ascending[::-1].copy()
+            for order, index in (("asc", ascending), ("desc", descending)):
+                self.orders[(field, order)] = index
+                position = np.empty(len(index), dtype=np.int64)
+                position[index] = np.arange(len(index))
+                self.positions[(field, order)] = position
+
+    def __len__(self):
+        return len(self.values["state"])
+
+    def select_fields(self, fields=None):
+        """Requested fields (comma-separated), all of them by default"""
+        if not fields:
+            return list(self.fields)
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in self.values]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return selected
+
+    def can_sort(self, field):
+        return (field, "asc") in self.orders
+
+    def query(self, fields=None, sort="rank", order="asc", limit=None, offset=0,
+              cursor=None, filters=None):
+        """Return (records, total, next_cursor) for one page of matching states.
+
+        `filters` maps a field to a value (equality) or to a ('>=', value) pair.
+        """
+        selected = self.select_fields(fields)
+        if order not in SORT_ORDERS:
+            raise ValueError(f"order must be one of {', '.join(SORT_ORDERS)}")
+        if sort not in self.values:
+            raise ValueError(f"Unknown sort field: {sort}")
+        if not self.can_sort(sort):
+            raise ValueError(f"Cannot sort by {sort} yet")
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError("limit and offset must be non-negative")
+
+        index = self.orders[(sort, order)]
+        mask = self._mask(filters or {})
+        if mask is not None:
+            index = index[mask[index]]
+        total = len(index)
+
+        start = offset
+        if cursor is not None:
+            row = self.row_of.get(decode_cursor(cursor))
+            if row is None:
+                raise ValueError("Invalid cursor")
+            # Keyset: positions of a filtered order stay increasing
+            position = self.positions[(sort, order)]
+            start = int(np.searchsorted(position[index], position[row], side="right"))
+
+        stop = total if limit is None else min(start + limit, total)
+        page = index[start:stop].tolist()
+        records = [{field: self.values[field][i] for field in selected} for i in page]
+        next_cursor = encode_cursor(self.values["state"][page[-1]]) if page and stop < total else None
+        return records, total, next_cursor
+
+    def _mask(self, filters):
+        mask = None
+        for field, condition in filters.items():
+            if condition is None:
+                continue
+            if field not in self.arrays:
+                raise ValueError(f"Cannot filter by {field} yet")
+            array = self.arrays[field]
+            if isinstance(condition, tuple):
+                operator, value = condition
+                matched = array >= value if operator == ">=" else array <= value
+            else:
+                matched = array == condition
+            mask = matched if mask is None else mask & matched
+        return mask
@@ -0,0 +1,8 @@
+# Backend modules are imported flat (`import shared_table`), as main.py does
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+# scoring, ml_analysis, ... live next to the repository, as main.py expects
+sys.path.append(os.path.join(BACKEND_DIR, "..", "..", "energy_transition_app"))
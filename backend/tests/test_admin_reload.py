@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+def test_repeated_reloads_are_coalesced(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_reload():
+        calls.append(1)
+        release.wait(5)
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main, "reload_data", slow_reload)
+    monkeypatch.setattr(main, "pending_reload", None)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"X-Admin-Token": "secret"}
+            responses = [await client.post("/api/admin/reload", headers=headers) for _ in range(3)]
+            release.set()
+            await main.pending_reload
+            after = await client.post("/api/admin/reload", headers=headers)
+            await main.pending_reload
+            return responses, after
+
+    responses, after = asyncio.run(run())
+    assert [r.status_code for r in responses] == [202, 202, 202]
+    assert [r.json()["coalesced"] for r in responses] == [False, True, True]
+    # Once the first reload has finished, the next POST starts a new one
+    assert after.json()["coalesced"] is False
+    assert len(calls) == 2
+
+
+def test_reload_requires_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/admin/reload", headers={"X-Admin-Token": "wrong"})
+
+    assert asyncio.run(run()).status_code == 403
+
+
+@pytest.mark.parametrize("token", [None, "", "secre", "secret ", "sécret"])
+def test_require_admin_rejects_other_tokens(monkeypatch, token):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    with pytest.raises(HTTPException) as rejected:
+        main.require_admin(token)
+    assert rejected.value.status_code == 403
+    main.require_admin("secret")
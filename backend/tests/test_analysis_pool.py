@@ -0,0 +1,55 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import main
+
+
+class FakePool:
+    def __init__(self, **kwargs):
+        self.broken = False
+        self.shut_down = False
+
+    def run(self, value):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        return value
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    created = []
+
+    def make_pool(**kwargs):
+        created.append(FakePool(**kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(main, "ProcessPoolExecutor", make_pool)
+    monkeypatch.setattr(main, "analysis_pool", None)
+    return created
+
+
+def test_broken_pool_is_replaced_and_the_job_retried(pools):
+    broken = main.get_analysis_pool()
+    broken.broken = True
+
+    assert main.run_on_analysis_pool(lambda pool: pool.run("ok")) == "ok"
+    assert broken.shut_down
+    assert len(pools) == 2 and main.analysis_pool is pools[1]
+
+
+def test_job_fails_if_the_retry_breaks_too_but_the_next_one_runs(pools):
+    def crash(pool):
+        pool.broken = True  # e.g. the job itself gets its worker OOM-killed
+        return pool.run("never")
+
+    with pytest.raises(BrokenProcessPool):
+        main.run_on_analysis_pool(crash)
+    assert main.analysis_pool is None
+    assert all(pool.shut_down for pool in pools) and len(pools) == 2
+
+    assert main.run_on_analysis_pool(lambda pool: pool.run("ok")) == "ok"
+    assert len(pools) == 3
@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from jobs import JobRegistry, TooManyJobs
+from stages import StageTracker
+
+
+def wait_for(registry, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = registry.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def fail(progress):
+    raise RuntimeError("boom")
+
+
+def test_failed_job_is_recorded_and_logged(caplog):
+    registry = JobRegistry(max_workers=1)
+    with caplog.at_level(logging.ERROR, logger="jobs"):
+        job = wait_for(registry, registry.submit("test", fail)["job_id"])
+    assert job["status"] == "failed" and "boom" in job["error"]
+    assert any(r.exc_info and job["job_id"] in r.getMessage() for r in caplog.records)
+
+
+def test_failed_stage_is_recorded_and_logged(caplog):
+    tracker = StageTracker(["scores"])
+    with caplog.at_level(logging.ERROR, logger="stages"), pytest.raises(RuntimeError):
+        tracker.run("scores", fail, None)
+    assert tracker.status("scores")["status"] == "failed"
+    assert any(r.exc_info and "scores" in r.getMessage() for r in caplog.records)
+
+
+def test_submit_refuses_jobs_beyond_max_active():
+    release = threading.Event()
+    registry = JobRegistry(max_workers=1, max_active=2)
+    running = [registry.submit("test", lambda progress: release.wait(5))["job_id"] for _ in range(2)]
+    with pytest.raises(TooManyJobs):
+        registry.submit("test", lambda progress: None)
+
+    release.set()
+    for job_id in running:
+        wait_for(registry, job_id)
+    # Finished jobs no longer count
+    assert wait_for(registry, registry.submit("test", lambda progress: "ok")["job_id"])["result"] == "ok"
+
+
+def test_main_answers_429_when_jobs_are_full(monkeypatch):
+    import main
+
+    release = threading.Event()
+    monkeypatch.setattr(main, "jobs", JobRegistry(max_workers=1, max_active=1))
+    main.submit_job("test", lambda progress: release.wait(5))
+    try:
+        with pytest.raises(HTTPException) as busy:
+            main.submit_job("test", lambda progress: None)
+    finally:
+        release.set()
+    assert busy.value.status_code == 429
+    assert busy.value.headers == {"Retry-After": str(main.JOBS_RETRY_AFTER_SECONDS)}
@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main_simple
+
+client = TestClient(main_simple.app)
+
+
+def test_leaderboard_rejects_unknown_metric():
+    response = client.get("/api/leaderboard", params={"metric": "nope"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unknown metric"}
+
+
+def test_neighbours_errors_use_http_status():
+    state = main_simple.STATES_DATA[0]["state"]
+    assert client.get("/api/states/Atlantis/neighbours").status_code == 404
+    assert client.get(f"/api/states/{state}/neighbours", params={"metric": "nope"}).status_code == 400
+    ok = client.get(f"/api/states/{state}/neighbours")
+    assert ok.status_code == 200 and ok.json()["state"] == state
+
+
+def test_state_names_resolve_like_main():
+    for name in ["jammu-and-kashmir", "Andaman & Nicobar", "  TAMIL   nadu. "]:
+        assert client.get(f"/api/states/{name}").status_code == 200, name
+
+
+@pytest.mark.parametrize("k", [0, -1, 101])
+def test_leaderboard_k_is_bounded_like_main(k):
+    state = main_simple.STATES_DATA[0]["state"]
+    for path in ["/api/leaderboard", f"/api/states/{state}/neighbours"]:
+        response = client.get(path, params={"k": k})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "k must be between 1 and 100"}
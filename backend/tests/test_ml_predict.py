@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.ensemble import IsolationForest
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+from ml_predict import ScenarioPredictor
+from scenario_engine import COMPONENT_COLUMNS
+
+
+@pytest.fixture
+def predictor():
+    X = np.random.default_rng(0).uniform(0, 100, (30, len(COMPONENT_COLUMNS)))
+    scaler = StandardScaler().fit(X)
+    scaled = scaler.transform(X)
+    kmeans = KMeans(n_clusters=3, n_init=3, random_state=0).fit(scaled)
+    iso = IsolationForest(n_estimators=20, random_state=0).fit(scaled)
+    results = {
+        'scaler': scaler,
+        'features': COMPONENT_COLUMNS,
+        'kmeans': {'model': kmeans, 'labels': kmeans.labels_},
+        'gmm': {'model': GaussianMixture(n_components=2, random_state=0).fit(scaled)},
+        'isolation_forest': {'model': iso, 'scores': iso.score_samples(scaled),
+                             'labels': iso.predict(scaled)},
+    }
+    return ScenarioPredictor.from_results(results), X
+
+
+def test_outlier_scores_are_opt_in(predictor, monkeypatch):
+    predictor, X = predictor
+    calls = []
+    score_samples = predictor.isolation_forest.score_samples
+    monkeypatch.setattr(predictor.isolation_forest, 'score_samples',
+                        lambda rows: calls.append(len(rows)) or score_samples(rows))
+
+    skipped = predictor.predict(X[:3], [0, 1, 2])
+    assert calls == []
+    assert skipped['outlier_score'].tolist() == [None] * 3
+    assert skipped['is_outlier'].tolist() == [None] * 3
+    # Baseline values are lookups, so they are always there
+    assert skipped['base_outlier_score'].notna().all()
+
+    scored = predictor.predict(X[:3], [0, 1, 2], outliers=True)
+    assert calls == [3]
+    expected = score_samples(predictor.scale(X[:3]))
+    assert scored['outlier_score'].tolist() == expected.tolist()
+    assert scored['is_outlier'].tolist() == (predictor.isolation_forest.predict(predictor.scale(X[:3])) == -1).tolist()
+    assert scored['cluster'].tolist() == skipped['cluster'].tolist()
+
+
+def test_outliers_per_row(predictor):
+    predictor, X = predictor
+    mixed = predictor.predict(X[:4], [0, 1, 2, 3], outliers=[True, False, False, True])
+    full = predictor.predict(X[:4], [0, 1, 2, 3], outliers=True)
+    assert mixed['outlier_score'].tolist() == [full['outlier_score'][0], None, None, full['outlier_score'][3]]
+    assert mixed['is_outlier'].tolist() == [full['is_outlier'][0], None, None, full['is_outlier'][3]]
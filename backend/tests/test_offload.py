@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from offload import BoundedExecutor, PoolSaturated
+
+
+def blocking(release):
+    release.wait(5)
+    return "done"
+
+
+def test_saturated_pool_rejects_instead_of_queueing():
+    pool = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.ensure_future(pool.run(blocking, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(blocking, release)
+        release.set()
+        return await asyncio.gather(*running)
+
+    try:
+        assert asyncio.run(run()) == ["done", "done"]
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert (stats["pending"], stats["peak"], stats["completed"], stats["rejected"]) == (0, 2, 2, 1)
+
+
+def test_slot_is_freed_when_the_task_finishes():
+    pool = BoundedExecutor(max_workers=1, max_queue=0)
+
+    async def run():
+        return [await pool.run(lambda i=i: i * 2) for i in range(5)]
+
+    try:
+        assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    finally:
+        pool.shutdown()
+    assert pool.stats()["rejected"] == 0
+
+
+def test_zero_workers_run_inline():
+    pool = BoundedExecutor(max_workers=0, max_queue=0)
+    caller = threading.get_ident()
+    assert asyncio.run(pool.run(threading.get_ident)) == caller
+    assert pool.stats()["max_pending"] is None
+
+
+def test_offload_turns_saturation_into_429(monkeypatch):
+    pool = BoundedExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(main, "compute_pool", pool)
+    release = threading.Event()
+
+    async def run():
+        running = asyncio.ensure_future(main.offload(blocking, release))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as busy:
+            await main.offload(blocking, release)
+        release.set()
+        return busy.value, await running
+
+    try:
+        busy, result = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert result == "done"
+    assert busy.status_code == 429
+    assert busy.headers == {"Retry-After": str(main.BUSY_RETRY_AFTER_SECONDS)}
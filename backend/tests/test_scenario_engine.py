@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scenario_engine import COMPONENT_COLUMNS, RESOURCE_COLUMNS, ScenarioEngine
+from scoring import apply_whatif, compute_baseline_bounds, compute_scores, scenario_delta
+
+
+def make_installed(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    installed = pd.DataFrame({"state": [f"State {i}" for i in range(n)]})
+    for column in RESOURCE_COLUMNS:
+        installed[column] = np.round(rng.lognormal(5, 2, n), 1)
+    installed.loc[:3, "wind_mw"] = 0.0
+    installed.iloc[5, 1:] = installed.iloc[4, 1:]  # a tie in the baseline ranking
+    installed["large_hydro_mw"] = np.round(rng.uniform(0, 3000, n), 1)
+    installed["total_mw"] = installed[RESOURCE_COLUMNS + ["large_hydro_mw"]].sum(axis=1)
+    return installed
+
+
+@pytest.fixture
+def setup():
+    installed = make_installed()
+    bounds = compute_baseline_bounds(installed)
+    baseline, _ = compute_scores(installed, bounds, 0.25, 0.25, 0.25, 0.25)
+    return installed, bounds, baseline
+
+
+def test_score_rows_matches_compute_scores(setup):
+    installed, bounds, baseline = setup
+    rng = np.random.default_rng(1)
+    weights = rng.uniform(0.05, 1, (len(installed), 4))
+    engine = ScenarioEngine(installed, bounds, baseline, weights)
+
+    positions = rng.integers(0, len(installed), 200)
+    deltas = rng.normal(0, 2000, (200, 4))
+    percent = rng.random(200) < 0.5
+    rows = engine.apply_deltas(positions, percent, deltas)
+    scores, values = engine.score_rows(rows, positions, COMPONENT_COLUMNS)
+
+    for i, position in enumerate(positions):
+        expected, _ = compute_scores(rows.iloc[[i]], bounds, *weights[position])
+        assert scores[i] == expected["final_score"].iloc[0]
+        np.testing.assert_array_equal(values[i], expected[COMPONENT_COLUMNS].to_numpy(dtype=float)[0])
+
+
+def test_evaluate_matches_full_recompute(setup):
+    installed, bounds, baseline = setup
+    engine = ScenarioEngine(installed, bounds, baseline)
+    scenarios = [
+        ("State 0", "mw", [500.0, 250.0, 0.0, 0.0]),
+        ("State 4", "mw", [0.0, 0.0, 0.0, 0.0]),  # unchanged, tied with State 5
+        ("State 7", "percent", [-100.0, -100.0, -100.0, -100.0]),
+        ("State 12", "percent", [50.0, 0.0, 10.0, 0.0]),
+        ("State 39", "mw", [-1e9, 1e6, 0.0, 5.0]),
+    ]
+    positions = [int(state.split()[1]) for state, _, _ in scenarios]
+    frame = engine.evaluate(positions, [mode == "percent" for _, mode, _ in scenarios],
+                            [deltas for _, _, deltas in scenarios], features=COMPONENT_COLUMNS)
+
+    for row, (state, mode, deltas) in zip(frame.itertuples(), scenarios):
+        scenario, _ = compute_scores(apply_whatif(installed, state, mode, *deltas), bounds,
+                                     0.25, 0.25, 0.25, 0.25)
+        expected = scenario_delta(baseline, scenario, state)
+        assert row.state == state
+        for key, value in expected.items():
+            assert getattr(row, key) == value, (state, key)
+        changed = scenario.loc[scenario.state == state, COMPONENT_COLUMNS].to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal([getattr(row, c) for c in COMPONENT_COLUMNS], changed)
+
+
+def test_rescore_matches_full_recompute(setup):
+    installed, bounds, baseline = setup
+    engine = ScenarioEngine(installed, bounds, baseline)
+    result = engine.rescore(10, False, [5000.0, 0.0, 0.0, 0.0], features=["wind_score", "solar_score"])
+
+    scenario, _ = compute_scores(apply_whatif(installed, "State 10", "mw", 5000.0, 0.0, 0.0, 0.0),
+                                 bounds, 0.25, 0.25, 0.25, 0.25)
+    expected = scenario_delta(baseline, scenario, "State 10")
+    assert {key: result[key] for key in expected} == expected
+    changed = scenario[scenario.state == "State 10"].iloc[0]
+    assert list(result["features"]) == [changed["wind_score"], changed["solar_score"]]
+
+    # Every other state's rank in the full recompute is its baseline rank plus its shift
+    shifted = {shift["state"]: shift["new_rank"] for shift in result["rank_shifts"]}
+    base_ranks = baseline.set_index("state")["rank"]
+    for other in scenario[scenario.state != "State 10"].itertuples():
+        assert other.rank == shifted.get(other.state, base_ranks[other.state]), other.state
+
+
+def test_numpy_scores_are_checked_against_the_baseline(setup):
+    installed, bounds, baseline = setup
+    assert ScenarioEngine(installed, bounds, baseline).vectorized
+    assert not ScenarioEngine(installed, bounds, baseline, vectorized=False).vectorized
+
+
+def test_falls_back_to_compute_scores_when_the_formula_differs(setup, monkeypatch, caplog):
+    installed, bounds, _ = setup
+
+    def squared_scores(frame, bounds, *weights):
+        # A scoring module the NumPy copy does not reproduce
+        scored, used = compute_scores(frame, bounds, *weights)
+        scored["final_score"] = scored["final_score"] ** 2 / 100
+        scored["rank"] = scored["final_score"].rank(ascending=False, method="min").astype(int)
+        return scored, used
+
+    monkeypatch.setattr("scenario_engine.compute_scores", squared_scores)
+    baseline, _ = squared_scores(installed, bounds, 0.25, 0.25, 0.25, 0.25)
+    engine = ScenarioEngine(installed, bounds, baseline)
+    assert not engine.vectorized
+    assert "fall back" in caplog.text
+
+    result = engine.rescore(10, False, [5000.0, 0.0, 0.0, 0.0], features=COMPONENT_COLUMNS)
+    scenario, _ = squared_scores(apply_whatif(installed, "State 10", "mw", 5000.0, 0.0, 0.0, 0.0),
+                                 bounds, 0.25, 0.25, 0.25, 0.25)
+    expected = scenario_delta(baseline, scenario, "State 10")
+    assert {key: result[key] for key in expected} == expected
+
+
+def test_both_paths_agree(setup):
+    installed, bounds, baseline = setup
+    weights = np.random.default_rng(2).uniform(0.05, 1, (len(installed), 4))
+    fast = ScenarioEngine(installed, bounds, baseline, weights)
+    slow = ScenarioEngine(installed, bounds, baseline, weights, vectorized=False)
+    positions, deltas = np.arange(len(installed)), np.full((len(installed), 4), 250.0)
+    percent = np.zeros(len(installed), dtype=bool)
+    pd.testing.assert_frame_equal(fast.evaluate(positions, percent, deltas, COMPONENT_COLUMNS),
+                                  slow.evaluate(positions, percent, deltas, COMPONENT_COLUMNS))
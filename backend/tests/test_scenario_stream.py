@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from scenario_engine import COMPONENT_COLUMNS, ScenarioEngine
+from scoring import compute_baseline_bounds, compute_scores
+from state_index import StateEntry
+from test_scenario_engine import make_installed
+
+
+class CountingPredictor:
+    features = COMPONENT_COLUMNS
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, values, ml_positions, outliers=False):
+        self.calls += 1
+        return pd.DataFrame({"cluster": [1] * len(values)})
+
+
+def snapshot(states):
+    installed = make_installed()
+    bounds = compute_baseline_bounds(installed)
+    baseline, _ = compute_scores(installed, bounds, 0.25, 0.25, 0.25, 0.25)
+    index = {state: StateEntry(state, i, i, i, None) for i, state in enumerate(installed["state"])
+             if state in states}
+    return {
+        "state_index": index,
+        "scenario_engine": ScenarioEngine(installed, bounds, baseline),
+        "scenario_predictor": CountingPredictor(),
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.stages, "is_ready", lambda stage: True)
+    monkeypatch.setattr(main, "cached_data", snapshot({"State 3"}))
+    return TestClient(main.app)
+
+
+def test_ml_predictions_are_opt_in_per_session(client):
+    predictor = main.cached_data["scenario_predictor"]
+    with client.websocket_connect("/ws/scenario?state=State 3") as socket:
+        socket.send_json({"seq": 1, "delta_solar": 100.0})
+        result = socket.receive_json()
+    assert result["seq"] == 1 and result["ml"] is None
+    assert predictor.calls == 0
+
+    with client.websocket_connect("/ws/scenario?state=State 3&ml=true") as socket:
+        socket.send_json({"seq": 2, "delta_solar": 100.0})
+        result = socket.receive_json()
+    assert result["ml"]["cluster"] == 1
+    assert predictor.calls == 1
+
+
+def test_stream_closes_when_a_reload_drops_the_state(client, monkeypatch):
+    with client.websocket_connect("/ws/scenario?state=State 3") as socket:
+        socket.send_json({"seq": 1, "delta_wind": 50.0})
+        assert socket.receive_json()["state"] == "State 3"
+
+        monkeypatch.setattr(main, "cached_data", snapshot({"State 4"}))
+        socket.send_json({"seq": 2, "delta_wind": 60.0})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            socket.receive_json()
+    assert closed.value.code == 1008
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_table
+
+
+def make_frames():
+    installed = pd.DataFrame({
+        "state": ["Gujarat", "Kerala", "Bihar"],
+        "solar_mw": [9000.0, 500.0, 200.0],
+    })
+    # Same column names, different row order and length
+    geography = pd.DataFrame({
+        "state": ["Bihar", "Gujarat", "Kerala", "Goa"],
+        "coastal": [0, 1, 1, 1],
+        "dominant_geo": ["Agricultural", None, "Coastal", np.nan],
+    })
+    df = installed.merge(geography, on="state", how="left")
+    df["solar_mw"] = df["solar_mw"] * 2  # derived column sharing a name with installed
+    scored = installed.iloc[[2, 0, 1]].reset_index(drop=True).assign(final_score=[10.0, 90.0, 50.0])
+    return {"installed": installed, "geography": geography, "df": df, "baseline_scored": scored}
+
+
+def test_round_trip_keeps_each_frame(tmp_path):
+    frames = make_frames()
+    table = shared_table.publish(str(tmp_path), frames, meta={"weights": {"solar": 0.25}})
+
+    attached = shared_table.attach(str(tmp_path))
+    assert attached.version == table.version
+    assert attached.meta == {"weights": {"solar": 0.25}}
+    for name, frame in frames.items():
+        # np.array drops the memmap subclass so only values and dtypes are compared
+        loaded = pd.DataFrame({c: np.array(v) for c, v in attached.frame(name).items()})
+        pd.testing.assert_frame_equal(loaded, frame, check_dtype=False)
+
+
+def test_missing_strings_stay_missing(tmp_path):
+    frames = make_frames()
+    geography = shared_table.publish(str(tmp_path), frames).frame("geography")
+
+    assert geography["dominant_geo"].isna().tolist() == [False, True, False, True]
+    assert "None" not in geography["dominant_geo"].tolist()
+    assert "nan" not in geography["dominant_geo"].tolist()
+
+
+def test_numeric_columns_are_memory_mapped(tmp_path):
+    table = shared_table.publish(str(tmp_path), make_frames())
+    values = table.column(table.manifest["frames"]["installed"][1])
+    assert isinstance(values, np.memmap)
+
+
+def test_attach_or_publish_builds_once_per_source(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return make_frames(), {}
+
+    first = shared_table.attach_or_publish(str(tmp_path), {"mtime_ns": 1}, build)
+    second = shared_table.attach_or_publish(str(tmp_path), {"mtime_ns": 1}, build)
+    assert second.version == first.version
+    assert len(calls) == 1
+
+    third = shared_table.attach_or_publish(str(tmp_path), {"mtime_ns": 2}, build)
+    assert third.version != first.version
+    assert len(calls) == 2
+
+
+def test_older_layout_is_rebuilt(tmp_path):
+    table = shared_table.publish(str(tmp_path), make_frames())
+    manifest_path = tmp_path / table.version / shared_table.MANIFEST_FILE
+    manifest_path.write_text('{"version": "old", "columns": ["state"], "frames": {}, "source": null, "meta": {}}')
+
+    assert shared_table.attach(str(tmp_path)) is None
+    with pytest.raises(ValueError):
+        shared_table.SharedTable(str(tmp_path), table.version)
+
+
+def test_source_created_by_build_is_stamped_after_it(tmp_path):
+    db = tmp_path / "energy.db"
+    calls = []
+
+    def build():
+        # The first load bootstraps the database, as load_state_tables does
+        calls.append(1)
+        db.write_bytes(b"sqlite")
+        return make_frames(), {}
+
+    stamp = lambda: shared_table.source_stamp(str(db))
+    first = shared_table.attach_or_publish(str(tmp_path / "shared"), stamp, build)
+    assert first.manifest["source"] == shared_table.source_stamp(str(db))
+
+    # A second worker starting after the bootstrap attaches instead of rebuilding
+    second = shared_table.attach_or_publish(str(tmp_path / "shared"), stamp, build)
+    assert second.version == first.version
+    assert len(calls) == 1
+
+
+def test_unknown_source_reuses_the_published_table(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return make_frames(), {}
+
+    first = shared_table.attach_or_publish(str(tmp_path), None, build)
+    second = shared_table.attach_or_publish(str(tmp_path), lambda: None, build)
+    assert second.version == first.version
+    assert len(calls) == 1
+
+    forced = shared_table.attach_or_publish(str(tmp_path), None, build, force=True)
+    assert forced.version != first.version
+    assert len(calls) == 2
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from state_query import StateTable, encode_cursor
+
+
+def make_table():
+    frame = pd.DataFrame({
+        "state": [f"S{i:02d}" for i in range(23)],
+        "final_score": np.round(np.random.default_rng(0).uniform(0, 100, 23), 0) // 10 * 10,  # many ties
+        "coastal": [i % 2 for i in range(23)],
+        "cluster": [np.nan] * 23,  # not available yet: not sortable
+    })
+    frame["rank"] = frame["final_score"].rank(ascending=False, method="min").astype(int)
+    return StateTable(frame)
+
+
+def walk(table, limit, **query):
+    """Follow next_cursor from the first page to the last"""
+    states, cursor, pages = [], None, 0
+    while True:
+        records, total, cursor = table.query(fields="state", limit=limit, cursor=cursor, **query)
+        states += [r["state"] for r in records]
+        pages += 1
+        if cursor is None:
+            return states, total, pages
+
+
+@pytest.mark.parametrize("sort", ["rank", "final_score", "state"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 4, 23, 50])
+def test_cursor_walk_matches_one_unpaged_query(sort, order, limit):
+    table = make_table()
+    everything, total, _ = table.query(fields="state", sort=sort, order=order)
+    states, walked_total, pages = walk(table, limit, sort=sort, order=order)
+    assert states == [r["state"] for r in everything]
+    assert walked_total == total == 23
+    assert pages == max(1, -(-23 // limit))
+
+
+def test_cursor_walk_with_filters():
+    table = make_table()
+    filters = {"coastal": 1, "final_score": (">=", 30)}
+    everything, total, _ = table.query(fields="state", sort="final_score", order="desc", filters=filters)
+    states, walked_total, _ = walk(table, 3, sort="final_score", order="desc", filters=filters)
+    assert states == [r["state"] for r in everything]
+    assert walked_total == total
+
+
+def test_cursor_on_a_filtered_out_state_continues_after_its_position():
+    table = make_table()
+    order = [r["state"] for r in table.query(fields="state", sort="state")[0]]
+    records, _, _ = table.query(fields="state,coastal", sort="state", filters={"coastal": 1},
+                                cursor=encode_cursor("S04"))
+    assert [r["state"] for r in records] == [s for s in order[5:] if int(s[1:]) % 2 == 1]
+
+
+def test_sort_order_of_ties_is_stable():
+    table = make_table()
+    records, _, _ = table.query(fields="state,final_score", sort="final_score", order="desc")
+    keys = [(-r["final_score"], r["state"]) for r in records]
+    assert keys == sorted(keys)
+
+
+@pytest.mark.parametrize("query, message", [
+    ({"cursor": "not-a-cursor"}, "Invalid cursor"),
+    ({"cursor": encode_cursor("Atlantis")}, "Invalid cursor"),
+    ({"sort": "cluster"}, "Cannot sort by cluster yet"),
+    ({"filters": {"cluster": 1}}, "Cannot filter by cluster yet"),
+    ({"order": "sideways"}, "order must be one of"),
+    ({"fields": "state,nope"}, "Unknown fields: nope"),
+])
+def test_invalid_queries_raise_value_error(query, message):
+    with pytest.raises(ValueError, match=message):
+        make_table().query(**query)
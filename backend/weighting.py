@@ -0,0 +1,88 @@
+# Custom and geography-recommended weights over a precomputed component basis
+import numpy as np
+
+from scoring import compute_scores
+
+WEIGHT_NAMES = ['solar', 'wind', 'small_hydro', 'bio']
+RECOMMENDED = 'recommended'
+
+# Weights are normalized to sum to 1 and rounded to this many decimals, so
+# nearly identical requests share one cache entry
+WEIGHT_DECIMALS = 3
+
+
+def quantize_weights(weights):
+    """Normalized, rounded weight tuple; ValueError for unusable vectors"""
+    values = np.asarray(weights, dtype=float)
+    if values.shape != (len(WEIGHT_NAMES),):
+        raise ValueError(f"Expected {len(WEIGHT_NAMES)} weights ({', '.join(WEIGHT_NAMES)})")
+    if not np.all(np.isfinite(values)) or np.any(values < 0) or values.sum() <= 0:
+        raise ValueError("Weights must be non-negative and not all zero")
+    return tuple(np.round(values / values.sum(), WEIGHT_DECIMALS).tolist())
+
+
+def parse_weights(spec):
+    """Weights key for a request: None, 'recommended' or a quantized tuple.
+
+    Accepts a comma-separated string ("0.4,0.3,0.15,0.15"), a list of numbers
+    or the string 'recommended'.
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, str):
+        if spec.strip().lower() == RECOMMENDED:
+            return RECOMMENDED
+        try:
+            spec = [float(part) for part in spec.split(",")]
+        except ValueError:
+            raise ValueError("weights must be 'recommended' or comma-separated numbers")
+    return quantize_weights(spec)
+
+
+class WeightModel:
+    """final_score as a linear function of the weight vector.
+
+    The basis holds one column per component: the final scores with all
+    weight on that component. Reweighting is then basis @ w, or a row-wise
+    product for per-state weights. If the scoring module turns out not to be
+    linear in its weights, scores fall back to compute_scores.
+    """
+
+    def __init__(self, installed, bounds, baseline, baseline_weights, recommended):
+        self.installed = installed
+        self.bounds = bounds
+        self.states = baseline['state'].to_numpy()
+        self.basis = np.column_stack([
+            self._compute(np.eye(len(WEIGHT_NAMES))[j]) for j in range(len(WEIGHT_NAMES))
+        ])
+        # Per-state geography-recommended weights, aligned with the baseline rows
+        self.recommended = np.asarray(recommended, dtype=float)
+
+        expected = baseline['final_score'].to_numpy(dtype=float)
+        self.linear = bool(np.allclose(
+            self.basis @ np.asarray(quantize_weights(baseline_weights)), expected,
+            rtol=1e-6, atol=1e-6
+        ))
+
+    def _compute(self, weights):
+        scored, _ = compute_scores(self.installed, self.bounds, *weights)
+        return scored.set_index('state')['final_score'].loc[self.states].to_numpy(dtype=float)
+
+    def row_weights(self, key):
+        """(n, 4) weights per state for a parsed weights key"""
+        if key == RECOMMENDED:
+            return self.recommended
+        return np.broadcast_to(np.asarray(key, dtype=float), self.basis.shape)
+
+    def final_scores(self, key):
+        """Final score per baseline row under the given weights"""
+        weights = self.row_weights(key)
+        if self.linear:
+            return np.einsum('ij,ij->i', self.basis, weights)
+
+        scores = np.empty(len(self.states))
+        unique, groups = np.unique(weights, axis=0, return_inverse=True)
+        for group, vector in enumerate(unique):
+            mask = groups.ravel() == group
+            scores[mask] = self._compute(vector)[mask]
+        return scores
@@ -10,6 +10,20 @@ export const api = axios.create({
   },
 });
 
+// The backend sheds CPU-heavy requests with 429 + Retry-After when busy; retry a few times
+const MAX_BUSY_RETRIES = 3;
+
+api.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  if (error.response?.status !== 429 || !config || (config.busyRetries ?? 0) >= MAX_BUSY_RETRIES) {
+    throw error;
+  }
+  config.busyRetries = (config.busyRetries ?? 0) + 1;
+  const seconds = Number(error.response.headers['retry-after']) || 1;
+  await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+  return api.request(config);
+});
+
 // Types
 export interface StateScore {
   state: string;
@@ -77,9 +91,15 @@ export interface ScenarioRequest {
   delta_wind: number;
   delta_hydro: number;
   delta_bio: number;
+  weights?: Weights;
+  // Also score the new IsolationForest outlier flag (slower); null in `ml` otherwise
+  outliers?: boolean;
 }
 
-export interface ScenarioResponse {
+// [solar, wind, small_hydro, bio] (normalized server-side) or per-state geography weights
+export type Weights = [number, number, number, number] | 'recommended';
+
+export interface ScenarioDelta {
   base_score: number;
   new_score: number;
   delta_score: number;
@@ -88,19 +108,158 @@ export interface ScenarioResponse {
   delta_rank: number;
 }
 
+export interface RankShift {
+  state: string;
+  base_rank: number;
+  new_rank: number;
+}
+
+// Fitted-model predictions for the scenario state; null fields mean the model is unavailable
+// (outlier_score / is_outlier are also null unless the request set `outliers`)
+export interface ScenarioML {
+  cluster: number | null;
+  cluster_name: string | null;
+  base_cluster: number | null;
+  cluster_changed: boolean | null;
+  gmm_cluster: number | null;
+  gmm_probabilities: number[] | null;
+  gmm_confidence: number | null;
+  base_gmm_confidence: number | null;
+  outlier_score: number | null;
+  base_outlier_score: number | null;
+  is_outlier: boolean | null;
+  base_is_outlier: boolean | null;
+}
+
+export interface ScenarioResponse extends ScenarioDelta {
+  rank_shifts: RankShift[];
+  // null until the ML models have loaded
+  ml: ScenarioML | null;
+}
+
+export interface BatchScenarioResult extends ScenarioDelta {
+  state: string;
+  ml?: Partial<ScenarioML> | null;
+}
+
+export interface CapacityValues {
+  solar_mw?: number;
+  wind_mw?: number;
+  small_hydro_mw?: number;
+  bio_power_mw?: number;
+  large_hydro_mw?: number;
+  total_mw?: number;
+}
+
+export interface DistrictCapacity extends CapacityValues {
+  district: string;
+}
+
+export interface CapacityPeriod extends CapacityValues {
+  period: string; // YYYY-MM
+}
+
+export type LeaderboardMetric = 'final' | 'solar' | 'wind' | 'small_hydro' | 'bio';
+
+export interface LeaderboardEntry {
+  rank: number;
+  state: string;
+  score: number;
+}
+
+export type SimilaritySpace = 'scores' | 'pca';
+
+export interface SimilarState {
+  state: string;
+  distance: number;
+  final_score: number;
+  rank: number;
+}
+
+export interface SimilarityGraph {
+  space: SimilaritySpace;
+  k: number;
+  states: string[];
+  // Row i lists positions in `states` of state i's nearest states, closest first
+  neighbours: number[][];
+  distances: number[][];
+}
+
 // API functions
 export const getAllStates = async (): Promise<StateScore[]> => {
   const response = await api.get('/api/states');
   return response.data;
 };
 
+export interface StatesQuery {
+  fields?: (keyof StateScore)[];
+  sort?: keyof StateScore;
+  order?: 'asc' | 'desc';
+  limit?: number;
+  offset?: number;
+  cursor?: string;
+  cluster?: number;
+  is_outlier?: boolean;
+  min_score?: number;
+  weights?: Weights;
+}
+
+// Server-side filtered, sorted and paged rankings
+export const queryStates = async (
+  query: StatesQuery
+): Promise<{ states: Partial<StateScore>[]; total: number; nextCursor: string | null }> => {
+  const response = await api.get('/api/states', {
+    params: {
+      ...query,
+      fields: query.fields?.join(','),
+      weights: Array.isArray(query.weights) ? query.weights.join(',') : query.weights,
+    },
+  });
+  return {
+    states: response.data,
+    total: Number(response.headers['x-total-count'] ?? response.data.length),
+    nextCursor: response.headers['x-next-cursor'] ?? null,
+  };
+};
+
 export const getStateDetails = async (stateName: string): Promise<StateDetails> => {
   const response = await api.get(`/api/states/${encodeURIComponent(stateName)}`);
   return response.data;
 };
 
-export const getGeoJSON = async () => {
-  const response = await api.get('/api/geojson');
+export const getGeoJSON = async (
+  level: 'low' | 'medium' | 'high' | 'full' = 'medium',
+  format: 'geojson' | 'topojson' = 'topojson'
+) => {
+  const response = await api.get('/api/geojson', { params: { level, format } });
+  return response.data;
+};
+
+export const getDistricts = async (
+  stateName: string,
+  period?: string,
+  fields?: string[]
+): Promise<{ state: string; period: string | null; districts: DistrictCapacity[] }> => {
+  const response = await api.get(`/api/districts/${encodeURIComponent(stateName)}`, {
+    params: { period, fields: fields?.join(',') },
+  });
+  return response.data;
+};
+
+export const getTimeseries = async (
+  stateName: string,
+  start?: string,
+  end?: string,
+  fields?: string[]
+): Promise<CapacityPeriod[]> => {
+  const response = await api.get(`/api/timeseries/${encodeURIComponent(stateName)}`, {
+    params: { start, end, fields: fields?.join(',') },
+  });
+  return response.data.series;
+};
+
+export const getWeights = async () => {
+  const response = await api.get('/api/weights');
   return response.data;
 };
 
@@ -119,7 +278,8 @@ export const runScenario = async (
   solarIncrease: number,
   windIncrease: number,
   hydroIncrease: number,
-  bioIncrease: number
+  bioIncrease: number,
+  weights?: Weights
 ): Promise<any> => {
   const request = {
     state,
@@ -128,11 +288,172 @@ export const runScenario = async (
     delta_wind: windIncrease,
     delta_hydro: hydroIncrease,
     delta_bio: bioIncrease,
+    weights,
   };
   const response = await api.post('/api/scenario', request);
   return response.data;
 };
 
+export type ResourceValues = Partial<Record<'solar' | 'wind' | 'hydro' | 'bio', number>>;
+
+export interface OptimizeRequest {
+  state: string;
+  target_rank?: number;
+  target_score?: number;
+  costs?: ResourceValues;
+  max_add_mw?: ResourceValues;
+  weights?: Weights;
+  budget_ms?: number;
+  max_options?: number;
+}
+
+export interface OptimizeOption {
+  deltas_mw: Record<'solar' | 'wind' | 'hydro' | 'bio', number>;
+  cost: number;
+  new_score: number;
+  delta_score: number;
+  new_rank: number;
+  delta_rank: number;
+  meets_target: boolean;
+}
+
+// Goal-seek: cheapest additions reaching a target rank/score, plus the cost/score frontier
+export const optimizeScenario = async (request: OptimizeRequest) => {
+  const response = await api.post('/api/scenario/optimize', request);
+  return response.data as {
+    feasible: boolean;
+    best: OptimizeOption | null;
+    pareto: OptimizeOption[];
+    quick_win: (Partial<OptimizeOption> & Record<string, unknown>) | null;
+  };
+};
+
+export const runScenarioBatch = async (
+  scenarios: ScenarioRequest[]
+): Promise<BatchScenarioResult[]> => {
+  const response = await api.post('/api/scenarios/batch', { scenarios });
+  return response.data.results;
+};
+
+// Live scenario stream: send slider updates, receive the newest result.
+// `ml` adds cluster predictions to every result (slower per update).
+export const openScenarioStream = (
+  state: string,
+  onResult: (result: ScenarioResponse & { seq: number | null; dropped: number }) => void,
+  ml = false
+) => {
+  const wsUrl = API_BASE_URL.replace(/^http/, 'ws');
+  const query = `state=${encodeURIComponent(state)}${ml ? '&ml=true' : ''}`;
+  const socket = new WebSocket(`${wsUrl}/ws/scenario?${query}`);
+  let seq = 0;
+
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === 'result') onResult(message);
+  };
+
+  return {
+    update: (solar: number, wind: number, hydro: number, bio: number) => {
+      if (socket.readyState !== WebSocket.OPEN) return;
+      socket.send(JSON.stringify({
+        seq: seq++,
+        mode: 'mw',
+        delta_solar: solar,
+        delta_wind: wind,
+        delta_hydro: hydro,
+        delta_bio: bio,
+      }));
+    },
+    close: () => socket.close(),
+  };
+};
+
+export const getLeaderboard = async (
+  metric: LeaderboardMetric = 'final',
+  k = 10,
+  bottom = false
+): Promise<LeaderboardEntry[]> => {
+  const response = await api.get('/api/leaderboard', { params: { metric, k, bottom } });
+  return response.data.entries;
+};
+
+export const getRankNeighbours = async (
+  stateName: string,
+  metric: LeaderboardMetric = 'final',
+  k = 2
+): Promise<LeaderboardEntry[]> => {
+  const response = await api.get(`/api/states/${encodeURIComponent(stateName)}/neighbours`, {
+    params: { metric, k },
+  });
+  return response.data.entries;
+};
+
+export const getSimilarStates = async (
+  stateName: string,
+  k = 5,
+  space: SimilaritySpace = 'scores'
+): Promise<SimilarState[]> => {
+  const response = await api.get(`/api/states/${encodeURIComponent(stateName)}/similar`, {
+    params: { k, space },
+  });
+  return response.data.neighbours;
+};
+
+export const getSimilarityGraph = async (
+  k = 5,
+  space: SimilaritySpace = 'scores'
+): Promise<SimilarityGraph> => {
+  const response = await api.get('/api/similar/graph', { params: { k, space } });
+  return response.data;
+};
+
+export interface SensitivityOptions {
+  samples?: number;
+  weight_concentration?: number;
+  capacity_noise?: number;
+  interval?: number;
+  seed?: number;
+}
+
+// Start a Monte Carlo sensitivity job and poll it until it finishes
+export const runSensitivityAnalysis = async (
+  options: SensitivityOptions = {},
+  onProgress?: (progress: number) => void,
+  pollMs = 500
+) => {
+  const { data: job } = await api.post('/api/analysis/sensitivity', options);
+  for (;;) {
+    const { data: status } = await api.get(job.status_url);
+    onProgress?.(status.progress);
+    if (status.status === 'done') return status.result;
+    if (status.status === 'failed') throw new Error(status.error);
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+  }
+};
+
+export interface MLJobOptions {
+  task?: 'recluster' | 'retrain';
+  n_clusters?: number | number[];
+  features?: string[];
+  seed?: number;
+}
+
+// Submit a recluster/retrain job (identical jobs are shared) and poll it until it finishes
+export const runMLJob = async (
+  options: MLJobOptions = {},
+  onProgress?: (progress: number) => void,
+  pollMs = 500
+) => {
+  const { data: job } = await api.post('/api/ml/jobs', options);
+  for (;;) {
+    const { data: status } = await api.get(job.status_url);
+    onProgress?.(status.progress);
+    if (status.status === 'done') return (await api.get(job.result_url)).data;
+    if (status.status === 'failed') throw new Error(status.error);
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+  }
+};
+
 export const getSummaryStats = async () => {
   const response = await api.get('/api/stats/summary');
   return response.data;